@@ -1,88 +1,180 @@
+"""
+FastAPI app for DogeBot.
+
+``create_app()`` only wires routes and startup/shutdown hooks: clients,
+strategies and shard processes are built in the startup event, so importing
+this module opens no connections, files or threads (uvicorn workers and
+tests can import it cheaply).
+"""
 import asyncio
+import logging
+import os
+
 from fastapi import FastAPI, Response
 from prometheus_client import Gauge, generate_latest
 
-# Debug environment variables first
-print("🚀 DogeBot Starting - Debug Environment Variables:")
-import os
-print("🔍 ALL ENVIRONMENT VARIABLES:")
-for key, value in sorted(os.environ.items()):
-    if any(term in key.upper() for term in ['API', 'BASE', 'URL', 'BINANCE', 'DAILY', 'FDUSD', 'PORT']):
-        display_value = value[:10] + '...' if len(value) > 10 else value
-        print(f"   {key} = {display_value}")
-
-print("\n🎯 EXPECTED VARIABLES:")
-expected = ['BINANCE_API_KEY', 'BINANCE_API_SECRET', 'BINANCE_BASE_URL', 'DAILY_TARGET', 'FDUSD_CAP']
-for var in expected:
-    value = os.getenv(var)
-    status = '✅' if value else '❌'
-    print(f"   {status} {var} = {value[:10] + '...' if value and len(value) > 10 else value}")
-
-try:
-    from bot.services.websocket import strategy, start_websocket
-except Exception as e:
-    print(f"❌ WebSocket import failed: {e}")
-    import traceback
-    traceback.print_exc()
-
-app = FastAPI()
-
-# Start WebSocket as background task when app starts (better than threading)
-@app.on_event("startup")
-async def startup_event():
-    """Start WebSocket connection when FastAPI starts"""
-    try:
-        print("🚀 Starting WebSocket connection...")
-        import asyncio
-        asyncio.create_task(start_websocket())
-        print("✅ WebSocket task created successfully")
-    except Exception as e:
-        print(f"❌ Failed to start WebSocket: {e}")
-        import traceback
-        traceback.print_exc()
+logger = logging.getLogger(__name__)
+
+SHARDS = int(os.getenv("SHARDS", 0))   # >0: supervisor mode, symbols run in worker processes
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+LOG_FILE = os.getenv("LOG_FILE", "/tmp/dogebot_websocket.log")   # "" logs to stderr only
+
+EXPECTED_VARS = ['BINANCE_API_KEY', 'BINANCE_API_SECRET', 'BINANCE_BASE_URL', 'DAILY_TARGET', 'FDUSD_CAP']
+
+
+def configure_logging(log_file: str = LOG_FILE):
+    """Root logging for the bot process; called at startup, never at import"""
+    handlers = [logging.StreamHandler()]
+    if log_file:
+        handlers.append(logging.FileHandler(log_file))
+    logging.basicConfig(level=LOG_LEVEL,
+                        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+                        handlers=handlers)
+
+
+def _mask(value: str) -> str:
+    return value[:10] + '...' if value and len(value) > 10 else value
+
+
+def log_environment():
+    """Log the bot-related environment (values truncated) and which expected variables are set"""
+    for key, value in sorted(os.environ.items()):
+        if any(term in key.upper() for term in ['API', 'BASE', 'URL', 'BINANCE', 'DAILY', 'FDUSD', 'PORT']):
+            logger.info(f"🔍 {key} = {_mask(value)}")
+    for var in EXPECTED_VARS:
+        value = os.getenv(var)
+        logger.info(f"   {'✅' if value else '❌'} {var} = {_mask(value)}")
+
 
 # Initialize metrics with safe registration
-try:
-    pnl_g = Gauge("bot_realised_pnl", "Realised PnL")
-    ladder_g = Gauge("bot_open_ladders", "# open ladders")
-except ValueError:
-    # Metrics already registered, get existing ones
-    from prometheus_client import REGISTRY
-    for collector in list(REGISTRY._collector_to_names.keys()):
-        if hasattr(collector, '_name'):
-            if collector._name == "bot_realised_pnl":
-                pnl_g = collector
-            elif collector._name == "bot_open_ladders":
-                ladder_g = collector
-
-@app.get("/health")
-def health():
-    """Health check endpoint"""
-    return {
-        "status": "ok", 
-        "bot_active": True,
-        "realised_pnl": strategy.realised,
-        "open_ladders": len(strategy.ladders)
-    }
-
-@app.get("/status")
-def status():
-    """Detailed bot status"""
-    return {
-        "strategy": {
-            "realised_pnl": strategy.realised,
-            "open_ladders": len(strategy.ladders),
-            "cycle_active": strategy.cycle is not None
-        },
-        "environment": {
-            "symbol": "DOGEFDUSD",
-            "daily_target": os.getenv("DAILY_TARGET", "6.0"),
-            "base_url": os.getenv("BINANCE_BASE_URL") or os.getenv("BASE_URL", "NOT_SET")
+def _gauge(name, documentation, labels=()):
+    try:
+        return Gauge(name, documentation, labels)
+    except ValueError:
+        # Metrics already registered, get the existing one
+        from prometheus_client import REGISTRY
+        for collector in list(REGISTRY._collector_to_names.keys()):
+            if getattr(collector, "_name", None) == name:
+                return collector
+        raise
+
+pnl_g = _gauge("bot_realised_pnl", "Realised PnL")
+ladder_g = _gauge("bot_open_ladders", "# open ladders")
+symbol_pnl_g = _gauge("bot_symbol_realised_pnl", "Realised PnL per symbol", ["symbol"])
+symbol_ladder_g = _gauge("bot_symbol_open_ladders", "# open ladders per symbol", ["symbol"])
+shard_up_g = _gauge("bot_shard_up", "Shard worker process alive", ["shard"])
+shard_backlog_g = _gauge("bot_shard_backlog", "Unread records in the shard's ring", ["shard"])
+shard_dropped_g = _gauge("bot_shard_dropped", "Records dropped because the shard's ring was full", ["shard"])
+shard_heartbeat_g = _gauge("bot_shard_heartbeat_age_seconds", "Seconds since the shard last published stats", ["shard"])
+
+
+def create_app(shards: int = None) -> FastAPI:
+    """The API with its startup hooks; nothing is built until the app starts"""
+    shards = SHARDS if shards is None else shards
+    app = FastAPI()
+    app.state.supervisor = None
+    app.state.registry = None
+
+    async def supervise():
+        """Restart shard/ingest processes that die"""
+        while True:
+            await asyncio.sleep(5)
+            app.state.supervisor.check()
+
+    # Start WebSocket as background task when app starts (better than threading)
+    @app.on_event("startup")
+    async def startup_event():
+        """Build the bot and start its streams"""
+        log_environment()
+        try:
+            if shards:
+                from bot.services.shard import Supervisor
+                app.state.supervisor = Supervisor.from_env()
+                logger.info(f"🚀 Starting supervisor with {shards} shards...")
+                app.state.supervisor.start()
+                asyncio.create_task(supervise())
+                return
+            from bot.services import websocket
+            app.state.registry = websocket.build()
+            await websocket.restore_state()
+            logger.info("🚀 Starting WebSocket connection...")
+            asyncio.create_task(websocket.start_websocket())
+            asyncio.create_task(websocket.start_user_stream())
+            logger.info("✅ WebSocket task created successfully")
+        except Exception:
+            logger.exception("❌ Failed to start WebSocket")
+
+    @app.on_event("shutdown")
+    def shutdown_event():
+        supervisor, registry = app.state.supervisor, app.state.registry
+        if supervisor is not None:
+            supervisor.stop()
+        elif registry is not None:
+            if registry.account is not None:
+                registry.account.stop()
+            if registry.state is not None:
+                registry.state.stop()      # write out anything still queued
+            if registry.journal is not None:
+                registry.journal.close()
+
+    def symbol_status() -> dict:
+        """Per-symbol numbers, from the shards in supervisor mode"""
+        if app.state.supervisor is not None:
+            return app.state.supervisor.status()
+        return app.state.registry.status() if app.state.registry is not None else {}
+
+    @app.get("/health")
+    def health():
+        """Health check endpoint"""
+        symbols = symbol_status()
+        return {
+            "status": "ok",
+            "bot_active": bool(symbols),
+            "realised_pnl": sum(s["realised_pnl"] for s in symbols.values()),
+            "open_ladders": sum(s["open_ladders"] for s in symbols.values()),
+            "symbols": list(symbols),
+            **(app.state.supervisor.health() if app.state.supervisor is not None else {})
+        }
+
+    @app.get("/status")
+    def status():
+        """Detailed bot status"""
+        symbols = symbol_status()
+        primary = next(iter(symbols.values()), {"realised_pnl": 0.0, "open_ladders": 0, "cycle_active": False})
+        return {
+            "strategy": {
+                "realised_pnl": primary["realised_pnl"],
+                "open_ladders": primary["open_ladders"],
+                "cycle_active": primary["cycle_active"]
+            },
+            "symbols": symbols,
+            "account": app.state.registry.account.snapshot()
+            if app.state.registry is not None and app.state.registry.account is not None else None,
+            "environment": {
+                "symbol": next(iter(symbols), None),
+                "daily_target": os.getenv("DAILY_TARGET", "6.0"),
+                "base_url": os.getenv("BINANCE_BASE_URL") or os.getenv("BASE_URL", "NOT_SET")
+            }
         }
-    }
 
-@app.get("/metrics")
-def metrics():
-    pnl_g.set(strategy.realised)          # live numbers
-    ladder_g.set(len(strategy.ladders))
-    return Response(generate_latest(), media_type="text/plain; charset=utf-8")
+    @app.get("/metrics")
+    def metrics():
+        symbols = symbol_status()
+        pnl_g.set(sum(s["realised_pnl"] for s in symbols.values()))          # live numbers
+        ladder_g.set(sum(s["open_ladders"] for s in symbols.values()))
+        for symbol, s in symbols.items():
+            symbol_pnl_g.labels(symbol).set(s["realised_pnl"])
+            symbol_ladder_g.labels(symbol).set(s["open_ladders"])
+        if app.state.supervisor is not None:
+            for shard in app.state.supervisor.health()["shards"]:
+                label = str(shard["shard"])
+                shard_up_g.labels(label).set(shard["alive"])
+                shard_backlog_g.labels(label).set(shard["backlog"])
+                shard_dropped_g.labels(label).set(shard["dropped"])
+                shard_heartbeat_g.labels(label).set(shard["heartbeat_age"] if shard["heartbeat_age"] is not None else float("nan"))
+        return Response(generate_latest(), media_type="text/plain; charset=utf-8")
+
+    return app
+
+
+app = create_app()
@@ -0,0 +1,5 @@
+from bot.backtest.data import Klines, load_klines
+from bot.backtest.fills import SimOrderMgr, SimOrderRejected
+from bot.backtest.engine import Backtest, BacktestResult
+
+__all__ = ["Klines", "load_klines", "SimOrderMgr", "SimOrderRejected", "Backtest", "BacktestResult"]
@@ -0,0 +1,66 @@
+"""
+Backtest GridStrategy on a kline file:
+
+    python -m bot.backtest DOGEFDUSD-1m-2024.csv --interval 1m --step-mult 0.3 --qty0 200
+"""
+import argparse
+import time
+
+from bot.backtest import Backtest, load_klines
+from bot.core.signals import EntryParams, scan_entries
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay historical klines through GridStrategy")
+    parser.add_argument("path", help="CSV (Binance dump layout) or Parquet kline file, or a candle archive directory")
+    parser.add_argument("--interval", default="15m")
+    parser.add_argument("--symbol", default="DOGEFDUSD")
+    parser.add_argument("--start", help="first bar to read from a candle archive, e.g. 2024-01-01")
+    parser.add_argument("--end", help="last bar to read from a candle archive")
+    parser.add_argument("--cash", type=float, default=None, help="starting quote balance (default FDUSD_CAP)")
+    parser.add_argument("--fee", type=float, default=0.0, help="maker fee rate, e.g. 0.001")
+    parser.add_argument("--daily-target", type=float, default=None)
+    parser.add_argument("--step-mult", type=float)
+    parser.add_argument("--qty0", type=int)
+    parser.add_argument("--qty-inc", type=int)
+    parser.add_argument("--profit-target", type=float)
+    parser.add_argument("--fdusd-cap", type=float)
+    parser.add_argument("--bb-max", type=float, default=EntryParams.bb_max)
+    parser.add_argument("--ema-ratio-min", type=float, default=EntryParams.ema_ratio_min)
+    parser.add_argument("--drop-pct", type=float, default=EntryParams.drop_pct)
+    parser.add_argument("--drop-lookback", type=int, default=EntryParams.drop_lookback)
+    parser.add_argument("--equity-out", help="write the equity curve to this CSV")
+    parser.add_argument("--trades-out", help="write the trade log to this CSV")
+    parser.add_argument("--scan", action="store_true",
+                        help="only count bars where the entry conditions held (no simulation)")
+    args = parser.parse_args(argv)
+
+    strategy_params = {name: getattr(args, name) for name in
+                       ["step_mult", "qty0", "qty_inc", "profit_target", "fdusd_cap"]
+                       if getattr(args, name) is not None}
+    extra = {"daily_target": args.daily_target} if args.daily_target is not None else {}
+    entry = EntryParams(args.bb_max, args.ema_ratio_min, args.drop_pct, args.drop_lookback)
+
+    klines = load_klines(args.path, args.symbol, args.interval, args.start, args.end)
+    if args.scan:
+        signals = scan_entries(klines.high, klines.low, klines.close, entry)
+        days = klines.to_frame()["close"][signals].index.normalize().nunique()
+        print(f"🔎 {int(signals.sum()):,} entry-signal bars out of {len(klines):,} ({days} distinct days)")
+        return
+
+    started = time.perf_counter()
+    result = Backtest(klines, interval=args.interval, symbol=args.symbol, cash=args.cash,
+                      fee_rate=args.fee, entry=entry, **extra, **strategy_params).run()
+    elapsed = time.perf_counter() - started
+
+    print(f"📊 Backtest {args.symbol} {args.interval}: {len(klines):,} bars in {elapsed:.2f}s")
+    for key, value in result.summary().items():
+        print(f"   {key:>16}: {value:,.4f}" if isinstance(value, float) else f"   {key:>16}: {value:,}")
+    if args.equity_out:
+        result.equity_frame().to_csv(args.equity_out)
+    if args.trades_out:
+        result.trades_frame().to_csv(args.trades_out, index=False)
+
+
+if __name__ == "__main__":
+    main()
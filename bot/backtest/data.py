@@ -0,0 +1,95 @@
+"""
+Historical kline loading for backtests
+"""
+from dataclasses import dataclass
+from pathlib import Path
+import numpy as np
+import pandas as pd
+
+# Column layout of Binance kline dumps (data.binance.vision) and /api/v3/klines
+BINANCE_COLUMNS = ["open_time", "open", "high", "low", "close", "volume", "close_time",
+                   "quote_volume", "count", "taker_buy_volume", "taker_buy_quote_volume", "ignore"]
+OHLCV = ["open", "high", "low", "close", "volume"]
+
+
+@dataclass
+class Klines:
+    """Contiguous per-column arrays; ``time`` is the open time in ms since epoch"""
+    time: np.ndarray
+    open: np.ndarray
+    high: np.ndarray
+    low: np.ndarray
+    close: np.ndarray
+    volume: np.ndarray
+
+    def __post_init__(self):
+        self.time = np.ascontiguousarray(self.time, dtype=np.int64)
+        for name in OHLCV:
+            setattr(self, name, np.ascontiguousarray(getattr(self, name), dtype=np.float64))
+
+    def __len__(self):
+        return len(self.time)
+
+    def __getitem__(self, key: slice) -> "Klines":
+        return Klines(self.time[key], *(getattr(self, name)[key] for name in OHLCV))
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame) -> "Klines":
+        if "open_time" in df:
+            times = df["open_time"].to_numpy()
+        elif isinstance(df.index, pd.DatetimeIndex):
+            times = df.index.as_unit("ms").asi8
+        else:
+            times = df.index.to_numpy()
+        volume = df["volume"].to_numpy() if "volume" in df else np.full(len(df), np.nan)
+        return cls(_to_ms(np.asarray(times, dtype=np.int64)),
+                   df["open"].to_numpy(), df["high"].to_numpy(),
+                   df["low"].to_numpy(), df["close"].to_numpy(), volume)
+
+    def to_frame(self) -> pd.DataFrame:
+        return pd.DataFrame({name: getattr(self, name) for name in OHLCV},
+                            index=pd.to_datetime(self.time, unit="ms"))
+
+
+def _to_ms(times: np.ndarray) -> np.ndarray:
+    # Binance spot dumps switched to microsecond timestamps in 2025
+    if len(times) and times.max() > 10**14:
+        return times // 1000
+    return times
+
+
+def _to_time(value):
+    if value is None or isinstance(value, (int, np.integer)):
+        return value
+    return int(pd.Timestamp(value, tz="UTC").value // 10**6)
+
+
+def load_klines(path, symbol: str = "DOGEFDUSD", interval: str = "15m", start=None, end=None) -> Klines:
+    """Load klines from a CSV (Binance dump layout, with or without header) or Parquet
+    file, or a candle archive directory (memory-mapped; ``start``/``end`` in ms or
+    any date string pandas parses, both inclusive)"""
+    path = Path(path)
+    if path.is_dir():
+        from bot.services.store import CandleArchive
+        return CandleArchive(str(path)).read(symbol, interval, _to_time(start), _to_time(end))
+    if path.suffix in (".parquet", ".pq"):
+        df = pd.read_parquet(path)
+    else:
+        with open(path) as f:
+            first = f.readline().split(",")[0].strip()
+        has_header = not first.lstrip("-").isdigit()
+        if has_header:
+            df = pd.read_csv(path)
+        else:
+            df = pd.read_csv(path, header=None)
+            df.columns = BINANCE_COLUMNS[:len(df.columns)]
+    missing = [c for c in ["open", "high", "low", "close"] if c not in df]
+    if missing:
+        raise ValueError(f"❌ {path} is missing kline columns: {missing}")
+    if "open_time" not in df and "time" in df:
+        df = df.rename(columns={"time": "open_time"})
+    klines = Klines.from_frame(df)
+    order = np.argsort(klines.time, kind="stable")
+    if np.any(order != np.arange(len(order))):
+        klines = Klines(klines.time[order], *(getattr(klines, n)[order] for n in OHLCV))
+    return klines
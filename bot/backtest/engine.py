@@ -0,0 +1,148 @@
+"""
+Event-driven backtester: replays closed klines through the production
+CandlePipeline and GridStrategy against a simulated exchange.
+"""
+import logging
+from dataclasses import dataclass, field
+from math import nan
+
+import numpy as np
+import pandas as pd
+
+from bot.backtest.data import Klines
+from bot.backtest.fills import SimOrderMgr
+from bot.core.pipeline import CandlePipeline, DAILY_TARGET
+from bot.core.signals import EntryParams
+from bot.core.strategy import GridStrategy
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class BacktestResult:
+    time: np.ndarray
+    equity: np.ndarray
+    realised: np.ndarray          # strategy.realised after each bar (resets daily)
+    capital_used: np.ndarray      # quote locked in BUYs plus inventory at market
+    trades: list = field(default_factory=list)
+    rejected: int = 0
+    cycles: int = 0
+    initial_cash: float = 0.0
+
+    @property
+    def pnl(self) -> float:
+        return float(self.equity[-1] - self.initial_cash) if len(self.equity) else 0.0
+
+    @property
+    def max_drawdown(self) -> float:
+        """Largest peak-to-trough equity drop, in quote currency"""
+        if not len(self.equity):
+            return 0.0
+        return float(np.max(np.maximum.accumulate(self.equity) - self.equity))
+
+    @property
+    def utilisation(self) -> float:
+        """Average share of starting capital tied up in orders and inventory"""
+        if not len(self.capital_used) or not self.initial_cash:
+            return 0.0
+        return float(np.mean(self.capital_used) / self.initial_cash)
+
+    def summary(self) -> dict:
+        return {
+            "pnl": self.pnl,
+            "return_pct": 100*self.pnl/self.initial_cash if self.initial_cash else nan,
+            "max_drawdown": self.max_drawdown,
+            "utilisation": self.utilisation,
+            "max_utilisation": float(np.max(self.capital_used)/self.initial_cash) if len(self.capital_used) else 0.0,
+            "fills": len(self.trades),
+            "cycles": self.cycles,
+            "rejected": self.rejected,
+        }
+
+    def equity_frame(self) -> pd.DataFrame:
+        return pd.DataFrame({"equity": self.equity, "realised": self.realised,
+                             "capital_used": self.capital_used},
+                            index=pd.to_datetime(self.time, unit="ms"))
+
+    def trades_frame(self) -> pd.DataFrame:
+        return pd.DataFrame(self.trades, columns=["time", "side", "price", "qty", "fee",
+                                                  "order_id", "buy_price", "pnl"])
+
+
+class Backtest:
+    """Run GridStrategy over historical candles.
+
+    Each bar first settles resting orders against its high/low (dispatching
+    fills to the strategy as execution reports would), then goes through
+    CandlePipeline.on_candle at the close exactly as a live closed kline does.
+    """
+
+    def __init__(self, klines: Klines, interval: str = "15m", symbol: str = "DOGEFDUSD",
+                 cash: float = None, fee_rate: float = 0.0, entry: EntryParams = EntryParams(),
+                 daily_target: float = DAILY_TARGET, **strategy_params):
+        self.klines = klines
+        self.sim = SimOrderMgr(symbol=symbol, fee_rate=fee_rate)
+        self.strategy = GridStrategy(order_mgr=self.sim, notify=False, **strategy_params)
+        self.sim.cash = self.strategy.fdusd_cap if cash is None else cash
+        self.initial_cash = self.sim.cash
+        self.pipeline = CandlePipeline(self.strategy, symbol=symbol, interval=interval,
+                                       daily_target=daily_target, entry=entry)
+
+    def run(self, quiet: bool = True) -> BacktestResult:
+        k = self.klines
+        n = len(k)
+        sim, strategy, pipeline = self.sim, self.strategy, self.pipeline
+        equity = np.empty(n)
+        realised = np.empty(n)
+        used = np.empty(n)
+        trades = []
+        rejected = 0
+        cycles = 0
+
+        bot_logger = logging.getLogger("bot")
+        level = bot_logger.level
+        if quiet:
+            bot_logger.setLevel(logging.WARNING)
+        try:
+            times, opens, highs, lows, closes, vols = (
+                k.time.tolist(), k.open.tolist(), k.high.tolist(),
+                k.low.tolist(), k.close.tolist(), k.volume.tolist())
+            for i in range(n):
+                t, c = times[i], closes[i]
+                if sim.open:
+                    for order in sim.match(i, t, highs[i], lows[i]):
+                        fee = order.price*order.qty*sim.fee_rate
+                        pnl = (order.price - order.buy_price)*order.qty if order.buy_price is not None else None
+                        trades.append((t, order.side, order.price, order.qty, fee,
+                                       order.order_id, order.buy_price, pnl))
+                        try:
+                            if order.side == "BUY":
+                                with sim.buy_fill_context(order.price):
+                                    strategy.handle_buy_fill(order.price, order.qty, order.client_order_id)
+                            else:
+                                strategy.handle_sell_fill(order.price, qty=order.qty,
+                                                          order_id=order.client_order_id)
+                        except Exception as e:
+                            rejected += 1
+                            logger.debug(f"❌ Fill handling failed at {t}: {e}")
+
+                sim.time = t
+                sim.last_price = c
+                was_cycle = strategy.cycle
+                try:
+                    pipeline.on_candle(t, opens[i], highs[i], lows[i], c, vols[i])
+                except Exception as e:
+                    # Same as handle_kline: log and carry on with the next candle
+                    rejected += 1
+                    logger.debug(f"❌ Candle processing failed at {t}: {e}")
+                if strategy.cycle and not was_cycle:
+                    cycles += 1
+
+                equity[i] = sim.equity(c)
+                realised[i] = strategy.realised
+                used[i] = sim.cash_locked + (sim.base + sim.base_locked)*c
+        finally:
+            bot_logger.setLevel(level)
+
+        return BacktestResult(k.time.copy(), equity, realised, used, trades,
+                              rejected=rejected, cycles=cycles, initial_cash=self.initial_cash)
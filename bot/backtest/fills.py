@@ -0,0 +1,174 @@
+"""
+Simulated exchange for backtests: a drop-in stand-in for OrderMgr with a
+LIMIT_MAKER fill model and spot balance checks.
+"""
+import heapq
+import itertools
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+
+from bot.core.order_mgr import TICK, BatchResult, OrderOutcome
+
+
+class SimOrderRejected(Exception):
+    """Raised where the exchange would reject the order (mirrors a REST error)"""
+
+
+@dataclass
+class SimOrder:
+    order_id: int
+    side: str
+    price: float
+    qty: float
+    placed_bar: int
+    buy_price: float = None   # set on ladder SELLs placed from a BUY fill
+    client_order_id: str = None
+
+
+@dataclass
+class SimOrderMgr:
+    """Resting LIMIT_MAKER orders matched against each bar's high/low.
+
+    * A maker order that would cross the last close is re-priced one tick
+      inside it, which is where OrderMgr's "match and take" retry loop ends up.
+    * Orders only fill on the bar after they were placed, and only when the
+      bar trades through the limit (low < BUY price, high > SELL price), at
+      the limit price.
+    * Quote and base balances are locked on placement, so an order the
+      account could not fund is rejected the way the exchange would.
+    """
+    symbol: str = "DOGEFDUSD"
+    cash: float = 1100.0
+    fee_rate: float = 0.0
+    tick: float = TICK
+    events: list = field(default_factory=list)
+
+    def __post_init__(self):
+        self.cash_locked = 0.0
+        self.base = 0.0
+        self.base_locked = 0.0
+        self.last_price = None
+        self.bar = 0
+        self.time = 0
+        self.open = {}
+        self._buys = []    # heap of (-price, order_id)
+        self._sells = []   # heap of (price, order_id)
+        self._ids = itertools.count(1)
+        self._by_client = {}
+        self._buy_context = None
+
+    # ---- OrderMgr interface -------------------------------------------------
+    def post_limit_maker(self, side: str, price: float, qty: float, client_order_id: str = None):
+        side = side.upper()
+        price = round(price/self.tick)*self.tick
+        qty = float(round(qty))
+        if self.last_price is not None:
+            if side == "BUY" and price >= self.last_price:
+                price = round(self.last_price/self.tick)*self.tick - self.tick
+            elif side == "SELL" and price <= self.last_price:
+                price = round(self.last_price/self.tick)*self.tick + self.tick
+        if qty <= 0 or price <= 0:
+            raise SimOrderRejected(f"invalid order {side} {qty} @ {price}")
+
+        if side == "BUY":
+            cost = price*qty
+            if cost > self.cash + 1e-9:
+                raise SimOrderRejected(f"insufficient balance: BUY {qty} @ {price:.6f} needs {cost:.4f}, free {self.cash:.4f}")
+            self.cash -= cost
+            self.cash_locked += cost
+        else:
+            if qty > self.base + 1e-9:
+                raise SimOrderRejected(f"insufficient balance: SELL {qty} needs {qty}, free {self.base}")
+            self.base -= qty
+            self.base_locked += qty
+
+        order_id = next(self._ids)
+        order = SimOrder(order_id, side, price, qty, self.bar,
+                         buy_price=self._buy_context if side == "SELL" else None,
+                         client_order_id=client_order_id or f"sim-{order_id}")
+        self.open[order.order_id] = order
+        self._by_client[order.client_order_id] = order.order_id
+        if side == "BUY":
+            heapq.heappush(self._buys, (-price, order.order_id))
+        else:
+            heapq.heappush(self._sells, (price, order.order_id))
+        self.events.append({"time": self.time, "action": side, "price": price, "qty": qty})
+        return {"symbol": self.symbol, "orderId": order.order_id,
+                "clientOrderId": order.client_order_id, "side": side,
+                "price": f"{price:.5f}", "origQty": f"{qty:.0f}", "status": "NEW", "fills": []}
+
+    def post_batch(self, orders) -> BatchResult:
+        outcomes = []
+        for side, price, qty, *client_order_id in orders:
+            try:
+                resp = self.post_limit_maker(side, price, qty, *client_order_id)
+                outcomes.append(OrderOutcome(side, float(resp["price"]), qty, response=resp))
+            except SimOrderRejected as e:
+                outcomes.append(OrderOutcome(side, price, qty, error=e))
+        return BatchResult(outcomes)
+
+    def cancel_order(self, order_id=None, client_order_id=None):
+        if order_id is None:
+            order_id = self._by_client.get(client_order_id)
+        order = self.open.pop(order_id, None)
+        if order is None:
+            return None
+        del self._by_client[order.client_order_id]
+        self._release(order)
+        return {"orderId": order_id, "clientOrderId": order.client_order_id, "status": "CANCELED"}
+
+    def cancel_batch(self, client_order_ids) -> list:
+        return [self.cancel_order(client_order_id=order_id) for order_id in client_order_ids]
+
+    # ---- simulation -----------------------------------------------------------
+    def _release(self, order):
+        if order.side == "BUY":
+            self.cash_locked -= order.price*order.qty
+            self.cash += order.price*order.qty
+        else:
+            self.base_locked -= order.qty
+            self.base += order.qty
+
+    def match(self, bar: int, time: int, high: float, low: float) -> list:
+        """Fill resting orders the bar traded through; returns them in fill order"""
+        self.bar, self.time = bar, time
+        fills = []
+        for book, crosses in ((self._buys, lambda p: low < -p), (self._sells, lambda p: high > p)):
+            deferred = []
+            while book and crosses(book[0][0]):
+                key, order_id = heapq.heappop(book)
+                order = self.open.get(order_id)
+                if order is None:
+                    continue                      # cancelled
+                if order.placed_bar >= bar:
+                    deferred.append((key, order_id))
+                    continue
+                del self.open[order_id]
+                del self._by_client[order.client_order_id]
+                fills.append(order)
+            for item in deferred:
+                heapq.heappush(book, item)
+
+        for order in fills:
+            notional = order.price*order.qty
+            fee = notional*self.fee_rate
+            if order.side == "BUY":
+                self.cash_locked -= notional
+                self.cash -= fee
+                self.base += order.qty
+            else:
+                self.base_locked -= order.qty
+                self.cash += notional - fee
+        return fills
+
+    @contextmanager
+    def buy_fill_context(self, price: float):
+        """Tag SELLs placed while handling a BUY fill with that BUY's price"""
+        self._buy_context = price
+        try:
+            yield
+        finally:
+            self._buy_context = None
+
+    def equity(self, price: float) -> float:
+        return self.cash + self.cash_locked + (self.base + self.base_locked)*price
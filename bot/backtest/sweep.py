@@ -0,0 +1,174 @@
+"""
+Parallel parameter sweep: run Backtest for every combination in a grid of
+GridStrategy / entry settings and rank the results.
+
+Candles are copied once into a shared-memory block; pool workers attach to
+it in their initializer and build zero-copy Klines views, so tasks only
+carry a small parameter dict.
+
+    python -m bot.backtest.sweep DOGEFDUSD-1m-2024.csv --interval 1m \\
+        --step-mult 0.2,0.25,0.3 --qty0 200,300 --bb-max 0.2,0.3 --top 20
+"""
+import argparse
+import itertools
+import logging
+import os
+import time
+from dataclasses import fields
+from multiprocessing import Pool, shared_memory
+
+import numpy as np
+import pandas as pd
+
+from bot.backtest.data import Klines, OHLCV, load_klines
+from bot.backtest.engine import Backtest
+from bot.core.signals import EntryParams
+
+logger = logging.getLogger(__name__)
+
+STRATEGY_PARAMS = ("step_mult", "qty0", "qty_inc", "profit_target", "fdusd_cap")
+ENTRY_PARAMS = tuple(f.name for f in fields(EntryParams))
+RANK_BY = ["pnl", "max_drawdown", "utilisation"]
+RANK_ASCENDING = [False, True, True]
+
+
+def param_grid(**axes) -> list:
+    """Cartesian product of the given value lists, as a list of param dicts"""
+    names = list(axes)
+    for name in names:
+        if name not in STRATEGY_PARAMS + ENTRY_PARAMS:
+            raise ValueError(f"❌ Unknown sweep parameter: {name}")
+    return [dict(zip(names, values)) for values in itertools.product(*axes.values())]
+
+
+class SharedKlines:
+    """Klines columns packed into one shared-memory block (time, then OHLCV)"""
+
+    def __init__(self, klines: Klines):
+        self.n = len(klines)
+        self.shm = shared_memory.SharedMemory(create=True, size=max(1, 6*self.n*8))
+        buf = np.ndarray((6, self.n), dtype=np.float64, buffer=self.shm.buf)
+        buf[0].view(np.int64)[:] = klines.time
+        for row, name in enumerate(OHLCV, 1):
+            buf[row] = getattr(klines, name)
+
+    @property
+    def spec(self) -> tuple:
+        return self.shm.name, self.n
+
+    @staticmethod
+    def attach(spec: tuple):
+        """Open an existing block; returns (shm, Klines view). Keep shm alive while using the view."""
+        name, n = spec
+        shm = shared_memory.SharedMemory(name=name)
+        buf = np.ndarray((6, n), dtype=np.float64, buffer=shm.buf)
+        return shm, Klines(buf[0].view(np.int64), *buf[1:])
+
+    def close(self):
+        self.shm.close()
+        self.shm.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# Per-worker state set up by _init_worker
+_worker = {}
+
+
+def _init_worker(spec: tuple, options: dict):
+    shm, klines = SharedKlines.attach(spec)
+    _worker.update(shm=shm, klines=klines, options=options)
+
+
+def run_params(klines: Klines, params: dict, interval: str = "15m", **options) -> dict:
+    """Backtest one parameter set; returns the params merged with the result summary"""
+    entry = EntryParams(**{k: v for k, v in params.items() if k in ENTRY_PARAMS})
+    strategy_params = {k: v for k, v in params.items() if k in STRATEGY_PARAMS}
+    try:
+        summary = Backtest(klines, interval=interval, entry=entry,
+                           **options, **strategy_params).run().summary()
+    except Exception as e:
+        logger.warning(f"⚠️ Sweep run failed for {params}: {e}")
+        summary = {"error": str(e)}
+    return {**params, **summary}
+
+
+def _run_task(params: dict) -> dict:
+    return run_params(_worker["klines"], params, **_worker["options"])
+
+
+def rank(results: pd.DataFrame) -> pd.DataFrame:
+    """Best PnL first; ties broken by lower drawdown, then lower capital utilisation"""
+    if results.empty or "pnl" not in results:
+        return results
+    return results.sort_values(RANK_BY, ascending=RANK_ASCENDING, kind="stable").reset_index(drop=True)
+
+
+def sweep(klines: Klines, grid: list, interval: str = "15m", processes: int = None,
+          chunksize: int = None, **options) -> pd.DataFrame:
+    """Backtest every param dict in ``grid`` over ``klines`` and return ranked results.
+
+    ``options`` go to every Backtest (symbol, cash, fee_rate, daily_target).
+    ``processes=1`` runs in-process, which is easier to debug.
+    """
+    processes = processes or os.cpu_count() or 1
+    options = {"interval": interval, **options}
+    if processes == 1 or len(grid) <= 1:
+        return rank(pd.DataFrame([run_params(klines, p, **options) for p in grid]))
+
+    chunksize = chunksize or max(1, len(grid) // (processes*8))
+    with SharedKlines(klines) as shared, \
+            Pool(processes, initializer=_init_worker, initargs=(shared.spec, options)) as pool:
+        results = list(pool.imap_unordered(_run_task, grid, chunksize=chunksize))
+    return rank(pd.DataFrame(results))
+
+
+def _values(cast):
+    return lambda text: [cast(v) for v in text.split(",")]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Sweep GridStrategy parameters over historical klines")
+    parser.add_argument("path", help="CSV (Binance dump layout) or Parquet kline file, or a candle archive directory")
+    parser.add_argument("--interval", default="15m")
+    parser.add_argument("--symbol", default="DOGEFDUSD")
+    parser.add_argument("--start", help="first bar to read from a candle archive, e.g. 2024-01-01")
+    parser.add_argument("--end", help="last bar to read from a candle archive")
+    parser.add_argument("--cash", type=float, default=None)
+    parser.add_argument("--fee", type=float, default=0.0)
+    parser.add_argument("--daily-target", type=float, default=None)
+    for name, cast in [("step_mult", float), ("qty0", int), ("qty_inc", int),
+                       ("profit_target", float), ("fdusd_cap", float), ("bb_max", float),
+                       ("ema_ratio_min", float), ("drop_pct", float), ("drop_lookback", int)]:
+        parser.add_argument("--" + name.replace("_", "-"), type=_values(cast),
+                            help="comma-separated values")
+    parser.add_argument("--processes", type=int, default=None, help="default: all cores")
+    parser.add_argument("--top", type=int, default=20)
+    parser.add_argument("--out", help="write all ranked results to this CSV")
+    args = parser.parse_args(argv)
+
+    axes = {name: getattr(args, name) for name in STRATEGY_PARAMS + ENTRY_PARAMS
+            if getattr(args, name) is not None}
+    grid = param_grid(**axes) if axes else [{}]
+    options = {"symbol": args.symbol, "cash": args.cash, "fee_rate": args.fee}
+    if args.daily_target is not None:
+        options["daily_target"] = args.daily_target
+
+    klines = load_klines(args.path, args.symbol, args.interval, args.start, args.end)
+    started = time.perf_counter()
+    results = sweep(klines, grid, interval=args.interval, processes=args.processes, **options)
+    elapsed = time.perf_counter() - started
+
+    print(f"📊 Swept {len(grid):,} parameter sets over {len(klines):,} bars in {elapsed:.1f}s")
+    with pd.option_context("display.width", 200, "display.max_columns", None):
+        print(results.head(args.top).to_string())
+    if args.out:
+        results.to_csv(args.out, index=False)
+
+
+if __name__ == "__main__":
+    main()
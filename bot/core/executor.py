@@ -0,0 +1,129 @@
+"""
+Order execution queue: runs blocking OrderMgr REST calls on a dedicated
+worker thread so the websocket callback never waits on the exchange.
+
+OrderExecutor wraps an OrderMgr and exposes the same methods, but each call
+only enqueues the request and returns a concurrent.futures.Future. Requests
+run one at a time in submission order, so a cancel queued before a SELL
+still reaches the exchange first. ``inflight()`` lists the client order
+IDs of requests not yet completed. ``on_done`` (if set) runs on the worker
+after each request, once its Future is complete.
+"""
+import os
+import logging
+import queue
+import threading
+from collections import Counter
+from concurrent.futures import Future
+
+logger = logging.getLogger(__name__)
+
+ORDER_QUEUE_SIZE = int(os.getenv("ORDER_QUEUE_SIZE", 64))
+
+
+class OrderQueueFull(Exception):
+    """The execution queue is at capacity; the order was not submitted"""
+
+
+class OrderExecutor:
+    def __init__(self, order_mgr, maxsize: int = ORDER_QUEUE_SIZE, put_timeout: float = 0.0):
+        """``put_timeout`` is how long submit() may block for a free slot
+        (0 = fail fast with OrderQueueFull, None = wait indefinitely)"""
+        self.order_mgr = order_mgr
+        self.put_timeout = put_timeout
+        self.on_done = None     # called after each request (SymbolRunner applies results under its lock)
+        self._queue = queue.Queue(maxsize)
+        self._ids = Counter()   # client order IDs of queued or running requests
+        self._ids_lock = threading.Lock()
+        self._stopped = False
+        self._thread = threading.Thread(target=self._worker, name="order-executor", daemon=True)
+        self._thread.start()
+
+    # ---- OrderMgr interface -------------------------------------------------
+    @property
+    def symbol(self) -> str:
+        return self.order_mgr.symbol
+
+    @property
+    def events(self):
+        return self.order_mgr.events
+
+    def post_limit_maker(self, side: str, price: float, qty: float, client_order_id: str = None) -> Future:
+        return self._submit([client_order_id], self.order_mgr.post_limit_maker, side, price, qty, client_order_id)
+
+    def post_batch(self, orders) -> Future:
+        orders = list(orders)
+        return self._submit([o[3] for o in orders if len(o) > 3], self.order_mgr.post_batch, orders)
+
+    def cancel_order(self, order_id=None, client_order_id=None) -> Future:
+        return self._submit([client_order_id], self.order_mgr.cancel_order, order_id, client_order_id)
+
+    def cancel_batch(self, client_order_ids) -> Future:
+        client_order_ids = list(client_order_ids)
+        return self._submit(client_order_ids, self.order_mgr.cancel_batch, client_order_ids)
+
+    # ---- queue --------------------------------------------------------------
+    def submit(self, fn, *args, **kwargs) -> Future:
+        """Queue ``fn(*args, **kwargs)`` for the worker; raises OrderQueueFull under backpressure"""
+        return self._submit((), fn, *args, **kwargs)
+
+    def _submit(self, ids, fn, *args, **kwargs) -> Future:
+        if self._stopped:
+            raise RuntimeError("OrderExecutor is shut down")
+        ids = [order_id for order_id in ids if order_id]
+        future = Future()
+        block = self.put_timeout is None or self.put_timeout > 0
+        self._track(ids, 1)
+        try:
+            self._queue.put((future, fn, args, kwargs, ids), block=block, timeout=self.put_timeout or None)
+        except queue.Full:
+            self._track(ids, -1)
+            logger.error(f"❌ Order queue full ({self._queue.maxsize} pending) – dropping {fn.__name__}{args}")
+            raise OrderQueueFull(f"{self._queue.maxsize} orders pending") from None
+        return future
+
+    def _track(self, ids, n: int):
+        if ids:
+            with self._ids_lock:
+                for order_id in ids:
+                    self._ids[order_id] += n
+                    if self._ids[order_id] <= 0:
+                        del self._ids[order_id]
+
+    def pending(self) -> int:
+        return self._queue.qsize()
+
+    def inflight(self) -> set:
+        """Client order IDs of requests queued or running; the exchange may not know them yet"""
+        with self._ids_lock:
+            return set(self._ids)
+
+    def _worker(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            future, fn, args, kwargs, ids = item
+            if not future.set_running_or_notify_cancel():
+                self._track(ids, -1)
+                continue
+            try:
+                future.set_result(fn(*args, **kwargs))
+            except BaseException as e:
+                # OrderMgr has already logged the REST error
+                logger.debug(f"🔍 {fn.__name__}{args} raised {e!r}")
+                future.set_exception(e)
+            self._track(ids, -1)        # after the Future's callbacks have queued its result
+            if self.on_done is not None:
+                try:
+                    self.on_done()
+                except Exception as e:
+                    logger.error(f"❌ Error applying order results: {e}")
+
+    def shutdown(self, wait: bool = True):
+        """Stop accepting orders; the worker drains what is already queued"""
+        if not self._stopped:
+            self._stopped = True
+            self._queue.put(None)
+        if wait:
+            self._thread.join()
@@ -0,0 +1,151 @@
+"""
+Exchange trading rules (``/api/v3/exchangeInfo`` filters) for local order checks.
+
+Prices and quantities are rounded with Decimal arithmetic on the symbol's
+tick and step sizes, so ``0.19`` stays ``"0.19000"`` rather than picking up
+binary float noise. BUY prices round down and SELL prices up, which keeps
+maker orders on the passive side of the intended level.
+
+``SymbolFilters.prepare`` turns a strategy's (side, price, qty) into the
+exact strings the exchange accepts, or raises ``FilterError`` for an order
+the exchange would reject anyway (below MIN_NOTIONAL / LOT_SIZE, outside
+PRICE_FILTER). A LIMIT_MAKER that would cross the last known market price is
+re-priced one tick inside it locally rather than by "match and take" retries.
+"""
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+from decimal import ROUND_CEILING, ROUND_FLOOR, Decimal
+
+logger = logging.getLogger(__name__)
+
+FILTERS_REFRESH_SECS = float(os.getenv("FILTERS_REFRESH_SECS", 24*3600))   # trading rules rarely change
+RETRY_SECS = 60                 # after a failed load, keep using what we have for this long
+
+
+class FilterError(ValueError):
+    """The order breaks one of the symbol's exchange filters; it was not sent"""
+
+
+def _dec(value) -> Decimal:
+    return value if isinstance(value, Decimal) else Decimal(str(value))
+
+
+def _steps(value: Decimal, size: Decimal, rounding) -> Decimal:
+    """``value`` rounded to a whole number of ``size`` steps"""
+    return ((value / size).to_integral_value(rounding) * size).quantize(size)
+
+
+@dataclass(frozen=True)
+class SymbolFilters:
+    symbol: str
+    tick_size: Decimal = Decimal("0.00001")
+    step_size: Decimal = Decimal("1")
+    min_price: Decimal = Decimal(0)
+    max_price: Decimal = Decimal(0)         # 0: no limit (as on the exchange)
+    min_qty: Decimal = Decimal(0)
+    max_qty: Decimal = Decimal(0)
+    min_notional: Decimal = Decimal(0)
+
+    @classmethod
+    def from_symbol_info(cls, info: dict) -> "SymbolFilters":
+        """Parse one entry of exchangeInfo's ``symbols`` list"""
+        filters = {f["filterType"]: f for f in info.get("filters", [])}
+        price = filters.get("PRICE_FILTER", {})
+        lot = filters.get("LOT_SIZE", {})
+        notional = filters.get("NOTIONAL") or filters.get("MIN_NOTIONAL") or {}
+        dec = lambda f, key, default="0": Decimal(f.get(key, default)).normalize()
+        return cls(info["symbol"],
+                   tick_size=dec(price, "tickSize", "0.00001"), step_size=dec(lot, "stepSize", "1"),
+                   min_price=dec(price, "minPrice"), max_price=dec(price, "maxPrice"),
+                   min_qty=dec(lot, "minQty"), max_qty=dec(lot, "maxQty"),
+                   min_notional=dec(notional, "minNotional"))
+
+    def round_price(self, price, side: str) -> Decimal:
+        return _steps(_dec(price), self.tick_size, ROUND_FLOOR if side.upper() == "BUY" else ROUND_CEILING)
+
+    def round_qty(self, qty) -> Decimal:
+        return _steps(_dec(qty), self.step_size, ROUND_FLOOR)
+
+    def prepare(self, side: str, price, qty, last: float = None, book: tuple = None) -> tuple:
+        """``(price, qty)`` as exchange-exact Decimals; raises FilterError if the
+        order cannot pass. ``book`` is the best ``(bid, ask)``, if known: a BUY
+        at or above the ask (a SELL at or below the bid) would take, so it is
+        moved one tick inside. Without a book the latest market price ``last``
+        stands in for both sides."""
+        side = side.upper()
+        price, qty = self.round_price(price, side), self.round_qty(qty)
+        bid, ask = book if book is not None else (last, last)
+        if side == "BUY" and ask is not None and price >= _dec(ask):
+            price = self.round_price(ask, "BUY") - self.tick_size
+        elif side == "SELL" and bid is not None and price <= _dec(bid):
+            price = self.round_price(bid, "SELL") + self.tick_size
+        if price <= 0 or price < self.min_price or (self.max_price and price > self.max_price):
+            raise FilterError(f"{self.symbol} {side} price {price} outside PRICE_FILTER "
+                              f"[{self.min_price}, {self.max_price or 'inf'}]")
+        if qty <= 0 or qty < self.min_qty or (self.max_qty and qty > self.max_qty):
+            raise FilterError(f"{self.symbol} {side} qty {qty} outside LOT_SIZE "
+                              f"[{self.min_qty}, {self.max_qty or 'inf'}]")
+        if price*qty < self.min_notional:
+            raise FilterError(f"{self.symbol} {side} notional {price*qty} below MIN_NOTIONAL {self.min_notional}")
+        return price, qty
+
+
+def default_filters(symbol: str) -> SymbolFilters:
+    """Rules used before (or without) exchangeInfo: the historic 0.00001 tick, whole coins"""
+    return SymbolFilters(symbol)
+
+
+class ExchangeFilters:
+    """exchangeInfo filters per symbol, loaded once and refreshed every FILTERS_REFRESH_SECS"""
+
+    def __init__(self, client=None, ttl: float = FILTERS_REFRESH_SECS):
+        self.client = client            # binance Spot client (exchange_info)
+        self.ttl = ttl
+        self.symbols = {}               # symbol -> SymbolFilters
+        self.loaded = None              # monotonic time of the last load
+        self.loads = 0
+        self._lock = threading.Lock()
+
+    def load(self, symbols=None) -> dict:
+        """Fetch the rules for ``symbols`` (plus those already cached); one request"""
+        wanted = sorted(set(symbols or ()) | set(self.symbols))
+        if len(wanted) == 1:
+            info = self.client.exchange_info(symbol=wanted[0])
+        else:
+            info = self.client.exchange_info(symbols=wanted) if wanted else self.client.exchange_info()
+        parsed = {s["symbol"]: SymbolFilters.from_symbol_info(s) for s in info["symbols"]}
+        self.symbols = {**self.symbols, **parsed}
+        self.loaded = time.monotonic()
+        self.loads += 1
+        logger.info(f"📏 Loaded exchange filters for {', '.join(parsed)}")
+        return parsed
+
+    def preload(self, symbols) -> bool:
+        """``load`` at startup; on failure ``get`` retries lazily"""
+        try:
+            self.load(symbols)
+            return True
+        except Exception as e:
+            logger.warning(f"⚠️ Could not preload exchange filters: {e}")
+            return False
+
+    def get(self, symbol: str) -> SymbolFilters:
+        """Cached rules for ``symbol``; loads them when missing or stale. If the
+        exchange can't be reached, the last rules known (or the defaults) are used"""
+        cached = self.symbols.get(symbol)
+        if cached is not None and time.monotonic() - self.loaded <= self.ttl:
+            return cached
+        with self._lock:        # callers that arrive during a load wait for it instead of repeating it
+            cached = self.symbols.get(symbol)
+            if cached is None or time.monotonic() - self.loaded > self.ttl:
+                try:
+                    self.load([symbol])
+                except Exception as e:
+                    logger.warning(f"⚠️ Could not load exchange filters for {symbol}: {e}")
+                    if cached is None:
+                        self.symbols[symbol] = cached = default_filters(symbol)
+                    self.loaded = time.monotonic() - self.ttl + RETRY_SECS   # don't retry on every order
+            return self.symbols.get(symbol, cached)
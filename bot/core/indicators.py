@@ -1,49 +1,421 @@
+from collections import deque
+from math import nan, sqrt
 import numpy as np
-import pandas as pd
 
-def atr(df: pd.DataFrame, win: int = 14) -> pd.Series:
+# ---------------------------------------------------------------------------
+# Batch kernels: plain NumPy over contiguous float64 arrays.
+#
+# The pandas functions further down are thin adapters over these, so the same
+# code serves the live bot and multi-year backtests.  Inputs are assumed finite.
+# ---------------------------------------------------------------------------
+_BLOCK = 256  # rows per cumsum block; keeps running sums small on long series
+
+
+def _f64(x) -> np.ndarray:
+    return np.ascontiguousarray(x, dtype=np.float64)
+
+
+def true_range(high, low, close) -> np.ndarray:
+    """True range in one pass; the first bar has no previous close and is NaN"""
+    high, low, close = _f64(high), _f64(low), _f64(close)
+    tr = np.subtract(high, low)
+    if len(tr):
+        tmp = np.empty(len(tr) - 1)
+        np.abs(np.subtract(high[1:], close[:-1], out=tmp), out=tmp)
+        np.maximum(tr[1:], tmp, out=tr[1:])
+        np.abs(np.subtract(low[1:], close[:-1], out=tmp), out=tmp)
+        np.maximum(tr[1:], tmp, out=tr[1:])
+        tr[0] = np.nan
+    return tr
+
+
+def _rolling_moments(x: np.ndarray, win: int, ddof, min_periods: int):
+    """Rolling mean (and std when ``ddof`` is not None) from blocked cumsums.
+
+    A single cumsum over millions of rows would subtract huge running totals
+    and lose the tiny per-window variance, so the series is cut into strided
+    blocks of _BLOCK rows (plus win-1 rows of history each), each centred on
+    its own first value and summed along one axis in a single vectorised call.
+    """
+    n = len(x)
+    mean = np.full(n, np.nan)
+    std = np.full(n, np.nan) if ddof is not None else None
+
+    def finish(s1, s2, cnt, off, dst):
+        s1 /= cnt                                 # s1 becomes the centred mean
+        if std is not None:
+            s2 -= s1 * s1 * cnt
+            with np.errstate(invalid="ignore", divide="ignore"):
+                s2 /= cnt - ddof
+            np.maximum(s2, 0.0, out=s2)
+            np.sqrt(s2, out=s2)
+            if np.any(cnt <= ddof):
+                s2[np.broadcast_to(cnt <= ddof, s2.shape)] = np.nan
+            std[dst] = s2.ravel()[:len(mean[dst])]
+        s1 += off
+        mean[dst] = s1.ravel()[:len(mean[dst])]
+
+    head = min(win - 1, n)                        # rows with a short (expanding) window
+    if head >= min_periods:
+        c = x[:head] - x[0]
+        cnt = np.arange(1.0, head + 1)
+        s2 = np.cumsum(c * c) if std is not None else None
+        finish(np.cumsum(c), s2, cnt, x[0], slice(0, head))
+        mean[:min_periods - 1] = np.nan
+        if std is not None:
+            std[:min_periods - 1] = np.nan
+
+    rows = n - head                               # rows with a full window
+    if rows > 0:
+        nb = -(-rows // _BLOCK)
+        xp = np.concatenate([x, np.full(nb * _BLOCK - rows, x[-1])])
+        blocks = np.lib.stride_tricks.sliding_window_view(xp, _BLOCK + win - 1)[::_BLOCK]
+        off = blocks[:, :1].copy()
+        c1 = blocks - off
+        c2 = c1 * c1 if std is not None else None
+        sums = []
+        for c in (c1, c2):
+            if c is None:
+                sums.append(None)
+                continue
+            np.cumsum(c, axis=1, out=c)
+            s = c[:, win - 1:].copy()             # inclusive cumsum at the window end
+            s[:, 1:] -= c[:, :_BLOCK - 1]         # minus the cumsum just before its start
+            sums.append(s)
+        finish(sums[0], sums[1], float(win), off, slice(head, n))
+    return mean, std
+
+
+def rolling_mean_std(x, win: int, ddof: int = 1, min_periods: int = None):
+    """Rolling mean and standard deviation from blocked cumulative sums"""
+    x = _f64(x)
+    return _rolling_moments(x, win, ddof, win if min_periods is None else min_periods)
+
+
+def rolling_mean(x, win: int, min_periods: int = None) -> np.ndarray:
+    x = _f64(x)
+    return _rolling_moments(x, win, None, win if min_periods is None else min_periods)[0]
+
+
+def ema_kernel(x, span: int = 200, out: np.ndarray = None) -> np.ndarray:
+    """EMA with adjust=False semantics, written into ``out`` (may be ``x`` itself).
+
+    The recurrence y[t] = d*y[t-1] + a*x[t] is unrolled over blocks short
+    enough that d**-block stays below 1e4: every block's zero-start response
+    is one cumsum along a 2-D view, and the carry between blocks decays by
+    d**block <= 1e-4 per block, so a handful of shifted adds settles it.
+    """
+    x = _f64(x)
+    out = np.empty_like(x) if out is None else out
+    n = len(x)
+    if not n:
+        return out
+    a = 2.0 / (span + 1.0)
+    d = 1.0 - a
+    y0 = x[0]
+    if d <= 0.0 or n == 1:
+        out[:] = x
+        return out
+
+    rows = n - 1
+    block = min(rows, max(1, int(np.log(1e4) / -np.log(d))))
+    nb = -(-rows // block)
+    j = np.arange(1, block + 1)
+    grow, decay = d ** -j, d ** j
+
+    z = np.zeros(nb * block)
+    z[:rows] = x[1:]
+    z = z.reshape(nb, block)
+    z *= grow
+    np.cumsum(z, axis=1, out=z)
+    z *= a * decay                              # block response from a zero start
+
+    # Carry into block b: c[b] = D*c[b-1] + z[b-1, -1], with c[0] = y0
+    D = d ** block
+    carry = np.empty(nb)
+    carry[0] = 0.0
+    carry[1:] = z[:-1, -1]
+    terms = min(nb, int(np.ceil(np.log(np.finfo(float).eps) / np.log(D))) + 1 if D > 0 else 1)
+    acc = carry.copy()
+    for i in range(1, terms):
+        acc[i:] += D ** i * carry[:nb - i]
+    acc += D ** np.arange(nb) * y0
+    z += acc[:, None] * decay
+
+    out[1:] = z.ravel()[:rows]
+    out[0] = y0
+    return out
+
+
+def atr_kernel(high, low, close, win: int = 14) -> np.ndarray:
+    """Rolling-mean ATR; NaN until ``win`` true ranges are available"""
+    tr = true_range(high, low, close)
+    out = np.full(len(tr), np.nan)
+    if len(tr) > win:
+        out[1:] = rolling_mean(tr[1:], win)
+    return out
+
+
+def boll_pct_kernel(close, win: int = 20, dev: int = 2) -> np.ndarray:
+    close = _f64(close)
+    mb, sd = rolling_mean_std(close, win, min_periods=1)
+    lower = mb - dev * sd
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return (close - lower) / ((mb + dev * sd) - lower)
+
+
+def vwap_kernel(high, low, close, volume) -> np.ndarray:
+    high, low, close, volume = _f64(high), _f64(low), _f64(close), _f64(volume)
+    pv = (high + low + close) / 3 * volume
+    return np.cumsum(pv) / np.cumsum(volume)
+
+
+# ---------------------------------------------------------------------------
+# pandas adapters (pandas is imported on first use: the live path never needs it)
+# ---------------------------------------------------------------------------
+def atr(df: "pd.DataFrame", win: int = 14) -> "pd.Series":
+    import pandas as pd
     # Safety check: need enough data for ATR calculation
     if len(df) < win:
         return pd.Series([np.nan] * len(df), index=df.index)
-    
-    # Suppress the NumPy warning about NaN values in the first few rows
-    with np.errstate(invalid='ignore'):
-        tr = np.maximum.reduce([
-            df['high'] - df['low'],
-            (df['high'] - df['close'].shift()).abs(),
-            (df['low'] - df['close'].shift()).abs()
-        ])
-    
-    # Calculate rolling mean and forward-fill NaN values for early periods
-    atr_series = pd.Series(tr, index=df.index).rolling(win).mean()
-    
-    # For the first few NaN periods, use a simple average of available true range values
-    if len(df) >= 2:  # Need at least 2 candles for basic ATR
-        first_valid_idx = atr_series.first_valid_index()
-        if first_valid_idx is not None:
-            # Fill earlier NaN values with the first valid ATR value
-            atr_series = atr_series.bfill()
-            
-    return atr_series
-
-def boll_pct(df: pd.DataFrame, win: int = 20, dev: int = 2) -> pd.Series:
+
+    out = atr_kernel(df['high'].to_numpy(), df['low'].to_numpy(), df['close'].to_numpy(), win)
+    # Fill the warm-up rows with the first valid ATR value
+    if len(out) > win:
+        out[:win] = out[win]
+    return pd.Series(out, index=df.index)
+
+def boll_pct(df: "pd.DataFrame", win: int = 20, dev: int = 2) -> "pd.Series":
+    import pandas as pd
     # Safety check: need enough data for Bollinger calculation  
     if len(df) < win:
         return pd.Series([np.nan] * len(df), index=df.index)
-        
-    mb = df['close'].rolling(win, min_periods=1).mean()
-    sd = df['close'].rolling(win, min_periods=1).std()
-    upper = mb + dev*sd
-    lower = mb - dev*sd
-    return (df['close'] - lower)/(upper - lower)
+    return pd.Series(boll_pct_kernel(df['close'].to_numpy(), win, dev), index=df.index)
 
-def ema(series: pd.Series, span: int = 200) -> pd.Series:
-    return series.ewm(span=span, adjust=False).mean()
+def ema(series: "pd.Series", span: int = 200) -> "pd.Series":
+    import pandas as pd
+    return pd.Series(ema_kernel(series.to_numpy(), span), index=series.index)
 
-def vwap(df: pd.DataFrame) -> pd.Series:
+def vwap(df: "pd.DataFrame") -> "pd.Series":
     """Volume Weighted Average Price"""
-    typical_price = (df['high'] + df['low'] + df['close']) / 3
-    return (typical_price * df['volume']).cumsum() / df['volume'].cumsum()
+    import pandas as pd
+    out = vwap_kernel(df['high'].to_numpy(), df['low'].to_numpy(),
+                      df['close'].to_numpy(), df['volume'].to_numpy())
+    return pd.Series(out, index=df.index)
 
 def vwap_list(prices, qtys):
     return (np.array(prices)*np.array(qtys)).sum() / np.array(qtys).sum()
+
+
+# ---------------------------------------------------------------------------
+# Streaming (one bar at a time) indicators.
+#
+# These keep O(1) state per update.  The rolling sums use the compensated
+# add/remove sequence of pandas' rolling().mean()/.std(), so they reproduce
+# the pandas reference bit for bit and the batch kernels above to within
+# floating-point rounding over the same full history.
+# ---------------------------------------------------------------------------
+
+
+class RollingMean:
+    """Fixed-window mean with Kahan-compensated add/remove"""
+
+    def __init__(self, win: int, min_periods: int = None):
+        self.win = win
+        self.min_periods = win if min_periods is None else min_periods
+        self.values = deque(maxlen=win)
+        self.value = nan
+        self._sum = 0.0
+        self._comp_add = 0.0
+        self._comp_remove = 0.0
+        self._neg = 0
+        self._same = 0
+        self._prev = nan
+
+    def update(self, x: float) -> float:
+        values = self.values
+        if len(values) == self.win:
+            old = values[0]
+            y = -old - self._comp_remove
+            t = self._sum + y
+            self._comp_remove = t - self._sum - y
+            self._sum = t
+            if old < 0:
+                self._neg -= 1
+        values.append(x)
+
+        y = x - self._comp_add
+        t = self._sum + y
+        self._comp_add = t - self._sum - y
+        self._sum = t
+        if x < 0:
+            self._neg += 1
+        self._same = self._same + 1 if x == self._prev else 1
+        self._prev = x
+
+        n = len(values)
+        if n < self.min_periods:
+            result = nan
+        elif self._same >= n:
+            result = x
+        else:
+            result = t / n
+            if (self._neg == 0 and result < 0) or (self._neg == n and result > 0):
+                result = 0.0
+        self.value = result
+        return result
+
+
+class RollingVar:
+    """Fixed-window sample variance using Welford add/remove updates"""
+
+    def __init__(self, win: int, min_periods: int = None, ddof: int = 1):
+        self.win = win
+        self.min_periods = win if min_periods is None else min_periods
+        self.ddof = ddof
+        self.values = deque(maxlen=win)
+        self.value = nan
+        self.std = nan
+        self._mean = 0.0
+        self._ssqdm = 0.0
+        self._comp_add = 0.0
+        self._comp_remove = 0.0
+        self._same = 0
+        self._prev = nan
+
+    def update(self, x: float) -> float:
+        values = self.values
+        if len(values) == self.win:
+            old = values[0]
+            n = self.win - 1
+            if n:
+                prev_mean = self._mean - self._comp_remove
+                y = old - self._comp_remove
+                t = y - self._mean
+                self._comp_remove = t + self._mean - y
+                self._mean = self._mean - t / n
+                self._ssqdm = self._ssqdm - (old - prev_mean) * (old - self._mean)
+            else:
+                self._mean = 0.0
+                self._ssqdm = 0.0
+        values.append(x)
+
+        self._same = self._same + 1 if x == self._prev else 1
+        self._prev = x
+        n = len(values)
+        prev_mean = self._mean - self._comp_add
+        y = x - self._comp_add
+        t = y - self._mean
+        self._comp_add = t + self._mean - y
+        self._mean = self._mean + t / n
+        self._ssqdm = self._ssqdm + (x - prev_mean) * (x - self._mean)
+
+        if n < self.min_periods or n <= self.ddof:
+            var = nan
+        elif n == 1 or self._same >= n:
+            var = 0.0
+        else:
+            var = self._ssqdm / (n - self.ddof)
+        self.value = var
+        self.std = sqrt(var) if var > 0 else (0.0 if var == 0 else nan)
+        return var
+
+
+class StreamingATR:
+    """Rolling-mean ATR, same definition as atr()"""
+
+    def __init__(self, win: int = 14):
+        self.win = win
+        self._tr = RollingMean(win)
+        self._prev_close = None
+        self.value = nan
+
+    def update(self, high: float, low: float, close: float) -> float:
+        # The very first bar has no previous close, so (like atr()) its true
+        # range is undefined and it never enters the window
+        pc = self._prev_close
+        if pc is not None:
+            self.value = self._tr.update(max(high - low, abs(high - pc), abs(low - pc)))
+        self._prev_close = close
+        return self.value
+
+
+class StreamingEMA:
+    """Recursive EMA, same definition as ema() (adjust=False)"""
+
+    def __init__(self, span: int = 200):
+        self.span = span
+        self.alpha = 2.0 / (span + 1.0)
+        self.value = nan
+        self.count = 0
+
+    def update(self, x: float) -> float:
+        if self.count == 0:
+            self.value = x
+        elif self.value != x:
+            a = self.alpha
+            self.value = ((1.0 - a) * self.value + a * x) / ((1.0 - a) + a)
+        self.count += 1
+        return self.value
+
+
+class StreamingBollinger:
+    """Bollinger %B over a rolling window, same definition as boll_pct()"""
+
+    def __init__(self, win: int = 20, dev: int = 2):
+        self.win = win
+        self.dev = dev
+        self._mean = RollingMean(win, min_periods=1)
+        self._var = RollingVar(win, min_periods=1)
+        self.value = nan
+
+    def update(self, close: float) -> float:
+        mb = self._mean.update(close)
+        self._var.update(close)
+        sd = self._var.std
+        if len(self._var.values) < self.win:
+            self.value = nan
+        else:
+            upper = mb + self.dev * sd
+            lower = mb - self.dev * sd
+            width = upper - lower
+            self.value = (close - lower) / width if width else nan
+        return self.value
+
+
+class StreamingVWAP:
+    """Cumulative VWAP on typical price, same definition as vwap()"""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self._pv = 0.0
+        self._vol = 0.0
+        self.value = nan
+
+    def update(self, high: float, low: float, close: float, volume: float) -> float:
+        self._pv += (high + low + close) / 3 * volume
+        self._vol += volume
+        self.value = self._pv / self._vol if self._vol else nan
+        return self.value
+
+
+class IndicatorSet:
+    """The indicators the entry logic needs, fed one closed candle at a time"""
+
+    def __init__(self, atr_win: int = 14, ema_span: int = 200, bb_win: int = 20, bb_dev: int = 2):
+        self.atr = StreamingATR(atr_win)
+        self.ema = StreamingEMA(ema_span)
+        self.bb = StreamingBollinger(bb_win, bb_dev)
+        self.vwap = StreamingVWAP()
+        self.count = 0
+
+    def update(self, open_: float, high: float, low: float, close: float, volume: float = 0.0):
+        self.atr.update(high, low, close)
+        self.ema.update(close)
+        self.bb.update(close)
+        if volume == volume:  # skip NaN volume
+            self.vwap.update(high, low, close, volume)
+        self.count += 1
+        return self
@@ -0,0 +1,90 @@
+"""
+Open grid rungs, keyed by the client order ID of each rung's SELL and
+indexed by buy price.
+"""
+import bisect
+from dataclasses import dataclass
+
+from bot.core.order_mgr import TICK
+
+
+@dataclass
+class Ladder:
+    buy: float
+    sell: float
+    qty: float
+    order_id: str = None   # client order ID of the resting SELL
+    filled: float = 0.0    # quantity of that SELL already filled (partial fills)
+
+
+class LadderBook:
+    """Filled BUY rungs waiting for their SELL.
+
+    * lookup by order ID is an O(1) dict get; price lookups are an
+      O(log n) bisect into the sorted price index
+    * adding or removing a rung also inserts into / deletes from that index
+      list: O(log n) to find the slot plus an O(n) memmove, which at grid
+      sizes (tens of rungs) costs less than a balanced tree would
+    * ``used`` (quote tied up in rungs) is kept as a running total, so
+      capital checks don't re-sum the book on every tick
+    * iteration and indexing go lowest buy price first
+    """
+
+    def __init__(self):
+        self._rungs = {}        # order_id -> Ladder
+        self._index = []        # sorted (buy, order_id)
+        self.used = 0.0
+        self._anon = 0
+
+    def add(self, ladder: Ladder) -> str:
+        if ladder.order_id is None:
+            self._anon += 1
+            ladder.order_id = f"anon-{self._anon}"
+        if ladder.order_id in self._rungs:
+            raise KeyError(f"duplicate ladder order id {ladder.order_id}")
+        self._rungs[ladder.order_id] = ladder
+        bisect.insort(self._index, (ladder.buy, ladder.order_id))
+        self.used += ladder.buy*ladder.qty
+        return ladder.order_id
+
+    def get(self, order_id) -> Ladder:
+        return self._rungs.get(order_id)
+
+    def pop(self, order_id) -> Ladder:
+        """Remove and return the rung whose SELL has this ID (None if unknown)"""
+        ladder = self._rungs.pop(order_id, None)
+        if ladder is None:
+            return None
+        i = bisect.bisect_left(self._index, (ladder.buy, order_id))
+        del self._index[i]
+        self.used -= ladder.buy*ladder.qty
+        if not self._rungs:
+            self.used = 0.0     # drop accumulated float error
+        return ladder
+
+    def find(self, buy_price: float, qty: float = None):
+        """Order ID of a rung bought at ``buy_price`` (to the tick), optionally with ``qty``"""
+        i = bisect.bisect_left(self._index, (buy_price - TICK/2,))
+        while i < len(self._index) and self._index[i][0] <= buy_price + TICK/2:
+            order_id = self._index[i][1]
+            if qty is None or self._rungs[order_id].qty == qty:
+                return order_id
+            i += 1
+        return None
+
+    def clear(self):
+        self._rungs.clear()
+        self._index.clear()
+        self.used = 0.0
+
+    def __len__(self):
+        return len(self._rungs)
+
+    def __iter__(self):
+        return (self._rungs[order_id] for _, order_id in self._index)
+
+    def __getitem__(self, i: int) -> Ladder:
+        return self._rungs[self._index[i][1]]
+
+    def __contains__(self, order_id):
+        return order_id in self._rungs
@@ -0,0 +1,155 @@
+"""
+Quote capital of one grid, kept as running totals so capacity checks are O(1).
+
+    reserved   BUY orders sent (or about to be) but not yet acknowledged
+    locked     acknowledged BUYs resting on the book
+    deployed   quote spent on filled BUYs (the LadderBook's ``used``)
+    cash       the exchange's free quote balance, as last reconciled and
+               adjusted by our own acks, fills and cancels since
+
+The exchange's free balance already excludes locked orders, so what a new
+BUY may spend is ``min(cap - deployed - reserved - locked, cash - reserved)``.
+``cash`` is unknown (None) until the first reconcile; then only the cap applies.
+"""
+import threading
+import time
+
+
+class CapitalLedger:
+    """Resting BUY orders (client order ID -> notional) and the totals derived from them.
+
+    Acks and rejects arrive on the order executor's thread, fills on the
+    user stream's, so every update holds ``lock``.
+    """
+
+    def __init__(self):
+        self._orders = {}           # client order ID -> [notional, acked]
+        self.reserved = 0.0
+        self.locked = 0.0
+        self.cash = None
+        self.changed = 0.0          # monotonic time of the last local cash adjustment
+        self.drift = 0.0            # cash correction applied by the last reconcile
+        self.lock = threading.Lock()
+
+    @property
+    def committed(self) -> float:
+        """Quote held by resting BUYs, acknowledged or not"""
+        return self.reserved + self.locked
+
+    def available(self, cap: float, deployed: float) -> float:
+        """Quote a new BUY may use"""
+        free = cap - deployed - self.reserved - self.locked
+        return free if self.cash is None else min(free, self.cash - self.reserved)
+
+    # ---- order lifecycle -------------------------------------------------------
+    def reserve(self, order_id: str, notional: float, acked: bool = False):
+        """Book a BUY intent (``acked`` for orders already on the book, e.g. after a restore)"""
+        with self.lock:
+            if order_id in self._orders:
+                return
+            self._orders[order_id] = [notional, acked]
+            if acked:
+                self.locked += notional
+            else:
+                self.reserved += notional
+
+    def ack(self, order_id: str):
+        """The exchange accepted the order: its quote moves from reserved to locked"""
+        with self.lock:
+            order = self._orders.get(order_id)
+            if order is None or order[1]:
+                return
+            order[1] = True
+            self.reserved -= order[0]
+            self.locked += order[0]
+            self._spend(order[0])
+            self._settle()
+
+    def release(self, order_id: str) -> float:
+        """The order was rejected, cancelled or expired; returns its notional (0 if unknown)"""
+        with self.lock:
+            order = self._orders.pop(order_id, None)
+            if order is None:
+                return 0.0
+            notional, acked = order
+            if acked:
+                self.locked -= notional
+                self._spend(-notional)
+            else:
+                self.reserved -= notional
+            self._settle()
+            return notional
+
+    def fill(self, order_id: str, quote: float) -> float:
+        """A BUY filled for ``quote``; returns the notional it had reserved (0 if it wasn't ours)"""
+        with self.lock:
+            order = self._orders.pop(order_id, None)
+            notional, acked = order if order is not None else (0.0, False)
+            if acked:
+                self.locked -= notional
+                self._spend(quote - notional)   # limit price rounding; usually 0
+            else:
+                self.reserved -= notional
+                self._spend(quote)
+            self._settle()
+            return notional
+
+    def credit(self, quote: float):
+        """Proceeds of a SELL fill"""
+        with self.lock:
+            self._spend(-quote)
+
+    def clear(self):
+        """Forget every resting BUY (a new or closed cycle, whose BUYs get
+        cancelled): the quote acknowledged ones locked is cash again"""
+        with self.lock:
+            self._orders.clear()
+            self._spend(-self.locked)
+            self.reserved = self.locked = 0.0
+
+    def _spend(self, quote: float):
+        if self.cash is not None:
+            self.cash -= quote
+            self.changed = time.monotonic()
+
+    def _settle(self):
+        if not self._orders:
+            self.reserved = self.locked = 0.0   # drop accumulated float error
+
+    # ---- reconciliation --------------------------------------------------------
+    def reconcile(self, account, asset: str) -> bool:
+        """Adopt ``account``'s cached free ``asset`` balance if it postdates our
+        last local adjustment (otherwise it may not include our own acks yet).
+        A REST snapshot counts from when it was requested, not when it arrived"""
+        if account.as_of is None or account.as_of <= self.changed:
+            return False
+        cash = account.free(asset)
+        with self.lock:
+            self.drift = 0.0 if self.cash is None else cash - self.cash
+            self.cash = cash
+            self.changed = account.as_of
+        return True
+
+    # ---- mapping view (client order ID -> notional) ----------------------------
+    def acked(self, order_id) -> bool:
+        """Whether the exchange has acknowledged ``order_id`` (False if unknown)"""
+        order = self._orders.get(order_id)
+        return order is not None and order[1]
+
+    def __contains__(self, order_id):
+        return order_id in self._orders
+
+    def __iter__(self):
+        return iter(list(self._orders))
+
+    def __len__(self):
+        return len(self._orders)
+
+    def __getitem__(self, order_id) -> float:
+        return self._orders[order_id][0]
+
+    def keys(self):
+        return list(self._orders)
+
+    def items(self) -> list:
+        return [(order_id, order[0]) for order_id, order in list(self._orders.items())]
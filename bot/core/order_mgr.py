@@ -1,79 +1,234 @@
+from collections import deque
 from dataclasses import dataclass, field
 from datetime import datetime
+import asyncio
 import logging
-from binance.spot import Spot
+import uuid
+from typing import TYPE_CHECKING
 import os, time
 
+from .filters import FilterError, default_filters
+
+if TYPE_CHECKING:
+    from binance.spot import Spot
+
 logger = logging.getLogger(__name__)
-TICK = 0.00001
+TICK = 0.00001      # default tick size, before exchangeInfo is loaded (see core.filters)
+MAX_REPRICE = int(os.getenv("MAX_REPRICE", 20))   # "match and take" retries per order
+EVENTS_MAX = int(os.getenv("ORDER_EVENTS_MAX", 1000))   # recent orders kept in memory (the journal has all)
+
+
+def new_client_order_id(side: str = "") -> str:
+    """Locally generated newClientOrderId, so callers know the ID before the REST call returns"""
+    return f"dgb{side[:1].lower()}-{uuid.uuid4().hex[:24]}"
+
+
+@dataclass
+class OrderOutcome:
+    side: str
+    price: float
+    qty: float
+    response: dict = None
+    error: Exception = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+@dataclass
+class BatchResult:
+    """Per-order outcomes of post_batch, in submission order"""
+    outcomes: list = field(default_factory=list)
+
+    def __iter__(self):
+        return iter(self.outcomes)
+
+    def __len__(self):
+        return len(self.outcomes)
+
+    @property
+    def ok(self) -> list:
+        return [o for o in self.outcomes if o.ok]
+
+    @property
+    def failed(self) -> list:
+        return [o for o in self.outcomes if not o.ok]
+
+    @property
+    def all_ok(self) -> bool:
+        return not self.failed
 
 @dataclass
 class OrderMgr:
     symbol: str = "DOGEFDUSD"  # Your actual trading pair
-    client: Spot = None
-    events: list = field(default_factory=list)
-    
+    client: "Spot" = None
+    events: deque = field(default_factory=lambda: deque(maxlen=EVENTS_MAX))
+    rest: any = None   # AsyncRestClient orders are sent with; by default the process-wide one for client's account
+    journal: any = None  # services.journal.Journal: intents are on disk before they reach the exchange
+    filters: any = None  # core.filters.ExchangeFilters; without it the default tick/step apply
+    quotes: any = None   # services.account.AccountCache: best bid/ask (or last price) for maker-crossing checks
+
     def __post_init__(self):
         if self.client is None:
             # Support both Railway.app and local environment variable names
             api_key = os.getenv("BINANCE_API_KEY") or os.getenv("API_KEY")
             api_secret = os.getenv("BINANCE_API_SECRET") or os.getenv("API_SECRET")
             base_url = os.getenv("BINANCE_BASE_URL") or os.getenv("BASE_URL", "https://testnet.binance.vision")
-            
+
+            from binance.spot import Spot
             self.client = Spot(
                 api_key=api_key,
                 api_secret=api_secret,
                 base_url=base_url)
 
-    def post_limit_maker(self, side: str, price: float, qty: float):
-        price = round(price/TICK)*TICK
-        logger.info(f"🔨 Placing {side.upper()} – price={price:.6f}, qty={qty}")
-        
+    def prepare(self, side: str, price: float, qty: float) -> tuple:
+        """Exchange-exact (price, qty, tick) for a LIMIT_MAKER; raises FilterError
+        for an order the exchange would reject, without a round trip"""
+        rules = self.filters.get(self.symbol) if self.filters is not None else default_filters(self.symbol)
+        book = self.quotes.book(self.symbol) if self.quotes is not None else None
+        last = self.quotes.last_price(self.symbol) if self.quotes is not None and book is None else None
+        price, qty = rules.prepare(side, price, qty, last, book)
+        return price, qty, rules.tick_size
+
+    def _rejected_locally(self, side, price, qty, client_order_id, error: FilterError):
+        logger.warning(f"🚫 {side} {qty} @ {price:.6f} not sent: {error}")
+        self._journal("reject", cid=client_order_id, side=side, price=price, error=str(error))
+
+    def post_limit_maker(self, side: str, price: float, qty: float, client_order_id: str = None):
+        side = side.upper()
         try:
-            resp = self.client.new_order(
-                symbol=self.symbol,
-                side=side,
-                type="LIMIT_MAKER",
-                price=f"{price:.5f}",
-                quantity=f"{qty:.0f}",
-                newOrderRespType="RESULT")
-            
-            # Log successful order
-            if "fills" in resp and resp["fills"]:
-                filled_price = float(resp["fills"][0]["price"])
-                logger.info(f"✅ {side.upper()} filled – price={filled_price:.6f}, qty={qty}")
-            else:
-                logger.info(f"📋 {side.upper()} order placed – price={price:.6f}, qty={qty}")
-            
-            # Record event
-            self.events.append({
-                "time": datetime.utcnow().isoformat(),
-                "action": side.upper(),
-                "price": price,
-                "qty": qty,
-            })
-            
-            return resp
-            
-        except Exception as e:
-            if "match and take" in str(e):
-                offset = -TICK if side == "BUY" else TICK
-                logger.warning(f"⚠️ Order would match, adjusting price by {offset}")
-                time.sleep(0.05)
-                return self.post_limit_maker(side, price+offset, qty)
-            else:
-                logger.error(f"❌ Order failed: {e}")
-                raise
-
-    def cancel_order(self, order_id):
-        """Cancel an order by ID"""
+            price, qty, tick = self.prepare(side, price, qty)
+        except FilterError as e:
+            self._rejected_locally(side, price, qty, client_order_id, e)
+            raise
+        logger.info(f"🔨 Placing {side} – price={price}, qty={qty}")
+        intent = self._journal("intent", wait=True, side=side, price=float(price), qty=float(qty),
+                               cid=client_order_id)
+        from bot.services.rest import run_async
+        return run_async(self._place(self._rest_client(), side, price, qty, tick, client_order_id, intent))
+
+    def cancel_order(self, order_id=None, client_order_id=None):
+        """Cancel an order by exchange ID or client order ID"""
+        from bot.services.rest import run_async
         try:
-            resp = self.client.cancel_order(
-                symbol=self.symbol,
-                orderId=order_id
-            )
-            logger.info(f"🗑️ Order cancelled – ID={order_id}")
+            resp = run_async(self._rest_client().cancel_order(
+                symbol=self.symbol, orderId=order_id, origClientOrderId=client_order_id))
+            logger.info(f"🗑️ Order cancelled – ID={order_id or client_order_id}")
+            self._journal("cancel", oid=order_id, cid=client_order_id)
             return resp
         except Exception as e:
             logger.error(f"❌ Cancel order failed: {e}")
-            return None
\ No newline at end of file
+            return None
+
+    def cancel_batch(self, client_order_ids) -> list:
+        """Cancel several orders concurrently; returns each response (None if that cancel failed)"""
+        client_order_ids = list(client_order_ids)
+        if not client_order_ids:
+            return []
+        from bot.services.rest import run_async
+        return run_async(self._cancel_batch(client_order_ids))
+
+    async def _cancel_batch(self, client_order_ids) -> list:
+        rest = self._rest_client()
+
+        async def cancel(client_order_id):
+            try:
+                resp = await rest.cancel_order(symbol=self.symbol, origClientOrderId=client_order_id)
+            except Exception as e:
+                logger.error(f"❌ Cancel {client_order_id} failed: {e}")
+                return None
+            self._journal("cancel", cid=client_order_id)
+            return resp
+        results = await asyncio.gather(*(cancel(order_id) for order_id in client_order_ids))
+        logger.info(f"🗑️ Cancelled {sum(r is not None for r in results)}/{len(results)} orders")
+        return results
+
+    def _journal(self, event: str, wait: bool = False, **fields):
+        if self.journal is not None:
+            return self.journal.append(self.symbol, event, wait=wait, **fields)
+
+    def _record(self, side, price, qty):
+        self.events.append({
+            "time": datetime.utcnow().isoformat(),
+            "action": side.upper(),
+            "price": price,
+            "qty": qty,
+        })
+
+    # ---- batch placement ----------------------------------------------------
+    # Every order call runs on the shared REST loop (services.rest.run_async),
+    # so every symbol's OrderMgr uses one connection pool and one
+    # request-weight budget.
+    def post_batch(self, orders) -> BatchResult:
+        """Place several LIMIT_MAKER orders concurrently.
+
+        ``orders`` is a list of (side, price, qty) or (side, price, qty,
+        client_order_id). Individual failures are reported in the result
+        rather than raised.
+        """
+        orders = list(orders)
+        if not orders:
+            return BatchResult()
+        from bot.services.rest import run_async
+        started = time.perf_counter()
+        if self.journal is not None:
+            # one group commit for the whole batch before anything is sent
+            last = max(self._journal("intent", side=side.upper(), price=price, qty=qty,
+                                     cid=cid[0] if cid else None) for side, price, qty, *cid in orders)
+            self.journal.wait(last)
+        result = run_async(self._post_batch(orders))
+        logger.info(f"📦 Batch of {len(orders)} orders: {len(result.ok)} placed, "
+                    f"{len(result.failed)} failed in {time.perf_counter() - started:.2f}s")
+        return result
+
+    def _rest_client(self):
+        if self.rest is None:
+            from bot.services.rest import get_async_client
+            self.rest = get_async_client(self.client.api_key, self.client.api_secret, self.client.base_url)
+        return self.rest
+
+    async def _post_batch(self, orders) -> BatchResult:
+        rest = self._rest_client()
+        results = await asyncio.gather(
+            *(self._post_limit_maker_async(rest, *order) for order in orders),
+            return_exceptions=True)
+        return BatchResult([
+            OrderOutcome(side, price, qty, error=r) if isinstance(r, BaseException)
+            else OrderOutcome(side, float(r.get("price", price)), qty, response=r)
+            for (side, price, qty, *_), r in zip(orders, results)
+        ])
+
+    async def _post_limit_maker_async(self, rest, side: str, price: float, qty: float,
+                                      client_order_id: str = None):
+        side = side.upper()
+        try:
+            price, qty, tick = self.prepare(side, price, qty)
+        except FilterError as e:
+            self._rejected_locally(side, price, qty, client_order_id, e)
+            raise
+        return await self._place(rest, side, price, qty, tick, client_order_id)
+
+    async def _place(self, rest, side: str, price, qty, tick, client_order_id: str = None, intent=None):
+        # Crossing the book is normally caught by prepare(); this covers a
+        # market that moved since the last price we saw
+        for attempt in range(MAX_REPRICE + 1):
+            try:
+                resp = await rest.new_order(symbol=self.symbol, side=side, type="LIMIT_MAKER",
+                                            price=format(price, "f"), quantity=format(qty, "f"),
+                                            newClientOrderId=client_order_id,
+                                            newOrderRespType="RESULT")
+            except Exception as e:
+                if "match and take" not in str(e) or attempt == MAX_REPRICE:
+                    logger.error(f"❌ {side} {qty} @ {price} failed: {e}")
+                    self._journal("reject", intent=intent, cid=client_order_id, side=side, price=float(price),
+                                  error=str(e))
+                    raise
+                price += -tick if side == "BUY" else tick
+                logger.warning(f"⚠️ Order would match, re-pricing to {price}")
+                continue
+            logger.info(f"📋 {side} order placed – price={price}, qty={qty}")
+            self._record(side, float(price), float(qty))
+            self._journal("ack", intent=intent, oid=resp.get("orderId"),
+                          cid=resp.get("clientOrderId", client_order_id))
+            return resp
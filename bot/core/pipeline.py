@@ -0,0 +1,142 @@
+"""
+Closed-candle processing for one symbol: store the bar, update indicators,
+check the entry conditions and drive the grid strategy.
+
+The live websocket handler and the backtester both feed candles through
+CandlePipeline.on_candle, so they run exactly the same decision code.
+"""
+import os
+import logging
+from datetime import datetime, timezone
+from math import isnan, nan
+
+from bot.core.indicators import IndicatorSet
+from bot.core.signals import EntryParams, entry_signal
+from bot.services.store import CandleStore
+
+logger = logging.getLogger(__name__)
+
+DAILY_TARGET = float(os.getenv("DAILY_TARGET", 6.0))
+MIN_BARS = 20
+
+INTERVAL_MS = {"1m": 60_000, "3m": 180_000, "5m": 300_000, "15m": 900_000,
+               "30m": 1_800_000, "1h": 3_600_000, "4h": 14_400_000, "1d": 86_400_000}
+
+
+class CandlePipeline:
+    def __init__(self, strategy, symbol: str = "DOGEFDUSD", interval: str = "15m",
+                 store: CandleStore = None, indicators: IndicatorSet = None,
+                 daily_target: float = DAILY_TARGET, entry: EntryParams = EntryParams(),
+                 min_bars: int = MIN_BARS):
+        self.strategy = strategy
+        self.symbol = symbol
+        self.interval = interval
+        self.interval_ms = INTERVAL_MS[interval]
+        self.store = CandleStore() if store is None else store
+        self.indicators = IndicatorSet() if indicators is None else indicators
+        self.daily_target = daily_target
+        self.entry = entry
+        self.min_bars = min_bars
+        self._day = None
+
+    def roll_day(self, ts_ms: int):
+        """Reset realised PnL at midnight UTC (the strategy keeps the day, so
+        restored state of the current day is not reset)"""
+        if ts_ms // 86_400_000 == self._day:
+            return
+        self._day = ts_ms // 86_400_000
+        if self.strategy.new_day(self._day):
+            logger.info("🌄 New day reset – realised PnL cleared")
+
+    def on_candle(self, open_time: int, o: float, h: float, l: float, c: float, v: float = nan):
+        """Process one closed candle"""
+        strategy = self.strategy
+        store = self.store
+        # Per-candle INFO logs are skipped when disabled (backtests replay
+        # hundreds of thousands of candles through here)
+        verbose = logger.isEnabledFor(logging.INFO)
+        self.roll_day(open_time + self.interval_ms)
+
+        # Store closed candle data (fixed capacity, oldest bars roll off);
+        # indicators keep updating even while trading is paused
+        if store.append(open_time, o, h, l, c, v):
+            self.indicators.update(o, h, l, c, v)
+
+        if verbose:
+            # Log first successful closed candle
+            if len(store) == 1:
+                logger.info(f"🎯 First closed kline stored: {c} at {datetime.fromtimestamp(open_time / 1000, tz=timezone.utc)}")
+            logger.info(f"💹 Closed {self.interval} candle: {c} (#{len(store)})")
+
+        # pause trading if daily target met
+        if strategy.realised >= self.daily_target:
+            if verbose:
+                logger.info(f"🎯 Daily target ${self.daily_target:.2f} reached – waiting for tomorrow")
+            return
+
+        if len(store) < self.min_bars:
+            if verbose:
+                logger.info(f"⏳ Still collecting candles: {len(store)}/{self.min_bars} needed")
+            return
+
+        ind = self.indicators
+        price   = c
+        atr_now = ind.atr.value
+        bb_now  = ind.bb.value
+        ema_now = ind.ema.value
+
+        # Better ATR debugging
+        if isnan(atr_now):
+            logger.warning(f"⚠️ ATR is NaN, skipping this candle. Available data: {len(store)} candles")
+            return
+
+        if verbose:
+            logger.info(f"📊 Technical Analysis - Price: {price:.6f}, ATR: {atr_now:.6f}, BB: {bb_now:.3f}, EMA_ratio: {price/ema_now:.4f}, VWAP: {ind.vwap.value:.6f}")
+
+        if not strategy.cycle:
+            params = self.entry
+            signal = entry_signal(price, bb_now, ema_now,
+                                  store.recent("high", params.drop_lookback + 1), params)
+            if verbose:
+                logger.info(
+                    f"⏳ Waiting for entry – BB: {bb_now:.3f} ≤ {params.bb_max:.2f}, "
+                    f"EMA: {price/ema_now:.4f} > {params.ema_ratio_min:.2f}, Drop: {signal.drop_ok}"
+                )
+
+            # CRITICAL: Check all conditions and trigger buy if met
+            if signal.enter:
+                logger.info(
+                    f"🎯 ALL CONDITIONS MET! BB={bb_now:.3f} ≤ {params.bb_max:.2f}, "
+                    f"EMA={price/ema_now:.4f} > {params.ema_ratio_min:.2f}, "
+                    f"{params.drop_pct:.0%} Drop=True"
+                )
+                strategy.start_cycle(price, atr_now)
+
+        strategy.on_tick(price, atr_now)
+
+    def warm_up(self, candles) -> int:
+        """Load historical (open_time, o, h, l, c, v) candles, oldest first.
+
+        All but the newest only fill the store and indicators; the newest goes
+        through on_candle, so the first decision happens now rather than on
+        the next close. Returns how many candles were added.
+        """
+        store = self.store
+        candles = [c for c in candles if not len(store) or c[0] > store.last_time()]
+        for open_time, o, h, l, c, v in candles[:-1]:
+            store.append(open_time, o, h, l, c, v)
+            self.indicators.update(o, h, l, c, v)
+        if candles:
+            self.on_candle(*candles[-1])
+        return len(candles)
+
+    def on_price(self, price: float):
+        """Intra-candle price update (tick mode): lets an active ladder place
+        rungs between closes. Indicators and entries stay on candle close."""
+        strategy = self.strategy
+        if not strategy.cycle or strategy.realised >= self.daily_target:
+            return
+        atr_now = self.indicators.atr.value
+        if isnan(atr_now):
+            return
+        strategy.on_tick(price, atr_now)
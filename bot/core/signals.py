@@ -0,0 +1,107 @@
+"""
+Entry conditions for starting a grid cycle.
+
+Shared by the live websocket handler and the backtester so both make the
+same decision from the same inputs. ``entry_signal`` evaluates one bar,
+``entry_signals`` whole arrays; both go through ``_evaluate`` so they
+cannot drift apart.
+"""
+from dataclasses import dataclass
+from math import nan
+from typing import NamedTuple
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from bot.core.indicators import atr_kernel, boll_pct_kernel, ema_kernel
+
+# More flexible entry conditions for testing:
+# Original: bb <= 0.15 and price > 0.97 * ema
+BB_MAX = 0.30          # Increased from 0.15 to 0.30
+EMA_RATIO_MIN = 0.95   # Decreased from 0.97 to 0.95
+DROP_PCT = 0.02        # Require 2% pullback
+DROP_LOOKBACK = 2
+
+
+@dataclass(frozen=True)
+class EntryParams:
+    bb_max: float = BB_MAX
+    ema_ratio_min: float = EMA_RATIO_MIN
+    drop_pct: float = DROP_PCT
+    drop_lookback: int = DROP_LOOKBACK
+
+
+class EntrySignal(NamedTuple):
+    """Condition flags: plain bools for one bar, boolean arrays for a series"""
+    bb_ok: bool
+    ema_ok: bool
+    drop_ok: bool
+
+    @property
+    def enter(self):
+        return self.bb_ok & self.ema_ok & self.drop_ok
+
+
+def _evaluate(price, bb, ema, recent_high, params: EntryParams) -> EntrySignal:
+    # Works on floats and arrays alike; NaN inputs (warm-up) compare False
+    return EntrySignal(
+        bb_ok=bb <= params.bb_max,
+        ema_ok=price > params.ema_ratio_min * ema,
+        drop_ok=(recent_high - price) / recent_high >= params.drop_pct,
+    )
+
+
+def check_recent_drop(highs, close: float, params: EntryParams = EntryParams()) -> bool:
+    """Ensure we're buying the dip, not buying strength.
+
+    ``highs`` are the most recent highs, oldest first, ending at the current bar.
+    """
+    return bool(_evaluate(close, nan, nan, _recent_high(highs, params.drop_lookback), params).drop_ok)
+
+
+def _recent_high(highs, lookback: int) -> float:
+    # Highest of the last ``lookback`` highs; needs ``lookback + 1`` bars of history
+    if len(highs) < lookback + 1:
+        return nan
+    return max(highs[-lookback:])
+
+
+def recent_highs(high, lookback: int = DROP_LOOKBACK) -> np.ndarray:
+    """Per-bar ``_recent_high`` over a whole series (NaN until lookback + 1 bars)"""
+    high = np.asarray(high, dtype=np.float64)
+    out = np.full(len(high), np.nan)
+    if len(high) > lookback:
+        out[lookback:] = sliding_window_view(high, lookback).max(axis=1)[1:]
+    return out
+
+
+def entry_signal(price: float, bb: float, ema: float, highs,
+                 params: EntryParams = EntryParams()) -> EntrySignal:
+    """Evaluate BB %B, EMA ratio and recent-drop conditions for the current bar"""
+    return _evaluate(price, bb, ema, _recent_high(highs, params.drop_lookback), params)
+
+
+def entry_signals(close, high, bb, ema, params: EntryParams = EntryParams()) -> EntrySignal:
+    """Evaluate the entry conditions for every bar; fields are boolean arrays"""
+    close = np.asarray(close, dtype=np.float64)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return _evaluate(close, np.asarray(bb), np.asarray(ema),
+                         recent_highs(high, params.drop_lookback), params)
+
+
+def scan_entries(high, low, close, params: EntryParams = EntryParams(), min_bars: int = 20,
+                 atr_win: int = 14, ema_span: int = 200, bb_win: int = 20, bb_dev: int = 2) -> np.ndarray:
+    """Bars where the live bot would have seen an entry signal.
+
+    Computes the indicators with the batch kernels and applies the same
+    warm-up gating as CandlePipeline (``min_bars`` candles and a valid ATR).
+    It ignores whether a cycle was already running or the daily target was
+    hit, so it answers "how often did the conditions line up", not "how many
+    cycles would have started".
+    """
+    close = np.asarray(close, dtype=np.float64)
+    signal = entry_signals(close, high, boll_pct_kernel(close, bb_win, bb_dev),
+                           ema_kernel(close, ema_span), params)
+    ready = ~np.isnan(atr_kernel(high, low, close, atr_win))
+    ready[:min_bars - 1] = False
+    return signal.enter & ready
@@ -1,7 +1,13 @@
 import os
 import logging
+import time
+from collections import deque
+from concurrent.futures import Future
 from dataclasses import dataclass, field
-from .indicators import vwap
+from .filters import FilterError
+from .ladder import Ladder, LadderBook
+from .ledger import CapitalLedger
+from .order_mgr import BatchResult, new_client_order_id
 
 # Import notifications
 try:
@@ -12,12 +18,7 @@ except ImportError:
     def notify_target_hit(*args, **kwargs): pass
 
 logger = logging.getLogger(__name__)
-
-@dataclass
-class Ladder:
-    buy: float
-    sell: float
-    qty: float
+SELL_RETRY_SECS = float(os.getenv("SELL_RETRY_SECS", 5))   # re-post a rung's failed SELL this often
 
 @dataclass
 class GridStrategy:
@@ -27,55 +28,290 @@ class GridStrategy:
     qty_inc: int = int(os.getenv("QTY_INC", 50))
     profit_target: float = float(os.getenv("PROFIT_TARGET", 6))
     fdusd_cap: float = float(os.getenv("FDUSD_CAP", 1100))
+    notify: bool = True  # send Discord/Telegram messages (off for backtests)
+    preplace: int = int(os.getenv("LADDER_PREPLACE", 0))  # BUY rungs to rest in the book at cycle start
+    journal: any = None  # services.journal.Journal; its events replay into this state
+    account: any = None  # services.account.AccountCache; the ledger reconciles its cash against it
+    quote_asset: str = "FDUSD"
 
-    ladders: list = field(default_factory=list)
+    ladders: LadderBook = field(default_factory=LadderBook)
     realised: float = 0.0
+    day: int = None     # UTC day (days since the epoch) realised PnL is counted for
     cycle: bool = False
     step: float = None
     next_buy: float = None
     qty_next: int = None
+    ledger: CapitalLedger = field(default_factory=CapitalLedger)  # resting BUYs and exchange cash
+    _placing: str = field(default=None, init=False, repr=False)    # tick BUY in flight (client order ID)
+    unplaced: dict = field(default_factory=dict)  # rung SELL order ID -> monotonic time to retry its SELL
+    liquidating: dict = field(default_factory=dict)  # close_all SELL order ID -> Ladder of what it sells
+    _done: deque = field(default_factory=deque, init=False, repr=False)  # finished order calls, see settle_orders
 
     def start_cycle(self, price, atr):
         logger.info(f"🔔 ▶️  Cycle START – entry={price:.6f}, ATR={atr:.6f}")
         self.cycle = True
         self.realised = 0
         self.ladders.clear()
+        self.unplaced.clear()
+        self.ledger.clear()
         self.step = self.step_mult*atr
         self.qty_next = self.qty0
         self.next_buy = price - self.step
+        self._journal("cycle", price=price, step=self.step, next_buy=self.next_buy, qty_next=self.qty_next,
+                      day=self.day)
+        if self.preplace:
+            self.place_rungs(self.preplace)
+
+    def new_day(self, day: int) -> bool:
+        """Start counting realised PnL for UTC ``day``; False if it already is
+        (e.g. state restored on the same day)"""
+        if self.day is not None and day <= self.day:
+            return False
+        self.day = day
+        self.realised = 0.0
+        self._journal("day", day=day)
+        return True
+
+    def place_rungs(self, n):
+        """Rest the next ``n`` affordable BUY rungs in the book in one batch"""
+        orders = []
+        budget = self.funds_free()
+        while len(orders) < n and self.next_buy > 0 and budget >= self.next_buy*self.qty_next:
+            order_id = new_client_order_id("BUY")
+            orders.append(("BUY", self.next_buy, self.qty_next, order_id))
+            self.ledger.reserve(order_id, self.next_buy*self.qty_next)
+            budget -= self.next_buy*self.qty_next
+            self.next_buy -= self.step
+            self.qty_next += self.qty_inc
+            self._journal("rung", price=orders[-1][1], qty=orders[-1][2], cid=order_id,
+                          next_buy=self.next_buy, qty_next=self.qty_next)
+        if orders:
+            logger.info(f"🪜 Pre-placing {len(orders)} BUY rungs down to {orders[-1][1]:.6f}")
+            order_ids = [order_id for *_, order_id in orders]
+            try:
+                result = self.order_mgr.post_batch(orders)
+            except Exception:
+                for order_id in order_ids:
+                    self.ledger.release(order_id)
+                raise
+            self._settle(result, order_ids)
 
     def on_tick(self, price, atr):
-        # fill logic handled by websocket exec reports (see services.websocket)
-        # here only ladder placement
-        if self.cycle and self.next_buy and price <= self.next_buy and \
+        # fills come from user-stream execution reports (see services.user_stream);
+        # here only ladder placement, one BUY rung in flight at a time
+        self.settle_orders()
+        if self.unplaced:
+            self.retry_sells()
+        if self.cycle and self.next_buy and self._placing is None and price <= self.next_buy and \
            self.funds_free() >= self.next_buy*self.qty_next:
-            self.order_mgr.post_limit_maker("BUY", self.next_buy, self.qty_next)
+            order_id = new_client_order_id("BUY")
+            buy, qty = self.next_buy, self.qty_next
+            self.ledger.reserve(order_id, buy*qty)
+            self._placing = order_id
+            placed = lambda error: self._rung_placed(order_id, buy, qty, error)
+            try:
+                result = self.order_mgr.post_limit_maker("BUY", buy, qty, client_order_id=order_id)
+            except Exception as e:
+                self._settle(e, [order_id], placed)
+                raise
+            self._settle(result, [order_id], placed)
+
+    def _rung_placed(self, order_id, buy, qty, error):
+        """Move the ladder on once a tick BUY is accepted. After a failure the
+        level is tried again on a later tick, unless the exchange filters rule
+        it out (that would never pass, so it is skipped)."""
+        if self.next_buy == buy and (error is None or isinstance(error, FilterError)):
             self.next_buy -= self.step
             self.qty_next += self.qty_inc
+            self._journal("rung", price=buy, qty=qty, cid=None if error else order_id,
+                          next_buy=self.next_buy, qty_next=self.qty_next)
+        elif error is not None:
+            logger.warning(f"⚠️ BUY rung {qty} @ {buy:.6f} not placed, will retry: {error}")
+        self._placing = None
+
+    def _settle(self, result, order_ids, then=None):
+        """Ack or release reserved BUYs once their REST call completes: ``result``
+        is an OrderExecutor Future, or the order manager's direct return value.
+        ``then(error)`` runs afterwards (error is None on success)."""
+        if isinstance(result, Future):
+            self._when_done(result, lambda f: self._settle(f.exception() or f.result(), order_ids, then))
+            return
+        if isinstance(result, BaseException):
+            for order_id in order_ids:
+                self.ledger.release(order_id)
+        elif isinstance(result, BatchResult):
+            for order_id, outcome in zip(order_ids, result):
+                if outcome.ok:
+                    self.ledger.ack(order_id)
+                else:
+                    self.ledger.release(order_id)
+        elif result is not None:
+            for order_id in order_ids:
+                self.ledger.ack(order_id)
+        if then is not None:
+            then(result if isinstance(result, BaseException) else None)
+
+    def _when_done(self, future, fn):
+        # the executor completes futures on its own thread; fn(future) runs
+        # later from settle_orders, on the thread that owns the strategy
+        future.add_done_callback(lambda f: self._done.append((f, fn)))
+
+    def settle_orders(self) -> int:
+        """Apply the outcome of order calls the executor has finished (acks,
+        rejects, failed SELLs); returns how many. The caller holds the lock
+        that serialises candles and fills (SymbolRunner runs this after each
+        executor request)."""
+        settled = 0
+        while self._done:
+            future, fn = self._done.popleft()
+            fn(future)
+            settled += 1
+        return settled
+
+    @property
+    def pending_buys(self) -> float:
+        """Quote committed to resting BUYs"""
+        return self.ledger.committed
 
     def funds_free(self):
-        used = sum(l.buy*l.qty for l in self.ladders)
-        return self.fdusd_cap - used
+        return self.ledger.available(self.fdusd_cap, self.ladders.used)
+
+    def reconcile_capital(self) -> bool:
+        """Re-base the ledger's cash on the cached exchange balance (memory only)"""
+        if self.account is None:
+            return False
+        return self.ledger.reconcile(self.account, self.quote_asset)
+
+    def handle_buy_fill(self, price, qty, order_id=None):
+        self.ledger.fill(order_id, price*qty)
+        sell_id = new_client_order_id("SELL")
+        ladder = Ladder(price, price+self.step, qty, sell_id)
+        self.ladders.add(ladder)
+        self._journal("buy_fill", price=price, qty=qty, cid=order_id, sell=price+self.step, sell_id=sell_id)
+        self._post_sell(ladder)
+
+    def _post_sell(self, ladder):
+        """Rest a rung's SELL; if it can't be placed the rung stays ``unplaced``
+        and on_tick tries again every SELL_RETRY_SECS"""
+        def placed(error):
+            if error is None:
+                self.unplaced.pop(ladder.order_id, None)
+            elif ladder.order_id in self.ladders:
+                logger.error(f"❌ SELL {ladder.qty} @ {ladder.sell:.6f} not placed, will retry: {error}")
+                self.unplaced[ladder.order_id] = time.monotonic() + SELL_RETRY_SECS
+        try:
+            result = self.order_mgr.post_limit_maker("SELL", ladder.sell, ladder.qty,
+                                                     client_order_id=ladder.order_id)
+        except Exception as e:
+            placed(e)
+            return
+        if isinstance(result, Future):
+            self._when_done(result, lambda f: placed(f.exception()))
+        else:
+            placed(None)
+
+    def retry_sells(self):
+        """Re-post the SELLs of rungs whose placement failed, once their retry time is up"""
+        now = time.monotonic()
+        for order_id, due in list(self.unplaced.items()):
+            ladder = self.ladders.get(order_id)
+            if ladder is None:
+                self.unplaced.pop(order_id, None)
+            elif due <= now:
+                self.unplaced[order_id] = now + SELL_RETRY_SECS     # until this attempt settles
+                self._post_sell(ladder)
 
-    def handle_buy_fill(self, price, qty):
-        self.ladders.append(Ladder(price, price+self.step, qty))
-        self.order_mgr.post_limit_maker("SELL", price+self.step, qty)
+    def handle_buy_cancel(self, order_id):
+        """A resting BUY was cancelled, expired or rejected by the exchange: free its quote"""
+        if order_id in self.ledger:
+            self.ledger.release(order_id)
+            self._journal("release", cid=order_id)
 
-    def handle_sell_fill(self, price, buy_price, qty):
+    def handle_sell_partial(self, order_id, filled_qty):
+        """A rung's SELL has partly filled (``filled_qty`` so far); close_all only sells the rest"""
+        ladder = self.ladders.get(order_id)
+        if ladder is not None:
+            ladder.filled = filled_qty
+
+    def handle_sell_fill(self, price, buy_price=None, qty=None, order_id=None):
+        """Book a rung's SELL fill, identified by its client order ID
+        (or, for older callers, by the rung's buy price and quantity)"""
+        if order_id is None and buy_price is not None:
+            order_id = self.ladders.find(buy_price, qty)
+        ladder = self.ladders.pop(order_id)
+        if ladder is None and order_id in self.liquidating:
+            self._liquidation_fill(price, qty, order_id)
+            return
+        if ladder is None and buy_price is None:
+            logger.info(f"ℹ️ SELL fill for non-ladder order {order_id} – no rung to close")
+            return
+        if ladder is not None:
+            buy_price, qty = ladder.buy, qty or ladder.qty
         profit = (price-buy_price)*qty
         self.realised += profit
-        self.ladders = [l for l in self.ladders if not (l.buy==buy_price and l.qty==qty)]
+        self.ledger.credit(price*qty)
+        self._journal("sell_fill", price=price, qty=qty, cid=order_id, buy=buy_price, realised=self.realised)
         
         logger.info(f"💰 SELL FILL: +${profit:.4f} profit | Total PnL: ${self.realised:.4f} | Target: ${self.profit_target}")
-        notify_trade("SELL", price, qty, self.realised)
+        if self.notify:
+            notify_trade("SELL", price, qty, self.realised)
         
         if self.realised >= self.profit_target:
             logger.info(f"🎯 DAILY TARGET HIT! PnL: ${self.realised:.4f} >= ${self.profit_target} - Closing all positions")
-            notify_target_hit(self.realised, self.profit_target)
+            if self.notify:
+                notify_target_hit(self.realised, self.profit_target)
             self.close_all(price)
 
     def close_all(self, mkt):
-        for l in self.ladders:
-            self.order_mgr.post_limit_maker("SELL", mkt, l.qty)
+        # Cancel every rung SELL (freeing its DOGE) and unfilled pre-placed BUY
+        # in one concurrent batch, then liquidate what the rungs still hold in
+        # another; the executor sends the cancels first
+        rungs = list(self.ladders)
+        cancels = [l.order_id for l in rungs] + list(self.ledger)
+        if cancels:
+            self.order_mgr.cancel_batch(cancels)
+        sells = []
+        for l in rungs:
+            if l.filled:        # the part its SELL already sold is booked at the SELL price
+                self.realised += (l.sell - l.buy)*l.filled
+                self.ledger.credit(l.sell*l.filled)
+                self._journal("sell_fill", price=l.sell, qty=l.filled, cid=l.order_id, buy=l.buy,
+                              realised=self.realised)
+            if l.qty - l.filled > 0:
+                sell_id = new_client_order_id("SELL")
+                self.liquidating[sell_id] = Ladder(l.buy, mkt, l.qty - l.filled, sell_id)
+                sells.append(("SELL", mkt, l.qty - l.filled, sell_id))
+        if sells:
+            self._liquidation_placed(self.order_mgr.post_batch(sells), [order_id for *_, order_id in sells])
         self.ladders.clear()
-        self.cycle=False
\ No newline at end of file
+        self.unplaced.clear()
+        self.ledger.clear()
+        self.cycle=False
+        self._journal("close", price=mkt)
+
+    def _liquidation_placed(self, result, sell_ids):
+        """Forget liquidation SELLs the exchange didn't take (they will never fill)"""
+        if isinstance(result, Future):
+            self._when_done(result, lambda f: self._liquidation_placed(f.exception() or f.result(), sell_ids))
+            return
+        if isinstance(result, BaseException):
+            failed = sell_ids
+        elif isinstance(result, BatchResult):
+            failed = [order_id for order_id, outcome in zip(sell_ids, result) if not outcome.ok]
+        else:
+            failed = []
+        for order_id in failed:
+            self.liquidating.pop(order_id, None)
+
+    def _liquidation_fill(self, price, qty, order_id):
+        """A close_all SELL filled: its proceeds are cash again (realised PnL
+        was settled when the cycle closed)"""
+        ladder = self.liquidating.pop(order_id)
+        qty = qty or ladder.qty
+        self.ledger.credit(price*qty)
+        self._journal("sell_fill", price=price, qty=qty, cid=order_id, buy=ladder.buy, realised=self.realised)
+        logger.info(f"💸 Liquidation SELL filled: {qty} @ {price:.6f} ({(price - ladder.buy)*qty:+.4f} vs. its BUY)")
+
+    def _journal(self, event, **fields):
+        if self.journal is not None:
+            self.journal.append(self.order_mgr.symbol, event, **fields)
\ No newline at end of file
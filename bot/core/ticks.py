@@ -0,0 +1,61 @@
+"""
+Coalescing for high-rate price streams (bookTicker / aggTrade).
+
+A burst of updates collapses to its newest value: the callback runs at
+most once per ``interval`` seconds, and a trailing timer makes sure the
+last price of a burst is still delivered.
+"""
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class TickCoalescer:
+    def __init__(self, fn, interval: float, clock=time.monotonic):
+        self.fn = fn
+        self.interval = interval
+        self.clock = clock
+        self.received = 0
+        self.delivered = 0
+        self._lock = threading.Lock()
+        self._latest = None
+        self._pending = False
+        self._last = float("-inf")
+        self._timer = None
+
+    def push(self, value):
+        """Record a new value; delivers immediately if the interval has passed"""
+        with self._lock:
+            self.received += 1
+            self._latest = value
+            self._pending = True
+            wait = self._last + self.interval - self.clock()
+            if wait > 0:
+                if self._timer is None:
+                    self._timer = threading.Timer(wait, self._flush)
+                    self._timer.daemon = True
+                    self._timer.start()
+                return
+        self._flush()
+
+    def _flush(self):
+        with self._lock:
+            self._timer = None
+            if not self._pending:
+                return
+            value, self._pending = self._latest, False
+            self._last = self.clock()
+            self.delivered += 1
+        try:
+            self.fn(value)
+        except Exception as e:
+            logger.error(f"❌ Error processing tick {value}: {e}")
+
+    def cancel(self):
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            self._pending = False
@@ -0,0 +1,234 @@
+"""
+In-memory account balances and prices.
+
+``/api/v3/account`` costs 20 request weight, so balances are fetched on a
+schedule (ACCOUNT_REFRESH_SECS) and otherwise kept current from the user
+stream's ``outboundAccountPosition`` events, which carry the new free/locked
+amounts of every asset an order touched. Prices come from the market stream
+(``set_price``) and fall back to a REST ticker at most every PRICE_TTL_SECS;
+with TICK_STREAM=bookTicker the best bid/ask are cached too (``set_book``).
+
+Concurrent callers that find the cache stale share one REST request
+(``SingleFlight``) instead of each sending their own. ``free()`` and
+``snapshot()`` never touch the network.
+"""
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+
+logger = logging.getLogger(__name__)
+
+ACCOUNT_REFRESH_SECS = float(os.getenv("ACCOUNT_REFRESH_SECS", 60))   # 0 disables the cache
+PRICE_TTL_SECS = float(os.getenv("PRICE_TTL_SECS", 5))
+
+QUOTE_ASSETS = ("FDUSD", "USDT", "USDC", "TUSD", "BUSD", "EUR", "TRY", "BTC", "ETH", "BNB")
+
+
+def quote_asset(symbol: str) -> str:
+    """Quote asset of ``symbol`` (DOGEFDUSD -> FDUSD)"""
+    return next((q for q in QUOTE_ASSETS if symbol.endswith(q) and symbol != q), "FDUSD")
+
+
+@dataclass
+class Balance:
+    free: float
+    locked: float = 0.0
+
+    @property
+    def total(self) -> float:
+        return self.free + self.locked
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Collapses concurrent calls for the same key into one: the first caller
+    runs ``fn``, the others wait for and share its result (or exception)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, fn):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+        try:
+            call.result = fn()
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
+
+
+class AccountCache:
+    """Balances and prices served from memory, refreshed on a schedule and by events"""
+
+    def __init__(self, client=None, ttl: float = ACCOUNT_REFRESH_SECS, price_ttl: float = PRICE_TTL_SECS):
+        self.client = client        # binance Spot client (account, ticker_price, ticker_24hr)
+        self.ttl = ttl
+        self.price_ttl = price_ttl
+        self.balances = {}          # asset -> Balance
+        self.updated = None         # monotonic time of the last snapshot or event
+        self.as_of = None           # monotonic time the balances are known to include (a snapshot's request time)
+        self.update_time = 0        # exchange time (ms) of the newest data applied
+        self.refreshes = 0          # REST snapshots fetched
+        self.events = 0             # outboundAccountPosition events applied
+        self._prices = {}           # symbol -> (price, monotonic time)
+        self._books = {}            # symbol -> (bid, ask, monotonic time)
+        self._tickers = {}          # symbol -> (24h ticker dict, monotonic time)
+        self._lock = threading.Lock()
+        self._flight = SingleFlight()
+        self._wake = threading.Event()
+        self._stopping = False
+        self._thread = None
+
+    # ---- balances --------------------------------------------------------------
+    @property
+    def age(self) -> float:
+        """Seconds since balances were last updated (inf if never)"""
+        return float("inf") if self.updated is None else time.monotonic() - self.updated
+
+    def refresh(self) -> dict:
+        """Fetch a balance snapshot now; concurrent callers share the request"""
+        return self._flight.do("account", self._fetch)
+
+    def _fetch(self) -> dict:
+        sent = time.monotonic()         # the snapshot may miss anything after this
+        account = self.client.account()
+        self.refreshes += 1
+        balances = {b["asset"]: Balance(float(b["free"]), float(b["locked"]))
+                    for b in account["balances"] if float(b["free"]) or float(b["locked"])}
+        with self._lock:
+            if account.get("updateTime", 0) >= self.update_time:
+                self.balances = balances
+                self.update_time = account.get("updateTime", 0)
+                self.as_of = sent
+            else:
+                logger.debug("🔍 Account snapshot is older than the last balance event, kept events")
+            self.updated = time.monotonic()
+            return dict(self.balances)
+
+    def get_balances(self, max_age: float = None) -> dict:
+        """Balances no older than ``max_age`` (default: the refresh interval)"""
+        if self.age > (self.ttl if max_age is None else max_age):
+            return self.refresh()
+        with self._lock:
+            return dict(self.balances)
+
+    def free(self, asset: str):
+        """Cached free amount of ``asset``; None until the first snapshot (never blocks)"""
+        if self.updated is None:
+            return None
+        balance = self.balances.get(asset)
+        return balance.free if balance is not None else 0.0
+
+    def on_account_position(self, event: dict):
+        """Apply an ``outboundAccountPosition`` user-stream event in place"""
+        with self._lock:
+            if event.get("u", 0) < self.update_time:
+                return
+            for b in event["B"]:
+                self.balances[b["a"]] = Balance(float(b["f"]), float(b["l"]))
+            self.update_time = event.get("u", 0)
+            self.updated = self.as_of = time.monotonic()
+            self.events += 1
+
+    # ---- prices ------------------------------------------------------------------
+    def set_price(self, symbol: str, price: float):
+        """Latest price seen on the market stream"""
+        self._prices[symbol] = (price, time.monotonic())
+
+    def last_price(self, symbol: str):
+        """Cached price of ``symbol`` if fresh, else None (never blocks)"""
+        cached = self._prices.get(symbol)
+        if cached is not None and time.monotonic() - cached[1] <= self.price_ttl:
+            return cached[0]
+        return None
+
+    def set_book(self, symbol: str, bid: float, ask: float):
+        """Best bid/ask seen on the bookTicker stream"""
+        self._books[symbol] = (bid, ask, time.monotonic())
+
+    def book(self, symbol: str):
+        """Cached ``(bid, ask)`` of ``symbol`` if fresh, else None (never blocks)"""
+        cached = self._books.get(symbol)
+        if cached is not None and time.monotonic() - cached[2] <= self.price_ttl:
+            return cached[:2]
+        return None
+
+    def price(self, symbol: str) -> float:
+        """Last price of ``symbol``: from memory when fresh, else one shared REST call"""
+        cached = self._prices.get(symbol)
+        if cached is not None and time.monotonic() - cached[1] <= self.price_ttl:
+            return cached[0]
+
+        def fetch():
+            price = float(self.client.ticker_price(symbol=symbol)["price"])
+            self.set_price(symbol, price)
+            return price
+        return self._flight.do(("price", symbol), fetch)
+
+    def ticker_24hr(self, symbol: str) -> dict:
+        """24h ticker of ``symbol`` (also refreshes its price), cached for the price TTL"""
+        cached = self._tickers.get(symbol)
+        if cached is not None and time.monotonic() - cached[1] <= self.price_ttl:
+            return cached[0]
+
+        def fetch():
+            ticker = self.client.ticker_24hr(symbol=symbol)
+            now = time.monotonic()
+            self._tickers[symbol] = (ticker, now)
+            self._prices[symbol] = (float(ticker["lastPrice"]), now)
+            return ticker
+        return self._flight.do(("24hr", symbol), fetch)
+
+    def snapshot(self) -> dict:
+        """Everything cached, for /status; no REST calls"""
+        with self._lock:
+            balances = {asset: {"free": b.free, "locked": b.locked, "total": b.total}
+                        for asset, b in self.balances.items()}
+        return {"balances": balances, "age": None if self.updated is None else round(self.age, 3),
+                "prices": {symbol: price for symbol, (price, _) in self._prices.items()}}
+
+    # ---- scheduled refresh -------------------------------------------------------
+    def start(self) -> "AccountCache":
+        if self._thread is None:
+            self._stopping = False
+            self._thread = threading.Thread(target=self._run, daemon=True, name="account-refresh")
+            self._thread.start()
+        return self
+
+    def _run(self):
+        while not self._stopping:
+            try:
+                self.refresh()
+            except Exception as e:
+                logger.warning(f"⚠️ Could not refresh account balances: {e}")
+            self._wake.wait(self.ttl)
+            self._wake.clear()
+
+    def stop(self):
+        if self._thread is not None:
+            self._stopping = True
+            self._wake.set()
+            self._thread.join()
+            self._thread = None
@@ -0,0 +1,230 @@
+"""
+Decoding for market-data and user-data stream messages.
+
+The backend is the fastest one installed (override with JSON_DECODER):
+
+* ``msgspec`` – typed Struct schemas for kline, aggTrade, bookTicker and
+  executionReport payloads; only the fields the bot reads are materialised
+* ``orjson``  – fast parse to dicts
+* ``json``    – stdlib fallback
+
+Most kline messages are in-flight updates (``"x":false``) that the bot
+drops, so ``decode_market`` rejects them with a substring test before
+parsing anything.
+
+    python -m bot.services.codec tests/data/market_stream.jsonl
+"""
+import argparse
+import json
+import os
+import time
+from typing import NamedTuple, Optional
+
+try:
+    import msgspec
+except ImportError:         # optional: pip install msgspec
+    msgspec = None
+
+try:
+    import orjson
+except ImportError:         # optional: pip install orjson
+    orjson = None
+
+BACKENDS = [name for name, module in [("msgspec", msgspec), ("orjson", orjson)] if module] + ["json"]
+
+# In-flight kline markers, compact (exchange) and spaced (json.dumps) forms
+_OPEN_KLINE = ('"x":false', '"x": false')
+
+
+class Candle(NamedTuple):
+    symbol: str
+    open_time: int
+    open: float
+    high: float
+    low: float
+    close: float
+    volume: float
+    closed: bool
+
+
+def kline_closed(raw: str) -> bool:
+    """Pre-filter: False for an in-flight kline update (no parse needed)"""
+    return not any(marker in raw for marker in _OPEN_KLINE)
+
+
+def report_fields(e: dict) -> tuple:
+    """executionReport dict -> values in ExecutionReport field order"""
+    # Cancels report the cancelled order's client ID in "C"
+    client_id = e.get("C") or e["c"]
+    return (e["s"], client_id, e["S"], e["o"], e["X"], e["x"], int(e["i"]),
+            float(e["p"]), float(e["q"]), float(e["l"]), float(e["L"]),
+            float(e["z"]), float(e["Z"]), float(e.get("n") or 0), e.get("N"),
+            int(e.get("t", -1)), int(e["T"]))
+
+
+if msgspec is not None:
+    # Binance sends prices and quantities as strings; strict=False lets
+    # msgspec convert them to float while decoding.
+    class _Kline(msgspec.Struct):
+        t: int
+        o: float
+        h: float
+        l: float
+        c: float
+        v: float
+        x: bool
+        s: Optional[str] = None
+
+    class _Market(msgspec.Struct):
+        """Union of the kline / aggTrade / bookTicker fields, raw or in a combined envelope"""
+        e: Optional[str] = None
+        s: Optional[str] = None
+        k: Optional[_Kline] = None
+        p: Optional[float] = None       # aggTrade price
+        b: Optional[float] = None       # bookTicker best bid
+        a: Optional[float] = None       # bookTicker best ask (aggTrade ID)
+        data: Optional["_Market"] = None
+
+    class _ExecutionReport(msgspec.Struct):
+        symbol: str = msgspec.field(name="s")
+        client_order_id: str = msgspec.field(name="c")
+        side: str = msgspec.field(name="S")
+        order_type: str = msgspec.field(name="o")
+        status: str = msgspec.field(name="X")
+        execution_type: str = msgspec.field(name="x")
+        order_id: int = msgspec.field(name="i")
+        price: float = msgspec.field(name="p")
+        qty: float = msgspec.field(name="q")
+        last_qty: float = msgspec.field(name="l")
+        last_price: float = msgspec.field(name="L")
+        filled_qty: float = msgspec.field(name="z")
+        filled_quote: float = msgspec.field(name="Z")
+        commission: Optional[float] = msgspec.field(name="n", default=0.0)
+        commission_asset: Optional[str] = msgspec.field(name="N", default=None)
+        trade_id: int = msgspec.field(name="t", default=-1)
+        time: int = msgspec.field(name="T", default=0)
+        orig_client_order_id: str = msgspec.field(name="C", default="")
+
+    class _Event(msgspec.Struct):
+        e: Optional[str] = None
+
+
+class Codec:
+    """One decoding backend; ``backend=None`` picks the fastest installed"""
+
+    def __init__(self, backend: str = None):
+        backend = backend or BACKENDS[0]
+        if backend not in BACKENDS:
+            raise ValueError(f"❌ JSON decoder {backend!r} is not available (have: {', '.join(BACKENDS)})")
+        self.backend = backend
+        if backend == "msgspec":
+            self.loads = msgspec.json.decode
+            self._market = msgspec.json.Decoder(_Market, strict=False)
+            self._report = msgspec.json.Decoder(_ExecutionReport, strict=False)
+            self._event = msgspec.json.Decoder(_Event)
+        elif backend == "orjson":
+            self.loads = orjson.loads
+        else:
+            self.loads = json.loads
+
+    def decode_market(self, raw: str, closed_only: bool = True):
+        """``(symbol, candle, price, ask)`` from a raw or combined-stream message.
+
+        Exactly one of ``candle``/``price`` is set; a bookTicker's price is its
+        best bid and ``ask`` its best ask (None for every other stream). ACKs,
+        unknown events and (with ``closed_only``) in-flight klines give None.
+        """
+        if closed_only and not kline_closed(raw):
+            return None
+        if self.backend == "msgspec":
+            msg = self._market.decode(raw)
+            msg = msg.data or msg
+            if msg.k is not None:
+                k = msg.k
+                return k.s or msg.s, Candle(k.s or msg.s, k.t, k.o, k.h, k.l, k.c, k.v, k.x), None, None
+            if msg.e == "aggTrade":
+                return msg.s, None, msg.p, None
+            if msg.b is not None and msg.a is not None:     # bookTicker has no event type field
+                return msg.s, None, msg.b, msg.a
+            return None
+
+        data = self.loads(raw)
+        payload = data.get("data", data)
+        # Spot WS sends an ACK first: {"result":null}
+        if "result" in payload:
+            return None
+        if "k" in payload:
+            k = payload["k"]
+            symbol = k.get("s") or payload.get("s")
+            return symbol, Candle(symbol, k["t"], *(float(k[x]) for x in "ohlcv"), k["x"]), None, None
+        if payload.get("e") == "aggTrade":
+            return payload.get("s"), None, float(payload["p"]), None
+        if "b" in payload and "a" in payload:
+            return payload.get("s"), None, float(payload["b"]), float(payload["a"])
+        return None
+
+    def decode_user_event(self, raw: str) -> tuple:
+        """``(event type, payload)``: an executionReport's payload is a tuple in
+        ExecutionReport field order, any other event's is its dict"""
+        if self.backend == "msgspec":
+            kind = self._event.decode(raw).e
+            if kind != "executionReport":
+                return kind, self.loads(raw)
+            r = self._report.decode(raw)
+            fields = msgspec.structs.astuple(r)[:-1]
+            if r.orig_client_order_id:
+                fields = (r.symbol, r.orig_client_order_id) + fields[2:]
+            if fields[13] is None:
+                fields = fields[:13] + (0.0,) + fields[14:]
+            return kind, fields
+        event = self.loads(raw)
+        kind = event.get("e")
+        return kind, report_fields(event) if kind == "executionReport" else event
+
+
+codec = Codec(os.getenv("JSON_DECODER") or None)
+decode_market = codec.decode_market
+decode_user_event = codec.decode_user_event
+
+
+def _legacy(raw: str):
+    """The pre-codec handle_kline path: full json.loads, then float() per field"""
+    data = json.loads(raw)
+    payload = data.get("data", data)
+    if "k" in payload and payload["k"]["x"]:
+        k = payload["k"]
+        return tuple(float(k[x]) for x in ["o", "h", "l", "c", "v"])
+
+
+def bench(messages: list, repeat: int = 20) -> dict:
+    """Messages per second for the legacy path and every installed backend"""
+    cases = {"legacy": _legacy}
+    cases.update({name: Codec(name).decode_market for name in BACKENDS})
+    rates = {}
+    for name, fn in cases.items():
+        best = float("inf")
+        for _ in range(repeat):
+            started = time.perf_counter()
+            for raw in messages:
+                fn(raw)
+            best = min(best, time.perf_counter() - started)
+        rates[name] = len(messages) / best
+    return rates
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark stream decoding on captured payloads")
+    parser.add_argument("path", help="one raw websocket message per line")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args(argv)
+
+    with open(args.path) as f:
+        messages = [line.rstrip("\n") for line in f if line.strip()]
+    rates = bench(messages, args.repeat)
+    print(f"📊 {len(messages):,} messages, best of {args.repeat}")
+    for name, rate in rates.items():
+        print(f"   {name:8s} {rate:12,.0f} msg/s   ({rate/rates['legacy']:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""
+Candle history for warm starts.
+
+On boot each symbol loads its last WARM_BARS closed candles, enough to
+settle the EMA-200, so the pipeline can decide on the very first close
+instead of collecting bars for hours. Candles come from a per-symbol
+on-disk cache when there is one (the candle archive, or failing that a
+small .npy file per symbol); whatever the cache is missing is fetched from
+the REST klines endpoint as concurrent pages and written back to it.
+"""
+import asyncio
+import logging
+import os
+import time
+
+import numpy as np
+
+from bot.core.pipeline import INTERVAL_MS
+from bot.services.market_stream import KLINES_LIMIT
+from bot.services.store import HISTORY
+
+logger = logging.getLogger(__name__)
+
+WARM_BARS = int(os.getenv("WARM_BARS", 1000))
+KLINE_CACHE_DIR = os.getenv("KLINE_CACHE_DIR", "/tmp/dogebot_klines")    # "" disables the cache
+
+def to_records(rows) -> np.ndarray:
+    """REST kline rows -> HISTORY records, sorted by open time with duplicates removed"""
+    records = np.array([(r[0], *(float(x) for x in r[1:6])) for r in rows], dtype=HISTORY)
+    return merge(records)
+
+
+def merge(*parts) -> np.ndarray:
+    records = np.concatenate([np.asarray(p, dtype=HISTORY) for p in parts]) if parts else np.empty(0, HISTORY)
+    # last occurrence wins, so fresher data overrides older
+    _, last = np.unique(records["time"][::-1], return_index=True)
+    return records[::-1][last]
+
+
+def last_closed_open(interval: str, now_ms: int = None) -> int:
+    """Open time of the most recent candle that has closed"""
+    now_ms = int(time.time()*1000) if now_ms is None else now_ms
+    step = INTERVAL_MS[interval]
+    return (now_ms // step - 1)*step
+
+
+async def fetch_range(rest, symbol: str, interval: str, start_ms: int, end_ms: int,
+                      limit: int = KLINES_LIMIT) -> np.ndarray:
+    """Klines with ``start_ms <= open_time <= end_ms``, requested as concurrent pages"""
+    step = INTERVAL_MS[interval]
+    if end_ms < start_ms:
+        return np.empty(0, HISTORY)
+    starts = range(start_ms, end_ms + 1, limit*step)
+    pages = await asyncio.gather(*(
+        rest.klines(symbol, interval, startTime=s, endTime=min(s + (limit - 1)*step, end_ms), limit=limit)
+        for s in starts))
+    return to_records([row for page in pages for row in page])
+
+
+class KlineCache:
+    """One .npy file of HISTORY records per symbol and interval"""
+
+    def __init__(self, directory: str = KLINE_CACHE_DIR, max_bars: int = WARM_BARS):
+        self.directory = directory
+        self.max_bars = max_bars
+
+    def path(self, symbol: str, interval: str) -> str:
+        return os.path.join(self.directory, f"{symbol}-{interval}.npy")
+
+    def load(self, symbol: str, interval: str, start: int = None, end: int = None) -> np.ndarray:
+        try:
+            records = np.load(self.path(symbol, interval), allow_pickle=False)
+            if records.dtype != HISTORY:
+                raise ValueError(f"unexpected dtype {records.dtype}")
+            times = records["time"]
+            return records[(times >= (times[0] if start is None else start)) &
+                           (times <= (times[-1] if end is None else end))] if len(records) else records
+        except FileNotFoundError:
+            return np.empty(0, HISTORY)
+        except Exception as e:
+            logger.warning(f"⚠️ Ignoring unreadable kline cache for {symbol} {interval}: {e}")
+            return np.empty(0, HISTORY)
+
+    def save(self, symbol: str, interval: str, records: np.ndarray):
+        """Merge ``records`` into the cached ones"""
+        records = merge(self.load(symbol, interval), records)
+        if self.max_bars:
+            records = records[-self.max_bars:]
+        os.makedirs(self.directory, exist_ok=True)
+        path = self.path(symbol, interval)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            np.save(f, records, allow_pickle=False)
+        os.replace(tmp, path)       # readers never see a half-written file
+
+
+def kline_cache(archive=None):
+    """Warm-start cache: the candle archive when there is one, else the .npy cache (if enabled)"""
+    if archive is not None:
+        return archive
+    return KlineCache() if KLINE_CACHE_DIR else None
+
+
+async def load_history(rest, symbol: str, interval: str, bars: int = WARM_BARS,
+                       cache=None, now_ms: int = None) -> np.ndarray:
+    """The last ``bars`` closed candles: cached ones plus the missing head/tail from REST"""
+    step = INTERVAL_MS[interval]
+    end = last_closed_open(interval, now_ms)
+    start = end - (bars - 1)*step
+
+    cached = cache.load(symbol, interval, start, end) if cache is not None else np.empty(0, HISTORY)
+    if len(cached):
+        ranges = [(start, int(cached["time"][0]) - step), (int(cached["time"][-1]) + step, end)]
+    else:
+        ranges = [(start, end)]
+    fetched = await asyncio.gather(*(fetch_range(rest, symbol, interval, a, b) for a, b in ranges if b >= a))
+    records = merge(cached, *fetched)
+
+    if cache is not None and sum(map(len, fetched)):
+        try:
+            cache.save(symbol, interval, merge(*fetched))
+        except OSError as e:
+            logger.warning(f"⚠️ Could not write kline cache for {symbol}: {e}")
+    logger.info(f"📚 {symbol} {interval}: {len(records)} candles of history "
+                f"({len(cached)} cached, {sum(map(len, fetched))} fetched)")
+    return records[-bars:]
@@ -0,0 +1,327 @@
+"""
+Append-only journal of order and strategy events.
+
+Every record is one compact JSON line in a segment file named after its
+first sequence number (``journal-000000000042.jsonl``):
+
+    {"seq":42,"ts":1718000000.1,"sym":"DOGEFDUSD","ev":"intent","side":"BUY",...}
+
+OrderMgr writes ``intent`` (before the REST call), ``ack``, ``reject`` and
+``cancel``; GridStrategy writes ``cycle``, ``rung``, ``buy_fill``,
+``release``, ``sell_fill``, ``close`` and ``day`` (daily PnL reset), which are
+enough to rebuild its state.
+
+A writer thread does group commit: records appended while it is busy are
+written and fsynced together, so durability costs one fsync per batch, not
+per record. ``append(..., wait=True)`` returns once the record is on disk:
+OrderMgr waits for each intent, so with the journal on every order pays
+up to JOURNAL_COMMIT_MS plus one fsync before it is sent (well under a
+millisecond on local SSD, much more on network storage). That is why it
+is off unless JOURNAL_DIR is set.
+Segments rotate at JOURNAL_SEGMENT_MB; old segments are deleted once every
+symbol with a cycle in the journal (on disk or from this process) has
+started a newer one (replay never needs them) and more than JOURNAL_KEEP
+remain.
+
+Each directory has one writer (a process, or a shard of the supervisor).
+``Journal.replay`` also looks in ``peers`` (the other layouts' directories,
+see ``journal_dirs``), so a symbol that moved when SHARDS changed resumes
+from wherever its latest cycle was journaled; that state is then
+checkpointed into the symbol's new directory.
+"""
+import json
+import logging
+import os
+import threading
+import time
+
+from bot.core.ladder import Ladder
+from bot.services.codec import codec
+
+logger = logging.getLogger(__name__)
+
+JOURNAL_DIR = os.getenv("JOURNAL_DIR", "")     # e.g. /data/journal on a persistent volume; "" disables
+SEGMENT_BYTES = int(float(os.getenv("JOURNAL_SEGMENT_MB", 16))*2**20)
+KEEP_SEGMENTS = int(os.getenv("JOURNAL_KEEP", 4))
+COMMIT_SECS = float(os.getenv("JOURNAL_COMMIT_MS", 2)) / 1000   # group-commit window
+
+_dumps = json.JSONEncoder(separators=(",", ":")).encode
+
+
+def _segment_name(seq: int) -> str:
+    return f"journal-{seq:012d}.jsonl"
+
+
+class Journal:
+    """Group-committing JSONL writer with segment rotation"""
+
+    def __init__(self, directory: str = JOURNAL_DIR, segment_bytes: int = SEGMENT_BYTES,
+                 keep: int = KEEP_SEGMENTS, commit_interval: float = COMMIT_SECS, peers=()):
+        self.directory = directory
+        self.peers = [d for d in peers if os.path.abspath(d) != os.path.abspath(directory)]
+        self.segment_bytes = segment_bytes
+        self.keep = keep
+        self.commit_interval = commit_interval
+        os.makedirs(directory, exist_ok=True)
+        self.segments = self._list_segments()
+        self.seq = self._last_seq()
+        self.durable = self.seq
+        self.commits = 0            # fsyncs
+        self._buffer = []
+        self._cond = threading.Condition()
+        self._write_lock = threading.Lock()     # one commit at a time, in order
+        self._file = None
+        self._size = 0
+        self._cycles = self._scan_cycles()  # symbol -> first seq of the segment holding its last cycle start
+        self._stopping = False
+        self._thread = None
+
+    def _list_segments(self) -> list:
+        """First sequence numbers of the segments on disk, oldest first"""
+        return sorted(int(n[8:-6]) for n in os.listdir(self.directory)
+                      if n.startswith("journal-") and n.endswith(".jsonl"))
+
+    def _path(self, first: int) -> str:
+        return os.path.join(self.directory, _segment_name(first))
+
+    def _scan_cycles(self) -> dict:
+        """The segment of each symbol's last cycle start among the segments on disk"""
+        cycles = {}
+        for first in self.segments:
+            with open(self._path(first), "rb") as f:
+                for line in f:
+                    if b'"ev":"cycle"' in line and line.endswith(b"\n"):
+                        cycles[codec.loads(line)["sym"]] = first
+        return cycles
+
+    def _last_seq(self) -> int:
+        """Last committed sequence number; a torn final line (crash mid-write) is cut off"""
+        if not self.segments:
+            return 0
+        path = self._path(self.segments[-1])
+        with open(path, "rb+") as f:
+            data = f.read()
+            end = data.rfind(b"\n") + 1
+            if end < len(data):
+                logger.warning(f"⚠️ Journal: dropping {len(data) - end} bytes of a torn record in {path}")
+                f.truncate(end)
+        last = data[:end].rstrip(b"\n").rpartition(b"\n")[2]
+        return codec.loads(last)["seq"] if last else self.segments[-1] - 1
+
+    # ---- writing --------------------------------------------------------------
+    def append(self, symbol: str, event: str, wait: bool = False, **fields) -> int:
+        """Journal one event; returns its sequence number"""
+        with self._cond:
+            self.seq += 1
+            seq = self.seq
+            self._buffer.append(_dumps({"seq": seq, "ts": round(time.time(), 3), "sym": symbol,
+                                        "ev": event, **fields}) + "\n")
+            if event == "cycle":
+                self._cycles[symbol] = None     # set to its segment when written
+            self._cond.notify_all()
+        if self._thread is None:
+            self.commit()
+        elif wait:
+            self.wait(seq)
+        return seq
+
+    def wait(self, seq: int, timeout: float = 5.0) -> bool:
+        """Block until ``seq`` has been fsynced"""
+        with self._cond:
+            return self._cond.wait_for(lambda: self.durable >= seq or self._thread is None, timeout)
+
+    def commit(self) -> int:
+        """Write and fsync everything appended so far; returns the number of records"""
+        with self._write_lock:
+            with self._cond:
+                batch, self._buffer = self._buffer, []
+                last = self.seq
+                new_cycles = [s for s, segment in self._cycles.items() if segment is None]
+            if not batch:
+                return 0
+            try:
+                if self._file is None or self._size >= self.segment_bytes:
+                    self._rotate(last - len(batch) + 1)
+                data = "".join(batch).encode()
+                self._file.write(data)
+                self._file.flush()
+                os.fsync(self._file.fileno())
+            except OSError:
+                with self._cond:
+                    self._buffer[:0] = batch    # retried with the next commit
+                raise
+            self._size += len(data)
+            with self._cond:
+                for symbol in new_cycles:
+                    if self._cycles.get(symbol) is None:
+                        self._cycles[symbol] = self.segments[-1]
+                self.durable = last
+                self.commits += 1
+                self._cond.notify_all()
+            return len(batch)
+
+    def _rotate(self, first: int):
+        """Open the segment to append to: the last one after a restart if it has
+        room, otherwise a new one starting at ``first``"""
+        reopen = self._file is None and self.segments and \
+            os.path.getsize(self._path(self.segments[-1])) < self.segment_bytes
+        if self._file is not None:
+            self._file.close()
+        if not reopen:
+            self.segments.append(first)
+        self._file = open(self._path(self.segments[-1]), "ab")
+        self._size = self._file.tell()
+        self._prune()
+
+    def _prune(self):
+        """Delete segments no replay can need, keeping at least ``keep``"""
+        needed = list(self._cycles.values())
+        if any(first is None for first in needed):
+            return
+        oldest_needed = min(needed, default=self.segments[-1])     # no cycles: nothing to replay
+        while len(self.segments) > self.keep and self.segments[0] < oldest_needed:
+            first = self.segments.pop(0)
+            os.remove(self._path(first))
+            logger.info(f"🧹 Journal: removed {_segment_name(first)}")
+
+    # ---- background commits ---------------------------------------------------
+    def start(self) -> "Journal":
+        if self._thread is None:
+            self._stopping = False
+            self._thread = threading.Thread(target=self._run, daemon=True, name="journal")
+            self._thread.start()
+        return self
+
+    def _run(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._buffer or self._stopping)
+                if self._stopping and not self._buffer:
+                    return
+            time.sleep(self.commit_interval)   # let concurrent appends join this commit
+            try:
+                self.commit()
+            except OSError as e:
+                logger.error(f"❌ Journal write failed: {e}")
+                time.sleep(1.0)
+
+    def close(self):
+        if self._thread is not None:
+            with self._cond:
+                self._stopping = True
+                self._cond.notify_all()
+            self._thread.join()
+            self._thread = None
+        self.commit()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    # ---- reading --------------------------------------------------------------
+    def events(self, symbol: str = None, since: int = 0):
+        """Committed records (dicts), oldest first, optionally for one symbol"""
+        return read_events(self.directory, symbol, since)
+
+    def replay(self, symbol: str, strategy) -> int:
+        """Rebuild ``symbol`` from this directory or the peer holding its latest
+        cycle start; state found in a peer is checkpointed here"""
+        source = max([self.directory, *self.peers], key=lambda d: _last_cycle(d, symbol)[1])
+        applied = replay(source, symbol, strategy)
+        if source != self.directory and applied:
+            logger.info(f"📜 {symbol}: resumed from {source}, checkpointing it into {self.directory}")
+            self.checkpoint(symbol, strategy)
+        return applied
+
+    def checkpoint(self, symbol: str, strategy):
+        """Journal ``strategy``'s whole state as a cycle start, so replay needs nothing older"""
+        self.append(symbol, "cycle", step=strategy.step, next_buy=strategy.next_buy, qty_next=strategy.qty_next,
+                    day=strategy.day, realised=strategy.realised,
+                    rungs=[[l.buy, l.sell, l.qty, l.order_id] for l in strategy.ladders],
+                    pending=dict(strategy.ledger.items()))
+        if not strategy.cycle:
+            self.append(symbol, "close")
+
+
+def journal_dirs(root: str) -> list:
+    """``root`` and its subdirectories: where the single-process journal and
+    every supervisor shard's journal live"""
+    if not os.path.isdir(root):
+        return [root]
+    return [root, *sorted(os.path.join(root, n) for n in os.listdir(root)
+                          if os.path.isdir(os.path.join(root, n)))]
+
+
+def read_events(directory: str, symbol: str = None, since: int = 0):
+    segments = sorted(n for n in os.listdir(directory) if n.startswith("journal-") and n.endswith(".jsonl"))
+    starts = [int(n[8:-6]) for n in segments]
+    marker = f'"sym":"{symbol}"'.encode() if symbol else None
+    for i, name in enumerate(segments):
+        if i + 1 < len(starts) and starts[i + 1] <= since:
+            continue
+        with open(os.path.join(directory, name), "rb") as f:
+            for line in f:
+                if not line.endswith(b"\n") or (marker is not None and marker not in line):
+                    continue
+                record = codec.loads(line)
+                if record["seq"] >= since:
+                    yield record
+
+
+def _last_cycle(directory: str, symbol: str) -> tuple:
+    """(seq, ts) of ``symbol``'s latest cycle start ((0, 0) if none), scanning newest segments first"""
+    marker = f'"sym":"{symbol}","ev":"cycle"'.encode()
+    if not os.path.isdir(directory):
+        return 0, 0
+    segments = sorted((n for n in os.listdir(directory) if n.startswith("journal-") and n.endswith(".jsonl")),
+                      reverse=True)
+    for name in segments:
+        with open(os.path.join(directory, name), "rb") as f:
+            hits = [line for line in f if line.endswith(b"\n") and marker in line]
+        if hits:
+            record = codec.loads(hits[-1])
+            return record["seq"], record["ts"]
+    return 0, 0
+
+
+def replay(directory: str, symbol: str, strategy) -> int:
+    """Rebuild ``strategy``'s cycle, rungs, resting BUYs and realised PnL from the
+    journal, starting at the symbol's latest cycle start; returns events applied"""
+    applied = 0
+    for e in read_events(directory, symbol, _last_cycle(directory, symbol)[0]):
+        kind = e["ev"]
+        if kind == "cycle":
+            strategy.cycle = True
+            strategy.realised = e.get("realised", 0.0)      # set by checkpoints only
+            strategy.ladders.clear()
+            strategy.ledger.clear()
+            strategy.step, strategy.next_buy, strategy.qty_next = e["step"], e["next_buy"], e["qty_next"]
+            strategy.day = e.get("day", strategy.day)
+            for buy, sell, qty, sell_id in e.get("rungs", ()):
+                strategy.ladders.add(Ladder(buy, sell, qty, sell_id))
+            for order_id, notional in e.get("pending", {}).items():
+                strategy.ledger.reserve(order_id, notional, acked=True)
+        elif kind == "rung":
+            strategy.next_buy, strategy.qty_next = e["next_buy"], e["qty_next"]
+            if e.get("cid"):
+                strategy.ledger.reserve(e["cid"], e["price"]*e["qty"], acked=True)
+        elif kind == "buy_fill":
+            strategy.ledger.fill(e.get("cid"), e["price"]*e["qty"])
+            strategy.ladders.add(Ladder(e["price"], e["sell"], e["qty"], e["sell_id"]))
+        elif kind == "release":
+            strategy.ledger.release(e["cid"])
+        elif kind == "sell_fill":
+            strategy.ladders.pop(e["cid"])
+            strategy.realised = e["realised"]
+        elif kind == "day":
+            strategy.realised = 0.0
+            strategy.day = e["day"]
+        elif kind == "close":
+            strategy.ladders.clear()
+            strategy.ledger.clear()
+            strategy.cycle = False
+        else:
+            continue
+        applied += 1
+    logger.info(f"📜 {symbol}: replayed {applied} journal events – {len(strategy.ladders)} rungs, "
+                f"realised {strategy.realised:.4f}")
+    return applied
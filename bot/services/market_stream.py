@@ -0,0 +1,161 @@
+"""
+Supervised market-data connection.
+
+StreamSupervisor keeps one combined-stream websocket alive in a loop (no
+recursion): it reconnects with jittered exponential backoff when the
+connection errors, closes or goes quiet for ``stale_after`` seconds, and
+after every (re)connect backfills the closed candles missed while it was
+down from the REST klines endpoint. Live messages that arrive during the
+backfill are held back and replayed after it, so candles reach the
+strategy in order.
+"""
+import asyncio
+import logging
+import os
+import random
+import threading
+import time
+
+from bot.core.pipeline import INTERVAL_MS
+
+logger = logging.getLogger(__name__)
+
+STREAM_URL = os.getenv("STREAM_URL", "wss://stream.binance.com:9443").removesuffix("/ws")
+# Market data comes from the live exchange even when trading on testnet,
+# so backfills read klines from the public live market-data endpoint
+MARKET_REST_URL = os.getenv("MARKET_REST_URL", "https://data-api.binance.vision")
+STREAM_STALE_SECS = float(os.getenv("STREAM_STALE_SECS", 60))
+KLINES_LIMIT = 1000     # max rows per /api/v3/klines request
+
+
+async def fetch_closed_klines(rest, symbol: str, interval: str, start_ms: int,
+                              now_ms: int = None, limit: int = KLINES_LIMIT) -> list:
+    """Every kline opened at or after ``start_ms`` that had closed by ``now_ms``,
+    oldest first, as REST rows ``[open_time, "o", "h", "l", "c", "v", close_time, ...]``"""
+    now_ms = int(time.time()*1000) if now_ms is None else now_ms
+    step = INTERVAL_MS[interval]
+    rows = []
+    while start_ms + step <= now_ms:
+        page = await rest.klines(symbol, interval, startTime=start_ms, limit=limit)
+        rows.extend(r for r in page if r[6] < now_ms)
+        if len(page) < limit:
+            break
+        start_ms = page[-1][0] + step
+    return rows
+
+
+def _connect(stream_url: str, streams: list, on_message, on_close, on_error):
+    from binance.websocket.spot.websocket_stream import SpotWebsocketStreamClient
+
+    ws = SpotWebsocketStreamClient(stream_url=stream_url, on_message=on_message, on_close=on_close,
+                                   on_error=on_error, is_combined=True)
+    ws.subscribe(stream=streams)
+    return ws
+
+
+class StreamSupervisor:
+    """Runs ``on_message(raw)`` for every message of one combined stream, forever"""
+
+    def __init__(self, streams: list, on_message, backfill=None, stream_url: str = STREAM_URL,
+                 stale_after: float = STREAM_STALE_SECS, min_backoff: float = 1.0, max_backoff: float = 60.0,
+                 check_every: float = 5.0, connect=_connect, clock=time.monotonic):
+        self.streams = streams
+        self.on_message = on_message
+        self.backfill = backfill            # async () -> None, run after every connect
+        self.stream_url = stream_url
+        self.stale_after = stale_after
+        self.min_backoff = min_backoff
+        self.max_backoff = max_backoff
+        self.check_every = check_every
+        self.connect = connect
+        self.clock = clock
+        self.connections = 0
+        self.messages = 0
+        self.last_message = None
+        self._closed = False
+        self._stopping = False
+        self._held = None                   # messages received while backfilling
+        self._lock = threading.Lock()
+
+    # ---- connector callbacks (websocket thread) ------------------------------
+    def _on_message(self, _, raw):
+        self.last_message = self.clock()
+        self.messages += 1
+        with self._lock:
+            if self._held is not None:
+                self._held.append(raw)
+                return
+        self.on_message(raw)
+
+    def _on_close(self, _):
+        self._closed = True
+
+    def _on_error(self, _, err):
+        logger.error(f"❌ WS error: {err}")
+
+    # ---- supervision ---------------------------------------------------------
+    async def run(self):
+        backoff = self.min_backoff
+        while not self._stopping:
+            ws = None
+            received = self.messages
+            try:
+                self._closed = False
+                self.last_message = self.clock()
+                with self._lock:
+                    self._held = []
+                logger.info(f"🔌 Connecting market stream ({len(self.streams)} streams)")
+                ws = await asyncio.to_thread(self.connect, self.stream_url, self.streams,
+                                             self._on_message, self._on_close, self._on_error)
+                self.connections += 1
+                logger.info(f"🎉 Market stream connected (#{self.connections})")
+                await self._catch_up()
+                await self._watch()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"❌ Market stream failed: {e}")
+            finally:
+                with self._lock:
+                    self._held = None
+                if ws is not None:
+                    await asyncio.to_thread(ws.stop)
+
+            if self._stopping:
+                break
+            if self.messages > received:
+                backoff = self.min_backoff  # the connection worked; start over
+            delay = backoff*random.uniform(0.5, 1.0)
+            logger.info(f"🔄 Reconnecting market stream in {delay:.1f}s")
+            await asyncio.sleep(delay)
+            backoff = min(backoff*2, self.max_backoff)
+
+    async def _catch_up(self):
+        """Backfill from REST, then replay the live messages held meanwhile"""
+        try:
+            if self.backfill is not None:
+                await self.backfill()
+        except Exception as e:
+            logger.error(f"❌ Candle backfill failed: {e}")
+        while True:
+            with self._lock:
+                held, self._held = self._held, ([] if self._held else None)
+            if not held:
+                return
+            for raw in held:
+                self.on_message(raw)
+
+    async def _watch(self):
+        """Return once the connection closes or stays silent for ``stale_after``"""
+        while not self._stopping:
+            await asyncio.sleep(self.check_every)
+            if self._closed:
+                logger.warning("⚠️ Market stream closed")
+                return
+            idle = self.clock() - self.last_message
+            if idle > self.stale_after:
+                logger.warning(f"⚠️ No market data for {idle:.0f}s – reconnecting")
+                return
+
+    async def stop(self):
+        self._stopping = True
@@ -1,17 +1,303 @@
-from binance.spot import Spot
+"""
+Binance REST access.
+
+``get_client()`` is the original synchronous connector client, built on first
+use (``rest.client`` still works). ``AsyncRestClient`` is the asyncio layer: one pooled keep-alive httpx session per process
+(``get_async_client()``), HMAC request signing, a cap on in-flight requests
+and weight-aware rate limiting driven by the X-MBX-USED-WEIGHT-1M header.
+The shared clients live on one background event loop; threads use them
+through ``run_async()``, other event loops through ``SharedLoopClient``.
+"""
+import asyncio
+import hashlib
+import hmac
+import logging
 import os
+import threading
+import time
+from urllib.parse import urlencode
+
+import httpx
+
+logger = logging.getLogger(__name__)
 
 # Support both Railway.app and local environment variable names
 api_key = os.getenv("BINANCE_API_KEY") or os.getenv("API_KEY")
 api_secret = os.getenv("BINANCE_API_SECRET") or os.getenv("API_SECRET")
 base_url = os.getenv("BASE_URL", "https://testnet.binance.vision")
 
-# Safety check for BASE_URL
-if not base_url or not base_url.startswith("http"):
-    raise ValueError(f"❌ BASE_URL env var missing or wrong: '{base_url}' - should start with 'http'")
 
-print(f"✅ REST API initialized with BASE_URL: {base_url}")
+def check_base_url(url: str) -> str:
+    if not url or not url.startswith("http"):
+        raise ValueError(f"❌ BASE_URL env var missing or wrong: '{url}' - should start with 'http'")
+    return url
+
+
+_client = None
+
+
+def get_client():
+    """Process-wide synchronous Spot client, created (and BASE_URL checked) on first use"""
+    global _client
+    if _client is None:
+        from binance.spot import Spot
+        _client = Spot(api_key=api_key, api_secret=api_secret, base_url=check_base_url(base_url))
+        logger.info(f"✅ REST API initialized with BASE_URL: {base_url}")
+    return _client
+
+
+def __getattr__(name):
+    if name == "client":
+        return get_client()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+# ---------------------------------------------------------------------------
+# asyncio client
+# ---------------------------------------------------------------------------
+REST_MAX_INFLIGHT = int(os.getenv("REST_MAX_INFLIGHT", 10))
+REST_WEIGHT_LIMIT = int(os.getenv("REST_WEIGHT_LIMIT", 6000))   # spot REQUEST_WEIGHT per minute
+REST_WEIGHT_HEADROOM = float(os.getenv("REST_WEIGHT_HEADROOM", 0.9))
+REST_HTTP2 = os.getenv("REST_HTTP2", "0") == "1"
+RECV_WINDOW = int(os.getenv("RECV_WINDOW", 5000))
+
+
+class BinanceAPIError(Exception):
+    """Non-2xx REST response; ``code``/``msg`` come from the Binance error body"""
+
+    def __init__(self, status: int, code=None, msg: str = "", headers=None):
+        self.status = status
+        self.code = code
+        self.msg = msg
+        self.headers = headers or {}
+        super().__init__(f"({status}, {code}, {msg!r})")
+
+
+class WeightLimiter:
+    """Client-side view of the exchange's 1-minute request-weight window.
+
+    Weight is counted locally as requests go out and corrected from the
+    X-MBX-USED-WEIGHT-1M header on every response. A request that would take
+    the window past ``limit * headroom`` waits for the next minute; a 429/418
+    Retry-After blocks everything until it expires.
+    """
+
+    def __init__(self, limit: int = REST_WEIGHT_LIMIT, headroom: float = REST_WEIGHT_HEADROOM,
+                 clock=time.time):
+        self.limit = limit
+        self.budget = limit*headroom
+        self.clock = clock
+        self.used = 0
+        self._window = None
+        self.blocked_until = 0.0
+
+    def _roll(self, now: float):
+        window = int(now // 60)
+        if window != self._window:
+            self._window = window
+            self.used = 0
+
+    def delay(self, weight: int = 1) -> float:
+        """Seconds to wait before ``weight`` can be spent (0 = go now)"""
+        now = self.clock()
+        if now < self.blocked_until:
+            return self.blocked_until - now
+        self._roll(now)
+        if self.used + weight > self.budget and self.used > 0:
+            return (self._window + 1)*60 - now
+        return 0.0
+
+    def spend(self, weight: int = 1):
+        self._roll(self.clock())
+        self.used += weight
+
+    def update(self, headers):
+        """Sync with the exchange's count and honour Retry-After"""
+        used = headers.get("x-mbx-used-weight-1m")
+        if used is not None:
+            self._roll(self.clock())
+            self.used = int(used)
+        retry_after = headers.get("retry-after")
+        if retry_after is not None:
+            self.blocked_until = max(self.blocked_until, self.clock() + float(retry_after))
+
+    async def acquire(self, weight: int = 1):
+        while (wait := self.delay(weight)) > 0:
+            logger.warning(f"⏳ REST weight {self.used}/{self.limit} – waiting {wait:.1f}s")
+            await asyncio.sleep(wait)
+        self.spend(weight)
+
+
+class AsyncRestClient:
+    """Signed Binance REST calls over one pooled keep-alive connection set.
+
+    The underlying httpx session is created on first use and is bound to
+    that event loop; the shared clients live on the REST loop (``run_async``).
+    """
+
+    def __init__(self, api_key: str = None, api_secret: str = None, base_url: str = base_url,
+                 max_inflight: int = REST_MAX_INFLIGHT, limiter: WeightLimiter = None,
+                 http2: bool = REST_HTTP2, timeout: float = 10.0, transport=None):
+        self.api_key = api_key
+        self.api_secret = api_secret
+        self.base_url = base_url.rstrip("/")
+        self.max_inflight = max_inflight
+        self.limiter = limiter or WeightLimiter()
+        self.http2 = http2
+        self.timeout = timeout
+        self._transport = transport
+        self._http = None
+        self._inflight = None
+
+    def _session(self) -> httpx.AsyncClient:
+        if self._http is None:
+            http2 = self.http2
+            if http2:
+                try:
+                    import h2  # noqa: F401
+                except ImportError:
+                    logger.warning("⚠️ REST_HTTP2=1 but the h2 package is missing – using HTTP/1.1")
+                    http2 = False
+            headers = {"X-MBX-APIKEY": self.api_key} if self.api_key else {}
+            self._http = httpx.AsyncClient(
+                base_url=self.base_url, headers=headers, http2=http2, timeout=self.timeout,
+                limits=httpx.Limits(max_connections=self.max_inflight,
+                                    max_keepalive_connections=self.max_inflight),
+                transport=self._transport)
+            self._inflight = asyncio.Semaphore(self.max_inflight)
+        return self._http
+
+    def sign(self, params: dict) -> str:
+        """Query string with timestamp, recvWindow and HMAC-SHA256 signature appended"""
+        if not self.api_secret:
+            raise BinanceAPIError(0, msg="API secret required for signed endpoint")
+        params = {**params, "recvWindow": params.get("recvWindow", RECV_WINDOW),
+                  "timestamp": int(time.time()*1000)}
+        query = urlencode(params)
+        signature = hmac.new(self.api_secret.encode(), query.encode(), hashlib.sha256).hexdigest()
+        return f"{query}&signature={signature}"
+
+    async def request(self, method: str, path: str, params: dict = None,
+                      signed: bool = False, weight: int = 1):
+        """Send one request and return the decoded JSON body"""
+        params = {k: v for k, v in (params or {}).items() if v is not None}
+        query = self.sign(params) if signed else urlencode(params)
+        http = self._session()
+        async with self._inflight:
+            await self.limiter.acquire(weight)
+            resp = await http.request(method, f"{path}?{query}" if query else path)
+        self.limiter.update(resp.headers)
+
+        if resp.status_code >= 400:
+            try:
+                body = resp.json()
+            except ValueError:
+                body = {"msg": resp.text}
+            if resp.status_code in (418, 429):
+                logger.error(f"🚫 REST rate limited ({resp.status_code}), retry after {resp.headers.get('retry-after')}s")
+            raise BinanceAPIError(resp.status_code, body.get("code"), body.get("msg", ""), resp.headers)
+        return resp.json()
+
+    # ---- endpoints -----------------------------------------------------------
+    async def ping(self):
+        return await self.request("GET", "/api/v3/ping")
+
+    async def server_time(self) -> int:
+        return (await self.request("GET", "/api/v3/time"))["serverTime"]
+
+    async def exchange_info(self, symbol: str = None):
+        return await self.request("GET", "/api/v3/exchangeInfo", {"symbol": symbol}, weight=20)
+
+    async def ticker_price(self, symbol: str):
+        return await self.request("GET", "/api/v3/ticker/price", {"symbol": symbol}, weight=2)
+
+    async def klines(self, symbol: str, interval: str, **kwargs):
+        return await self.request("GET", "/api/v3/klines",
+                                  {"symbol": symbol, "interval": interval, **kwargs}, weight=2)
+
+    async def account(self):
+        return await self.request("GET", "/api/v3/account", signed=True, weight=20)
+
+    async def new_order(self, symbol: str, side: str, type: str, **kwargs):
+        return await self.request("POST", "/api/v3/order",
+                                  {"symbol": symbol, "side": side, "type": type, **kwargs}, signed=True)
+
+    async def cancel_order(self, symbol: str, **kwargs):
+        return await self.request("DELETE", "/api/v3/order", {"symbol": symbol, **kwargs}, signed=True)
+
+    async def get_open_orders(self, symbol: str = None):
+        return await self.request("GET", "/api/v3/openOrders", {"symbol": symbol},
+                                  signed=True, weight=6 if symbol else 80)
+
+    # listenKey endpoints take the API key header but no signature
+    async def new_listen_key(self):
+        return await self.request("POST", "/api/v3/userDataStream", weight=2)
+
+    async def renew_listen_key(self, listen_key: str):
+        return await self.request("PUT", "/api/v3/userDataStream", {"listenKey": listen_key}, weight=2)
+
+    async def close_listen_key(self, listen_key: str):
+        return await self.request("DELETE", "/api/v3/userDataStream", {"listenKey": listen_key}, weight=2)
+
+    async def close(self):
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+
+_async_clients = {}             # (API key, base URL) -> AsyncRestClient
+_loop = None
+_shared_lock = threading.Lock()
+
+
+def get_async_client(key: str = None, secret: str = None, url: str = None) -> AsyncRestClient:
+    """Process-wide AsyncRestClient for one account and base URL (by default
+    the usual env vars), so every caller shares its connections and weight
+    budget. Use it from the shared loop: ``run_async(...)``."""
+    if key is None:
+        key, secret = api_key, api_secret
+    url = check_base_url(url or os.getenv("BINANCE_BASE_URL") or base_url)
+    with _shared_lock:
+        client = _async_clients.get((key, url))
+        if client is None:
+            client = _async_clients[(key, url)] = AsyncRestClient(key, secret, base_url=url)
+    return client
+
+
+def _shared_loop() -> asyncio.AbstractEventLoop:
+    global _loop
+    with _shared_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, daemon=True, name="rest-loop").start()
+    return _loop
+
+
+def run_async(coro):
+    """Run ``coro`` on the shared REST event loop (a daemon thread, started on
+    first use) and wait for its result. The shared clients' sessions are bound
+    to that loop, so threads with loops of their own must not await them directly."""
+    return asyncio.run_coroutine_threadsafe(coro, _shared_loop()).result()
+
+
+class SharedLoopClient:
+    """A shared AsyncRestClient for code running on another event loop (the
+    user stream): each endpoint call is awaited on the shared REST loop."""
+
+    def __init__(self, client: AsyncRestClient):
+        self.client = client
+
+    def __getattr__(self, name):
+        attr = getattr(self.client, name)
+        if not asyncio.iscoroutinefunction(attr):
+            return attr
 
-client = Spot(api_key=api_key,
-              api_secret=api_secret,
-              base_url=base_url)
\ No newline at end of file
+        async def call(*args, **kwargs):
+            return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(attr(*args, **kwargs),
+                                                                              _shared_loop()))
+        return call
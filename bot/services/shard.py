@@ -0,0 +1,486 @@
+"""
+Supervisor mode: symbols sharded across worker processes.
+
+    SYMBOLS=DOGEFDUSD,DOGEUSDT,SHIBFDUSD SHARDS=2 python run.py
+
+* one ingestion process owns the combined market-data websocket (under a
+  StreamSupervisor); it parses every message and writes closed candles (and
+  ticks) into the ring of the shard that owns the symbol
+* each worker process owns a shard of SymbolRunners (strategy, pipeline,
+  order executor) plus its own user-data stream for their fills, and
+  drains its ring
+* the supervisor (the FastAPI process) starts and restarts both, and reads
+  the per-symbol stats workers publish into a shared-memory table
+
+Rings are single-producer/single-consumer: only the ingestion process moves
+``head`` and only the worker moves ``tail``, so the candle path needs no
+locks and no pickling.
+"""
+import asyncio
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from math import isnan, nan
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from bot.core.pipeline import INTERVAL_MS
+from bot.services.account import ACCOUNT_REFRESH_SECS, AccountCache
+from bot.services.codec import decode_market
+from bot.services.history import kline_cache
+from bot.services.journal import JOURNAL_DIR, Journal, journal_dirs
+from bot.services.market_stream import MARKET_REST_URL, StreamSupervisor, fetch_closed_klines
+from bot.services.state import REDIS_URL, StateStore
+from bot.services.store import CANDLE_ARCHIVE_DIR, CandleArchive
+from bot.services.symbols import build_registry, parse_symbols, stream_names
+
+logger = logging.getLogger(__name__)
+
+SHARDS = int(os.getenv("SHARDS", 0))                    # 0 = everything in one process
+RING_SIZE = int(os.getenv("SHARD_RING_SIZE", 4096))     # records per shard ring
+POLL_SECS = float(os.getenv("SHARD_POLL_MS", 5)) / 1000
+STATS_SECS = 1.0
+
+CANDLE, TICK = 0, 1
+RECORD = np.dtype([("kind", np.int64), ("symbol", np.int64), ("time", np.int64),
+                   ("open", np.float64), ("high", np.float64), ("low", np.float64),
+                   ("close", np.float64), ("volume", np.float64)])
+STATS = np.dtype([("realised_pnl", np.float64), ("open_ladders", np.float64),
+                  ("cycle_active", np.float64), ("capital_cap", np.float64),
+                  ("funds_free", np.float64), ("candles", np.float64),
+                  ("last_close", np.float64), ("last_open", np.float64),
+                  ("pending_orders", np.float64), ("updated", np.float64)])
+HEAD, TAIL, DROPPED = 0, 1, 2
+HEADER_SLOTS = 8        # int64s; keeps the records cache-line aligned
+
+
+class CandleRing:
+    """Fixed-size ring of RECORDs in shared memory (one producer, one consumer)"""
+
+    def __init__(self, capacity: int = RING_SIZE, name: str = None):
+        self.capacity = capacity
+        self.owner = name is None
+        size = HEADER_SLOTS*8 + capacity*RECORD.itemsize
+        self.shm = shared_memory.SharedMemory(name=name, create=self.owner, size=size if self.owner else 0)
+        self._header = np.ndarray((HEADER_SLOTS,), dtype=np.int64, buffer=self.shm.buf)
+        self._records = np.ndarray((capacity,), dtype=RECORD, buffer=self.shm.buf, offset=HEADER_SLOTS*8)
+        if self.owner:
+            self._header[:] = 0
+
+    @property
+    def spec(self) -> tuple:
+        return self.shm.name, self.capacity
+
+    @classmethod
+    def attach(cls, spec: tuple) -> "CandleRing":
+        name, capacity = spec
+        return cls(capacity, name=name)
+
+    def put(self, kind: int, symbol: int, time_ms: int, o: float = nan, h: float = nan,
+            l: float = nan, c: float = nan, v: float = nan) -> bool:
+        """Producer side; returns False (and counts a drop) when the ring is full"""
+        head = int(self._header[HEAD])
+        if head - int(self._header[TAIL]) >= self.capacity:
+            self._header[DROPPED] += 1
+            return False
+        self._records[head % self.capacity] = (kind, symbol, time_ms, o, h, l, c, v)
+        self._header[HEAD] = head + 1       # publish only after the record is written
+        return True
+
+    def drain(self, limit: int = None) -> np.ndarray:
+        """Consumer side; returns (a copy of) every unread record, oldest first"""
+        tail = int(self._header[TAIL])
+        head = int(self._header[HEAD])
+        if limit is not None:
+            head = min(head, tail + limit)
+        if head == tail:
+            return self._records[:0].copy()
+        batch = self._records[np.arange(tail, head) % self.capacity]
+        self._header[TAIL] = head
+        return batch
+
+    @property
+    def dropped(self) -> int:
+        return int(self._header[DROPPED])
+
+    def __len__(self):
+        return int(self._header[HEAD] - self._header[TAIL])
+
+    def close(self):
+        self._header = self._records = None     # release the buffer exports first
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+class ShardStats:
+    """One STATS row per symbol; each row is written by the worker that owns it"""
+
+    def __init__(self, rows: int, name: str = None):
+        self.rows = rows
+        self.owner = name is None
+        self.shm = shared_memory.SharedMemory(name=name, create=self.owner,
+                                              size=max(1, rows*STATS.itemsize) if self.owner else 0)
+        self.table = np.ndarray((rows,), dtype=STATS, buffer=self.shm.buf)
+        if self.owner:
+            self.table[:] = np.zeros(rows, dtype=STATS)
+            self.table["last_close"] = nan
+
+    @property
+    def spec(self) -> tuple:
+        return self.shm.name, self.rows
+
+    @classmethod
+    def attach(cls, spec: tuple) -> "ShardStats":
+        name, rows = spec
+        return cls(rows, name=name)
+
+    def publish(self, row: int, status: dict):
+        self.table[row] = tuple(float(status.get(f, nan)) for f in STATS.names[:-1]) + (time.time(),)
+
+    def read(self, row: int) -> dict:
+        values = self.table[row].item()
+        status = dict(zip(STATS.names, values))
+        for name in ("open_ladders", "candles", "pending_orders"):
+            status[name] = int(status[name])
+        status["cycle_active"] = bool(status["cycle_active"])
+        return status
+
+    def close(self):
+        self.table = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+class StopFlag:
+    """Cross-process stop signal with the threading.Event interface used here.
+
+    A lock-free shared byte rather than multiprocessing.Event: set() on an
+    Event blocks forever if a process was killed while waiting on it.
+    """
+
+    def __init__(self, ctx=multiprocessing):
+        self._flag = ctx.RawValue("b", 0)
+
+    def set(self):
+        self._flag.value = 1
+
+    def is_set(self) -> bool:
+        return bool(self._flag.value)
+
+    def wait(self, timeout: float = None) -> bool:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while not self.is_set():
+            remaining = 0.05 if deadline is None else min(0.05, deadline - time.monotonic())
+            if remaining <= 0:
+                break
+            time.sleep(remaining)
+        return self.is_set()
+
+
+class MarketBus:
+    """Ingestion side: decode stream messages and write them to the owning shard's ring"""
+
+    def __init__(self, routes: dict, rings: list, intervals: dict = None, last_open: dict = None):
+        self.routes = routes        # symbol -> (shard, symbol index)
+        self.rings = rings
+        self.intervals = intervals or {}
+        self.last_open = dict(last_open or {})     # symbol -> open time of the last candle forwarded
+        self.messages = 0
+
+    def _put_candle(self, symbol: str, open_time: int, o, h, l, c, v) -> bool:
+        shard, index = self.routes[symbol]
+        if open_time <= self.last_open.get(symbol, -1):
+            return True             # already forwarded (backfill/live overlap)
+        self.last_open[symbol] = open_time
+        return self.rings[shard].put(CANDLE, index, open_time, o, h, l, c, v)
+
+    def handle_message(self, raw_msg: str):
+        try:
+            decoded = decode_market(raw_msg)
+            if decoded is None:
+                return
+            symbol, candle, price, ask = decoded
+            route = self.routes.get(symbol)
+            if route is None:
+                return
+            shard, index = route
+            self.messages += 1
+            if candle is not None:
+                ok = self._put_candle(symbol, *candle[1:7])
+            else:
+                ok = self.rings[shard].put(TICK, index, int(time.time()*1000), c=price,
+                                           h=nan if ask is None else ask)
+            if not ok:
+                logger.warning(f"⚠️ Shard {shard} ring full – dropped {symbol} update")
+        except Exception as e:
+            logger.error(f"❌ Error processing market data: {e}")
+            logger.debug(f"🔍 Raw message that caused error: {raw_msg[:200]}...")
+
+    async def backfill(self, rest):
+        """Forward closed candles missed since the last one forwarded per symbol"""
+        async def one(symbol):
+            rows = await fetch_closed_klines(rest, symbol, self.intervals[symbol],
+                                             self.last_open[symbol] + INTERVAL_MS[self.intervals[symbol]])
+            for row in rows:
+                self._put_candle(symbol, row[0], *(float(x) for x in row[1:6]))
+            if rows:
+                logger.info(f"📥 {symbol}: backfilled {len(rows)} missed candles")
+
+        await asyncio.gather(*(one(symbol) for symbol in self.last_open if symbol in self.intervals))
+
+
+def _setup_logging(role: str):
+    logging.basicConfig(level=logging.INFO,
+                        format=f"%(asctime)s - {role} - %(name)s - %(levelname)s - %(message)s")
+
+
+def _ingest_main(ring_specs: list, stats_spec: tuple, symbols: list, routes: dict,
+                 intervals: dict, streams: list, stop):
+    """Ingestion process: one supervised combined-stream connection for every shard"""
+    from bot.services.rest import AsyncRestClient
+
+    _setup_logging("ingest")
+    rings = [CandleRing.attach(spec) for spec in ring_specs]
+    stats = ShardStats.attach(stats_spec)
+    # Resume after the candles the shards already have (matters after a restart)
+    last_open = {symbol: int(stats.table["last_open"][i]) for i, symbol in enumerate(symbols)
+                 if stats.table["last_open"][i] > 0}
+    bus = MarketBus(routes, rings, intervals, last_open)
+
+    async def main():
+        rest = AsyncRestClient(base_url=MARKET_REST_URL)
+        supervisor = StreamSupervisor(streams, bus.handle_message, backfill=lambda: bus.backfill(rest))
+        task = asyncio.create_task(supervisor.run())
+        while not stop.is_set() and not task.done():
+            await asyncio.sleep(0.5)
+        await supervisor.stop()
+        task.cancel()
+        await rest.close()
+
+    try:
+        logger.info(f"📡 Ingest subscribing to {len(streams)} streams for {len(rings)} shards")
+        asyncio.run(main())
+    finally:
+        for ring in rings:
+            ring.close()
+        stats.close()
+
+
+def _run_user_stream(registry):
+    from bot.services.rest import SharedLoopClient, get_async_client
+    from bot.services.user_stream import USER_STREAM_URL, UserStream
+
+    client = next(iter(registry)).order_mgr.client
+    stream_url = os.getenv("USER_STREAM_URL") or (
+        "wss://stream.testnet.binance.vision" if "testnet" in client.base_url else USER_STREAM_URL)
+    rest = SharedLoopClient(get_async_client(client.api_key, client.api_secret, client.base_url))
+    asyncio.run(UserStream(rest, registry, stream_url=stream_url).run())
+
+
+async def _warm_start(registry):
+    from bot.services.rest import AsyncRestClient
+
+    async with AsyncRestClient(base_url=MARKET_REST_URL) as rest:
+        await registry.warm_start(rest, kline_cache(registry.archive))
+
+
+def run_shard(registry, ring: CandleRing, stats: ShardStats, index: dict, stop,
+              poll: float = POLL_SECS):
+    """Worker loop: apply ring records to their runners and publish stats until ``stop``"""
+    runners = {i: registry[symbol] for symbol, i in index.items()}
+    published = 0.0
+    while not stop.is_set():
+        batch = ring.drain()
+        for record in batch:
+            runner = runners.get(int(record["symbol"]))
+            if runner is None:
+                continue
+            try:
+                if record["kind"] == CANDLE:
+                    runner.on_candle(int(record["time"]), float(record["open"]), float(record["high"]),
+                                     float(record["low"]), float(record["close"]), float(record["volume"]))
+                else:
+                    ask = float(record["high"])
+                    runner.on_quote(float(record["close"]), None if isnan(ask) else ask)
+            except Exception as e:
+                logger.error(f"❌ {runner.symbol}: error applying {'candle' if record['kind'] == CANDLE else 'tick'}: {e}")
+        if time.monotonic() - published >= STATS_SECS:
+            for i, runner in runners.items():
+                stats.publish(i, runner.status())
+            published = time.monotonic()
+        if not len(batch):
+            stop.wait(poll)
+
+
+def _worker_main(shard: int, configs: list, index: dict, ring_spec: tuple, stats_spec: tuple,
+                 stop, options: dict):
+    _setup_logging(f"shard{shard}")
+    ring = CandleRing.attach(ring_spec)
+    stats = ShardStats.attach(stats_spec)
+    registry = build_registry(configs, tick_stream=options.get("tick_stream", ""),
+                              tick_interval=options.get("tick_interval", 0.25),
+                              archive=CandleArchive(options["archive"]) if options.get("archive") else None,
+                              state=StateStore.from_url(options["redis_url"]).start()
+                              if options.get("redis_url") else None,
+                              # one journal per shard: a directory has a single writer. Symbols
+                              # that moved shards (SHARDS changed) replay from their old directory
+                              journal=Journal(os.path.join(options["journal"], f"shard{shard}"),
+                                              peers=journal_dirs(options["journal"])).start()
+                              if options.get("journal") else None,
+                              # balances need the user stream to stay current
+                              account=AccountCache() if options.get("user_stream", True)
+                              and ACCOUNT_REFRESH_SECS else None)
+    logger.info(f"🧩 Shard {shard} running {', '.join(registry.symbols)}")
+    if registry.state is not None or registry.journal is not None:
+        registry.restore(reconcile_orders=options.get("user_stream", True))
+    if options.get("warm_start", True):
+        asyncio.run(_warm_start(registry))
+    if registry.account is not None:
+        registry.account.start()
+    if options.get("user_stream", True):
+        registry.filters.preload(registry.symbols)
+        threading.Thread(target=_run_user_stream, args=(registry,), daemon=True,
+                         name=f"user-stream-{shard}").start()
+    try:
+        run_shard(registry, ring, stats, index, stop)
+    finally:
+        for runner in registry:
+            runner.ticks.cancel()
+            runner.executor.shutdown()
+        if registry.account is not None:
+            registry.account.stop()
+        if registry.archive is not None:
+            registry.archive.close()
+        if registry.state is not None:
+            registry.state.stop()
+        if registry.journal is not None:
+            registry.journal.close()
+        ring.close()
+        stats.close()
+
+
+class Supervisor:
+    """Starts the ingestion and shard processes and aggregates their health"""
+
+    def __init__(self, configs: list, shards: int = SHARDS or 1, tick_stream: str = "",
+                 tick_interval: float = 0.25, ring_size: int = RING_SIZE,
+                 user_stream: bool = True, warm_start: bool = True, ingest: bool = True,
+                 archive: str = CANDLE_ARCHIVE_DIR, redis_url: str = REDIS_URL,
+                 journal: str = JOURNAL_DIR):
+        self.configs = configs
+        self.shards = [s for s in (configs[i::shards] for i in range(shards)) if s]
+        self.index = {config.symbol: i for i, config in enumerate(configs)}
+        self.routes = {config.symbol: (shard, self.index[config.symbol])
+                       for shard, members in enumerate(self.shards) for config in members}
+        self.tick_stream = tick_stream
+        self.options = {"tick_stream": tick_stream, "tick_interval": tick_interval,
+                        "user_stream": user_stream, "warm_start": warm_start, "archive": archive,
+                        "redis_url": redis_url, "journal": journal}
+        self.ingest = ingest
+        self.ctx = multiprocessing.get_context("spawn")
+        self.stop_event = StopFlag(self.ctx)
+        self.rings = [CandleRing(ring_size) for _ in self.shards]
+        self.stats = ShardStats(len(configs))
+        self.workers = [None]*len(self.shards)
+        self.ingestor = None
+        self.restarts = 0
+        self.started = None
+
+    @classmethod
+    def from_env(cls) -> "Supervisor":
+        return cls(parse_symbols(os.getenv("SYMBOLS") or "DOGEFDUSD"), shards=SHARDS or 1,
+                   tick_stream=os.getenv("TICK_STREAM", ""),
+                   tick_interval=float(os.getenv("TICK_INTERVAL_MS", 250)) / 1000)
+
+    def streams(self) -> list:
+        return stream_names(self.configs, self.tick_stream)
+
+    def _start_worker(self, shard: int):
+        members = self.shards[shard]
+        index = {config.symbol: self.index[config.symbol] for config in members}
+        proc = self.ctx.Process(target=_worker_main, name=f"dogebot-shard{shard}", daemon=True,
+                                args=(shard, members, index, self.rings[shard].spec,
+                                      self.stats.spec, self.stop_event, self.options))
+        proc.start()
+        self.workers[shard] = proc
+
+    def _start_ingest(self):
+        proc = self.ctx.Process(target=_ingest_main, name="dogebot-ingest", daemon=True,
+                                args=([ring.spec for ring in self.rings], self.stats.spec,
+                                      [c.symbol for c in self.configs], self.routes,
+                                      {c.symbol: c.interval for c in self.configs},
+                                      self.streams(), self.stop_event))
+        proc.start()
+        self.ingestor = proc
+
+    def start(self):
+        logger.info(f"🚀 Supervisor: {len(self.configs)} symbols across {len(self.shards)} shards")
+        for shard in range(len(self.shards)):
+            self._start_worker(shard)
+        if self.ingest:
+            self._start_ingest()
+        self.started = time.time()
+
+    def check(self) -> int:
+        """Restart any process that died; returns how many were restarted"""
+        if self.stop_event.is_set() or self.started is None:
+            return 0
+        restarted = 0
+        for shard, proc in enumerate(self.workers):
+            if proc is not None and not proc.is_alive():
+                restored = "Redis" if self.options.get("redis_url") else \
+                    "the journal" if self.options.get("journal") else None
+                logger.error(f"💀 Shard {shard} exited ({proc.exitcode}) – restarting; " +
+                             (f"its ladders are restored from {restored}" if restored else
+                              "its open ladders are lost (no REDIS_URL or JOURNAL_DIR)"))
+                self._start_worker(shard)
+                restarted += 1
+        if self.ingestor is not None and not self.ingestor.is_alive():
+            logger.error(f"💀 Ingest process exited ({self.ingestor.exitcode}) – restarting")
+            self._start_ingest()
+            restarted += 1
+        self.restarts += restarted
+        return restarted
+
+    def status(self) -> dict:
+        """Per-symbol stats as last published by the owning shard"""
+        return {config.symbol: {**self.stats.read(i), "shard": self.routes[config.symbol][0]}
+                for i, config in enumerate(self.configs)}
+
+    def health(self) -> dict:
+        now = time.time()
+        shards = []
+        for shard, (members, proc, ring) in enumerate(zip(self.shards, self.workers, self.rings)):
+            updated = min(self.stats.table["updated"][self.index[c.symbol]] for c in members)
+            shards.append({
+                "shard": shard,
+                "symbols": [c.symbol for c in members],
+                "pid": proc.pid if proc else None,
+                "alive": bool(proc and proc.is_alive()),
+                "backlog": len(ring),
+                "dropped": ring.dropped,
+                "heartbeat_age": float(now - updated) if updated else None,
+            })
+        return {
+            "shards": shards,
+            "ingest_alive": bool(self.ingestor and self.ingestor.is_alive()),
+            "restarts": self.restarts,
+        }
+
+    def stop(self, timeout: float = 5.0):
+        self.stop_event.set()
+        for proc in [*self.workers, self.ingestor]:
+            if proc is None:
+                continue
+            proc.join(timeout)
+            if proc.is_alive():
+                proc.terminate()
+                proc.join(timeout)
+        for ring in self.rings:
+            ring.close()
+        self.stats.close()
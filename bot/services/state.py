@@ -0,0 +1,281 @@
+"""
+Strategy state persistence in Redis.
+
+Each symbol's grid is kept in three hashes:
+
+    dogebot:DOGEFDUSD:strategy   cycle, step, next_buy, qty_next, realised, day
+    dogebot:DOGEFDUSD:ladders    SELL client order ID -> [buy, sell, qty]
+    dogebot:DOGEFDUSD:pending    resting BUY client order ID -> notional
+
+``sync`` diffs the strategy against what was last queued and only queues
+changed fields (rungs never change once opened, so they are diffed by ID).
+A background thread flushes the queue every STATE_FLUSH_MS in one
+MULTI/EXEC pipeline, so a burst of fills costs one round trip and writes
+coalesce to their latest value. On boot ``restore`` loads the hashes back
+into the strategy and ``reconcile`` squares them with the exchange's
+open orders.
+"""
+import json
+import logging
+import os
+import threading
+
+from bot.core.ladder import Ladder
+
+logger = logging.getLogger(__name__)
+
+REDIS_URL = os.getenv("REDIS_URL", "")     # e.g. redis://redis:6379/0; empty disables persistence
+STATE_PREFIX = os.getenv("STATE_PREFIX", "dogebot")
+FLUSH_SECS = float(os.getenv("STATE_FLUSH_MS", 100)) / 1000
+
+SCALARS = ("cycle", "step", "next_buy", "qty_next", "realised", "day")
+BOT_ORDER_PREFIX = "dgb"        # see new_client_order_id
+
+
+class StateStore:
+    """Write-behind store of GridStrategy state, one set of hashes per symbol"""
+
+    def __init__(self, redis, prefix: str = STATE_PREFIX, flush_interval: float = FLUSH_SECS):
+        self.redis = redis
+        self.prefix = prefix
+        self.flush_interval = flush_interval
+        self.writes = 0             # pipelines executed
+        self.errors = 0
+        self._saved = {}            # symbol -> (scalars, ladder IDs, pending) as last queued
+        self._pending = {}          # key -> {field: value, or None to delete}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopping = False
+        self._thread = None
+
+    @classmethod
+    def from_url(cls, url: str = REDIS_URL, **kwargs) -> "StateStore":
+        import redis
+        return cls(redis.Redis.from_url(url, socket_timeout=5, decode_responses=True), **kwargs)
+
+    def key(self, symbol: str, part: str) -> str:
+        return f"{self.prefix}:{symbol}:{part}"
+
+    # ---- writes ---------------------------------------------------------------
+    def sync(self, symbol: str, strategy) -> int:
+        """Queue whatever changed since the last sync; returns the number of fields queued"""
+        scalars, ladders, pending = _snapshot(strategy)
+        old_scalars, old_ladders, old_pending = self._saved.get(symbol, ({}, set(), {}))
+        if scalars == old_scalars and ladders == old_ladders and pending == old_pending:
+            return 0
+
+        changes = {
+            self.key(symbol, "strategy"): {k: json.dumps(v) for k, v in scalars.items()
+                                           if k not in old_scalars or old_scalars[k] != v},
+            self.key(symbol, "ladders"): {
+                **{order_id: None for order_id in old_ladders - ladders},
+                **{order_id: _dump_ladder(strategy.ladders.get(order_id)) for order_id in ladders - old_ladders}},
+            self.key(symbol, "pending"): {
+                **{order_id: None for order_id in old_pending.keys() - pending.keys()},
+                **{order_id: json.dumps(v) for order_id, v in pending.items() if old_pending.get(order_id) != v}},
+        }
+        self._saved[symbol] = (scalars, ladders, pending)
+        return self._queue(changes)
+
+    def _queue(self, changes: dict) -> int:
+        queued = 0
+        with self._lock:
+            for key, fields in changes.items():
+                if fields:
+                    self._pending.setdefault(key, {}).update(fields)
+                    queued += len(fields)
+        if queued and self._thread is None:
+            self.flush()            # no flusher thread: write through
+        return queued
+
+    def flush(self) -> int:
+        """Write every queued change in one pipeline; returns the number of fields written"""
+        with self._lock:
+            batch, self._pending = self._pending, {}
+        if not batch:
+            return 0
+        pipe = self.redis.pipeline(transaction=True)
+        for key, fields in batch.items():
+            deleted = [f for f, v in fields.items() if v is None]
+            updated = {f: v for f, v in fields.items() if v is not None}
+            if deleted:
+                pipe.hdel(key, *deleted)
+            if updated:
+                pipe.hset(key, mapping=updated)
+        try:
+            pipe.execute()
+        except Exception as e:
+            self.errors += 1
+            logger.error(f"❌ Could not persist strategy state, will retry: {e}")
+            with self._lock:
+                for key, fields in batch.items():    # newer queued values win
+                    self._pending[key] = {**fields, **self._pending.get(key, {})}
+            return 0
+        self.writes += 1
+        return sum(map(len, batch.values()))
+
+    def clear(self, symbol: str):
+        self.redis.delete(*(self.key(symbol, part) for part in ("strategy", "ladders", "pending")))
+        self._saved.pop(symbol, None)
+
+    # ---- background flushing -------------------------------------------------
+    def start(self) -> "StateStore":
+        if self._thread is None:
+            self._stopping = False
+            self._thread = threading.Thread(target=self._run, daemon=True, name="state-flush")
+            self._thread.start()
+        return self
+
+    def _run(self):
+        while not self._stopping:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+
+    def stop(self):
+        """Stop the flusher and write what is still queued"""
+        if self._thread is not None:
+            self._stopping = True
+            self._wake.set()
+            self._thread.join()
+            self._thread = None
+        self.flush()
+
+    # ---- restore ---------------------------------------------------------------
+    def load(self, symbol: str) -> dict:
+        """The stored state of ``symbol``, or None if there is none"""
+        pipe = self.redis.pipeline(transaction=False)
+        for part in ("strategy", "ladders", "pending"):
+            pipe.hgetall(self.key(symbol, part))
+        scalars, ladders, pending = pipe.execute()
+        if not scalars:
+            return None
+        return {
+            "scalars": {k: json.loads(v) for k, v in scalars.items() if k in SCALARS},
+            "ladders": [Ladder(*json.loads(v), order_id=k) for k, v in ladders.items()],
+            "pending": {k: json.loads(v) for k, v in pending.items()},
+        }
+
+    def restore(self, symbol: str, strategy) -> bool:
+        """Load the stored state into ``strategy``; False if nothing was stored"""
+        state = self.load(symbol)
+        if state is None:
+            return False
+        for name, value in state["scalars"].items():
+            setattr(strategy, name, value)
+        strategy.ladders.clear()
+        for ladder in state["ladders"]:
+            strategy.ladders.add(ladder)
+        strategy.ledger.clear()
+        for order_id, notional in state["pending"].items():
+            strategy.ledger.reserve(order_id, notional, acked=True)    # reconcile drops the ones gone
+        self._saved[symbol] = _snapshot(strategy)   # baseline for later diffs
+        logger.info(f"♻️ {symbol}: restored {'active' if strategy.cycle else 'idle'} cycle, "
+                    f"{len(strategy.ladders)} rungs, {len(strategy.ledger)} resting BUYs, "
+                    f"realised {strategy.realised:.4f}")
+        return True
+
+
+def _snapshot(strategy) -> tuple:
+    return ({name: getattr(strategy, name) for name in SCALARS},
+            {ladder.order_id for ladder in strategy.ladders}, dict(strategy.ledger.items()))
+
+
+def _dump_ladder(ladder: Ladder) -> str:
+    return json.dumps([ladder.buy, ladder.sell, ladder.qty])
+
+
+def _order_status(client, symbol: str, client_order_id: str):
+    """The order as the exchange has it, or None if it doesn't exist (-2013).
+    Any other error (timeout, rate limit) raises: the order may still be live."""
+    try:
+        return client.get_order(symbol=symbol, origClientOrderId=client_order_id)
+    except Exception as e:
+        if getattr(e, "error_code", None) == -2013 or "does not exist" in str(e):
+            return None
+        raise
+
+
+def reconcile(strategy, client, symbol: str, fills=None) -> dict:
+    """Square restored state with the exchange after a restart.
+
+    * a rung whose SELL filled while we were down is booked as profit; one
+      whose SELL is gone otherwise is re-posted (the coins are still held)
+    * a pre-placed BUY that filled, even partly before it was cancelled or
+      expired, opens its rung for the filled quantity; the rest of its
+      reserved quote is released
+    * open bot orders the state doesn't know about are cancelled
+
+    An order whose status can't be looked up (other than "does not exist")
+    is kept as it is and counted as ``unchecked``. Orders the executor has
+    not finished sending, BUYs not yet acknowledged and rungs waiting for a
+    SELL retry are left to their own outcome (``in_flight``): the exchange
+    doesn't know them yet, so a lookup would wrongly find them gone. Fills
+    booked here are marked done in the ``fills`` FillDispatcher, if given,
+    so a late report of the same order isn't booked twice.
+    """
+    summary = {"kept": 0, "filled": 0, "reposted": 0, "released": 0, "cancelled": 0, "unchecked": 0,
+               "in_flight": 0}
+    inflight = getattr(strategy.order_mgr, "inflight", None)
+    busy = inflight() if inflight is not None else set()
+    strategy.settle_orders()            # calls finished before that snapshot are applied
+    open_orders = {o["clientOrderId"]: o for o in client.get_open_orders(symbol=symbol)}
+    rungs = list(strategy.ladders)      # not those the BUYs below open: their SELLs were just posted
+
+    def lookup(order_id):
+        try:
+            return _order_status(client, symbol, order_id), True
+        except Exception as e:
+            logger.warning(f"⚠️ {symbol}: could not look up {order_id}, keeping it: {e}")
+            summary["unchecked"] += 1
+            return None, False
+
+    for order_id, notional in strategy.ledger.items():
+        if order_id in open_orders:
+            summary["kept"] += 1
+            continue
+        if order_id in busy or not strategy.ledger.acked(order_id):
+            summary["in_flight"] += 1
+            continue
+        order, found = lookup(order_id)
+        if not found or (order is not None and order["status"] in ("NEW", "PARTIALLY_FILLED")):
+            continue
+        qty = float(order["executedQty"]) if order is not None else 0.0
+        if qty > 0:
+            if fills is not None:
+                fills.mark_done(order_id)
+            strategy.handle_buy_fill(float(order["cummulativeQuoteQty"]) / qty, qty, order_id)
+            summary["filled"] += 1
+        else:
+            strategy.ledger.release(order_id)
+            summary["released"] += 1
+
+    for ladder in rungs:
+        if ladder.order_id in open_orders:
+            summary["kept"] += 1
+            continue
+        if ladder.order_id in busy or ladder.order_id in strategy.unplaced:
+            summary["in_flight"] += 1
+            continue
+        order, found = lookup(ladder.order_id)
+        if not found:
+            continue
+        if order is not None and order["status"] == "FILLED":
+            if fills is not None:
+                fills.mark_done(ladder.order_id)
+            strategy.handle_sell_fill(float(order["cummulativeQuoteQty"]) / float(order["executedQty"]),
+                                      order_id=ladder.order_id)
+            summary["filled"] += 1
+        elif order is None or order["status"] not in ("NEW", "PARTIALLY_FILLED"):
+            strategy.order_mgr.post_limit_maker("SELL", ladder.sell, ladder.qty, client_order_id=ladder.order_id)
+            summary["reposted"] += 1
+
+    known = {ladder.order_id for ladder in strategy.ladders} | set(strategy.ledger) | busy
+    for order_id in open_orders:
+        if order_id.startswith(BOT_ORDER_PREFIX) and order_id not in known:
+            strategy.order_mgr.cancel_order(client_order_id=order_id)
+            summary["cancelled"] += 1
+
+    logger.info(f"🧮 {symbol}: reconciled with the exchange – " +
+                ", ".join(f"{v} {k}" for k, v in summary.items()))
+    return summary
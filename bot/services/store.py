@@ -0,0 +1,354 @@
+"""
+Candle storage for DogeBot: the in-memory ring buffer the live pipeline reads,
+and the on-disk archive every closed candle is appended to
+"""
+import os
+import time
+import numpy as np
+
+FIELDS = ("open", "high", "low", "close", "volume")
+MAX_BARS = int(os.getenv("MAX_BARS", 500))
+
+
+class CandleStore:
+    """Fixed-capacity OHLCV ring buffer backed by preallocated NumPy arrays.
+
+    Every row is written twice, at ``pos`` and ``pos + capacity``, so the last
+    ``n`` bars are always one contiguous slice.  That keeps ``append`` O(1) and
+    lets ``window``/``column`` hand out read-only views without copying.
+    """
+
+    def __init__(self, capacity: int = MAX_BARS):
+        if capacity < 1:
+            raise ValueError(f"capacity must be positive, got {capacity}")
+        self.capacity = capacity
+        self._data = np.full((len(FIELDS), 2 * capacity), np.nan)
+        self._times = np.zeros(2 * capacity, dtype=np.int64)
+        self._pos = 0     # slot the next bar goes into
+        self._count = 0   # bars currently held (<= capacity)
+        self._last_time = None
+
+    def __len__(self):
+        return self._count
+
+    def append(self, open_time: int, o: float, h: float, l: float, c: float, v: float = np.nan):
+        """Store a closed candle; re-sending the latest open_time overwrites it.
+
+        Returns True when a new bar was added, False when the last one was replaced.
+        """
+        is_new = open_time != self._last_time
+        if not is_new:
+            slot = (self._pos - 1) % self.capacity
+        else:
+            slot = self._pos
+            self._pos = (self._pos + 1) % self.capacity
+            self._count = min(self._count + 1, self.capacity)
+
+        row = (o, h, l, c, v)
+        self._data[:, slot] = row
+        self._data[:, slot + self.capacity] = row
+        self._times[slot] = open_time
+        self._times[slot + self.capacity] = open_time
+        self._last_time = open_time
+        return is_new
+
+    def clear(self):
+        self._pos = 0
+        self._count = 0
+        self._last_time = None
+
+    def _end(self):
+        # The mirrored copy of the most recent write sits at last + capacity
+        return (self._pos - 1) % self.capacity + self.capacity + 1
+
+    def _bounds(self, n):
+        n = self._count if n is None else max(0, min(n, self._count))
+        end = self._end()
+        return end - n, end
+
+    @staticmethod
+    def _readonly(arr):
+        view = arr.view()
+        view.flags.writeable = False
+        return view
+
+    def window(self, n: int = None) -> np.ndarray:
+        """Zero-copy ``(5, n)`` view of the last ``n`` bars, rows ordered as FIELDS"""
+        start, end = self._bounds(n)
+        return self._readonly(self._data[:, start:end])
+
+    def column(self, name: str, n: int = None) -> np.ndarray:
+        """Zero-copy view of one OHLCV column for the last ``n`` bars"""
+        start, end = self._bounds(n)
+        return self._readonly(self._data[FIELDS.index(name), start:end])
+
+    def times(self, n: int = None) -> np.ndarray:
+        """Open times (ms since epoch) for the last ``n`` bars"""
+        start, end = self._bounds(n)
+        return self._readonly(self._times[start:end])
+
+    def recent(self, name: str, n: int) -> list:
+        """Last ``n`` values of one column as a plain list (cheap for tiny n)"""
+        start, end = self._bounds(n)
+        return self._data[FIELDS.index(name), start:end].tolist()
+
+    def last(self, name: str = "close") -> float:
+        if not self._count:
+            raise IndexError("candle store is empty")
+        return float(self._data[FIELDS.index(name), self._end() - 1])
+
+    def last_time(self) -> int:
+        if not self._count:
+            raise IndexError("candle store is empty")
+        return self._last_time
+
+    def to_frame(self, n: int = None) -> "pd.DataFrame":
+        """Copy the last ``n`` bars into a DataFrame for pandas-only callers"""
+        import pandas as pd
+        start, end = self._bounds(n)
+        index = pd.to_datetime(self._times[start:end], unit="ms")
+        return pd.DataFrame(self._data[:, start:end].T.copy(), index=index, columns=list(FIELDS))
+
+
+# ---------------------------------------------------------------------------
+# On-disk archive
+# ---------------------------------------------------------------------------
+CANDLE_ARCHIVE_DIR = os.getenv("CANDLE_ARCHIVE_DIR", "")    # e.g. /data/candles on a persistent volume; "" disables
+
+# One closed candle as a record (warm-start history, archive import/export)
+HISTORY = np.dtype([("time", np.int64)] + [(name, np.float64) for name in FIELDS])
+
+SEGMENT_MAGIC = np.frombuffer(b"DGBCNDL1", dtype=np.int64)[0]
+SEGMENT_HEADER = 64     # int64 slots: magic, interval_ms, capacity, count, (reserved)
+_CAPACITY, _COUNT = 2, 3
+
+
+def _month(open_time: int) -> np.datetime64:
+    return np.datetime64(int(open_time), "ms").astype("datetime64[M]")
+
+
+def _month_bounds(month: np.datetime64) -> tuple:
+    start = int(month.astype("datetime64[ms]").astype(np.int64))
+    end = int((month + 1).astype("datetime64[ms]").astype(np.int64))
+    return start, end
+
+
+class _Segment:
+    """One month of candles: a 64-byte header, then a fixed-capacity block per
+    column (time, then FIELDS), so every column maps as one contiguous array"""
+
+    def __init__(self, path: str, mode: str = "r"):
+        self.path = path
+        raw = np.memmap(path, dtype=np.uint8, mode=mode)
+        self._header = raw[:SEGMENT_HEADER].view(np.int64)
+        if self._header[0] != SEGMENT_MAGIC:
+            raise ValueError(f"{path} is not a candle segment")
+        self.interval_ms = int(self._header[1])
+        self.capacity = int(self._header[_CAPACITY])
+        block = self.capacity*8
+        self.columns = {}
+        for i, name in enumerate(("time",) + FIELDS):
+            start = SEGMENT_HEADER + i*block
+            self.columns[name] = raw[start:start + block].view(np.int64 if name == "time" else np.float64)
+        self._raw = raw
+
+    @classmethod
+    def create(cls, path: str, interval_ms: int, capacity: int, records: np.ndarray = None) -> "_Segment":
+        """Write a new segment (atomically, via a temp file) holding ``records``"""
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            f.truncate(SEGMENT_HEADER + capacity*8*(1 + len(FIELDS)))    # sparse until written
+        raw = np.memmap(tmp, dtype=np.uint8, mode="r+")
+        header = raw[:SEGMENT_HEADER].view(np.int64)
+        header[:4] = (SEGMENT_MAGIC, interval_ms, capacity, 0)
+        n = 0 if records is None else len(records)
+        for i, name in enumerate(("time",) + FIELDS):
+            if n:
+                start = SEGMENT_HEADER + i*capacity*8
+                raw[start:start + n*8].view(records.dtype[name])[:] = records[name]
+        header[_COUNT] = n
+        raw.flush()
+        del header, raw
+        os.replace(tmp, path)
+        return cls(path, mode="r+")
+
+    @property
+    def count(self) -> int:
+        return int(self._header[_COUNT])
+
+    def times(self) -> np.ndarray:
+        return self.columns["time"][:self.count]
+
+    def last_time(self) -> int:
+        n = self.count
+        return int(self.columns["time"][n - 1]) if n else None
+
+    def append(self, records: np.ndarray):
+        n = self.count
+        if n + len(records) > self.capacity:
+            raise ValueError(f"{self.path}: segment full ({self.capacity} bars)")
+        for name, column in self.columns.items():
+            column[n:n + len(records)] = records[name]
+        self._header[_COUNT] = n + len(records)     # publish after the data is written
+
+    def records(self, lo: int = 0, hi: int = None) -> np.ndarray:
+        hi = self.count if hi is None else hi
+        out = np.empty(hi - lo, dtype=HISTORY)
+        for name, column in self.columns.items():
+            out[name] = column[lo:hi]
+        return out
+
+    def flush(self):
+        self._raw.flush()
+
+
+class CandleArchive:
+    """Append-only archive of closed candles, one directory per symbol and
+    interval and one memory-mapped segment file per calendar month (UTC):
+
+        <root>/DOGEFDUSD/15m/2024-03.bin
+
+    Segments are columnar and sorted by open time, so a time range is two
+    searchsorted calls per month and reads come straight from the page
+    cache without loading whole files. The current month is preallocated
+    (sparse) for a month of bars; ``compact`` shrinks finished months.
+    """
+
+    def __init__(self, root: str = CANDLE_ARCHIVE_DIR):
+        self.root = root
+        self._writers = {}      # (symbol, interval) -> (month, _Segment) being appended to
+
+    def _dir(self, symbol: str, interval: str) -> str:
+        return os.path.join(self.root, symbol, interval)
+
+    def _path(self, symbol: str, interval: str, month: np.datetime64) -> str:
+        return os.path.join(self._dir(symbol, interval), f"{month}.bin")
+
+    def months(self, symbol: str, interval: str) -> list:
+        """Months with a segment, oldest first"""
+        try:
+            names = os.listdir(self._dir(symbol, interval))
+        except FileNotFoundError:
+            return []
+        return sorted(np.datetime64(n[:-4], "M") for n in names if n.endswith(".bin"))
+
+    def _writer(self, symbol: str, interval: str, month: np.datetime64) -> _Segment:
+        key = (symbol, interval)
+        current = self._writers.get(key)
+        if current is not None and current[0] == month:
+            return current[1]
+        if current is not None:
+            current[1].flush()
+        path = self._path(symbol, interval, month)
+        if os.path.exists(path):
+            segment = _Segment(path, mode="r+")
+        else:
+            from bot.core.pipeline import INTERVAL_MS
+            os.makedirs(self._dir(symbol, interval), exist_ok=True)
+            start, end = _month_bounds(month)
+            step = INTERVAL_MS[interval]
+            segment = _Segment.create(path, step, (end - start) // step)
+        self._writers[key] = (month, segment)
+        return segment
+
+    def append(self, symbol: str, interval: str, open_time: int, o: float, h: float,
+               l: float, c: float, v: float = np.nan) -> bool:
+        """Archive one closed candle; False if it isn't newer than the last one archived"""
+        record = np.array([(open_time, o, h, l, c, v)], dtype=HISTORY)
+        return self.extend(symbol, interval, record) == 1
+
+    def extend(self, symbol: str, interval: str, records: np.ndarray) -> int:
+        """Archive HISTORY records; returns how many were new.
+
+        Records after a month's last bar are appended in place; anything
+        older (filling a hole), or bars for a month ``compact`` already
+        shrank (a late backfill), rewrite that month's segment with room for
+        the whole month again. Bars already archived are skipped.
+        """
+        records = np.sort(np.asarray(records, dtype=HISTORY), order="time")
+        added = 0
+        months = records["time"].astype("datetime64[ms]").astype("datetime64[M]")
+        for month in np.unique(months):
+            part = records[months == month]
+            segment = self._writer(symbol, interval, month)
+            last = segment.last_time()
+            if last is None or part["time"][0] > last:
+                if segment.count + len(part) <= segment.capacity:
+                    segment.append(part)
+                    added += len(part)
+                    continue
+                new = part
+            else:
+                new = part[~np.isin(part["time"], segment.times())]
+            if len(new):
+                merged = np.sort(np.concatenate([segment.records(), new]), order="time")
+                start, end = _month_bounds(month)
+                self._writers.pop((symbol, interval), None)
+                _Segment.create(segment.path, segment.interval_ms,
+                                max(segment.capacity, (end - start) // segment.interval_ms, len(merged)), merged)
+                added += len(new)
+        return added
+
+    def _slices(self, symbol: str, interval: str, start: int = None, end: int = None):
+        """(segment, lo, hi) for every month overlapping [start, end]"""
+        for month in self.months(symbol, interval):
+            first, stop = _month_bounds(month)
+            if (end is not None and first > end) or (start is not None and stop <= start):
+                continue
+            segment = _Segment(self._path(symbol, interval, month))
+            times = segment.times()
+            lo = 0 if start is None else int(np.searchsorted(times, start, "left"))
+            hi = len(times) if end is None else int(np.searchsorted(times, end, "right"))
+            if hi > lo:
+                yield segment, lo, hi
+
+    def index(self, symbol: str, interval: str) -> list:
+        """Per-month time range and bar count"""
+        return [{"month": str(segment.path[-11:-4]), "first": int(segment.times()[lo]),
+                 "last": int(segment.times()[hi - 1]), "count": hi - lo, "capacity": segment.capacity}
+                for segment, lo, hi in self._slices(symbol, interval)]
+
+    def read(self, symbol: str, interval: str, start: int = None, end: int = None):
+        """Klines with ``start <= open_time <= end`` (ms). Zero-copy memory-mapped
+        views when the range falls in one month; months are concatenated otherwise."""
+        from bot.backtest.data import Klines
+        parts = [Klines(segment.columns["time"][lo:hi], *(segment.columns[n][lo:hi] for n in FIELDS))
+                 for segment, lo, hi in self._slices(symbol, interval, start, end)]
+        if len(parts) == 1:
+            return parts[0]
+        if not parts:
+            return Klines(*(np.empty(0) for _ in range(1 + len(FIELDS))))
+        return Klines(np.concatenate([p.time for p in parts]),
+                      *(np.concatenate([getattr(p, n) for p in parts]) for n in FIELDS))
+
+    # KlineCache interface, so warm starts can read from and fill the archive
+    def load(self, symbol: str, interval: str, start: int = None, end: int = None) -> np.ndarray:
+        parts = [segment.records(lo, hi) for segment, lo, hi in self._slices(symbol, interval, start, end)]
+        return np.concatenate(parts) if parts else np.empty(0, HISTORY)
+
+    def save(self, symbol: str, interval: str, records: np.ndarray):
+        self.extend(symbol, interval, records)
+
+    def compact(self, symbol: str, interval: str, now_ms: int = None) -> int:
+        """Shrink finished months to their bar count; returns bytes reclaimed"""
+        current = _month(int(time.time()*1000) if now_ms is None else now_ms)
+        reclaimed = 0
+        for month in self.months(symbol, interval):
+            if month >= current:
+                continue
+            path = self._path(symbol, interval, month)
+            segment = _Segment(path)
+            if segment.capacity == segment.count:
+                continue
+            records = segment.records()
+            before = os.path.getsize(path)
+            if self._writers.get((symbol, interval), (None,))[0] == month:
+                self._writers.pop((symbol, interval))       # its map is of the file being replaced
+            _Segment.create(path, segment.interval_ms, len(records), records)
+            reclaimed += before - os.path.getsize(path)
+        return reclaimed
+
+    def close(self):
+        for _, segment in self._writers.values():
+            segment.flush()
+        self._writers.clear()
@@ -0,0 +1,346 @@
+"""
+Multi-symbol engine: one GridStrategy stack per trading pair, fed from a
+single combined-stream websocket (/stream?streams=...).
+
+    SYMBOLS=DOGEFDUSD:1100,DOGEUSDT:500
+
+runs two grids, each with its own candle store, indicators, order queue
+and capital cap (``SYMBOL[:cap]``; no cap means FDUSD_CAP).
+"""
+import asyncio
+import logging
+import threading
+from dataclasses import dataclass
+from math import nan
+
+from bot.core.executor import OrderExecutor
+from bot.core.filters import ExchangeFilters
+from bot.core.order_mgr import OrderMgr
+from bot.core.pipeline import CandlePipeline, DAILY_TARGET
+from bot.core.strategy import GridStrategy
+from bot.core.ticks import TickCoalescer
+from bot.services.account import quote_asset
+from bot.services.codec import decode_market
+from bot.services.history import WARM_BARS, load_history
+from bot.services.market_stream import fetch_closed_klines
+from bot.services.state import reconcile
+from bot.services.user_stream import FillDispatcher
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class SymbolConfig:
+    symbol: str
+    fdusd_cap: float = None     # quote capital for this pair's grid (None = FDUSD_CAP)
+    interval: str = "15m"
+
+
+def parse_symbols(spec: str, interval: str = "15m") -> list:
+    """Parse ``"DOGEFDUSD:1100,DOGEUSDT"`` into SymbolConfigs"""
+    configs = []
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        symbol, _, cap = item.partition(":")
+        configs.append(SymbolConfig(symbol.upper(), float(cap) if cap else None, interval))
+    if len({c.symbol for c in configs}) != len(configs):
+        raise ValueError(f"❌ Duplicate symbol in SYMBOLS={spec!r}")
+    if not configs:
+        raise ValueError("❌ SYMBOLS is empty")
+    return configs
+
+
+def stream_names(configs, tick_stream: str = "") -> list:
+    """Stream names for one combined subscription"""
+    names = []
+    for config in configs:
+        sym = config.symbol.lower()
+        names.append(f"{sym}@kline_{config.interval}")
+        if tick_stream == "bookTicker":
+            names.append(f"{sym}@bookTicker")
+        elif tick_stream == "aggTrade":
+            names.append(f"{sym}@aggTrade")
+    return names
+
+
+class SymbolRunner:
+    """Everything that trades one symbol; candles, ticks and fills for it
+    are serialised on ``lock``"""
+
+    def __init__(self, config: SymbolConfig, order_mgr, daily_target: float = DAILY_TARGET,
+                 tick_interval: float = 0.25, archive=None, state=None, journal=None, account=None,
+                 **strategy_params):
+        self.config = config
+        self.symbol = config.symbol
+        self.order_mgr = order_mgr
+        self.archive = archive      # CandleArchive every closed candle is appended to
+        self._archive_day = None    # UTC day of the last archived candle (finished months compact on a new day)
+        self.state = state          # StateStore the strategy is persisted to
+        self.journal = journal      # Journal of order/strategy events (restores when there is no state)
+        self.account = account      # AccountCache shared by every symbol of the account
+        self.executor = OrderExecutor(order_mgr)
+        if config.fdusd_cap is not None:
+            strategy_params["fdusd_cap"] = config.fdusd_cap
+        self.strategy = GridStrategy(order_mgr=self.executor, journal=journal, account=account,
+                                     quote_asset=quote_asset(config.symbol), **strategy_params)
+        self.pipeline = CandlePipeline(self.strategy, symbol=config.symbol,
+                                       interval=config.interval, daily_target=daily_target)
+        self.lock = threading.RLock()
+        self.executor.on_done = self.settle_orders    # order results are applied under the lock
+        self.fills = FillDispatcher(self.strategy, config.symbol, lock=self.lock)
+        self.ticks = TickCoalescer(self.on_price, tick_interval)
+
+    def on_kline(self, k: dict):
+        # Ignore inflight candles; wait until it closes
+        if not k["x"]:
+            return
+        self.on_candle(k["t"], *(float(k[x]) for x in ["o", "h", "l", "c", "v"]))
+
+    def on_candle(self, open_time: int, o: float, h: float, l: float, c: float, v: float):
+        with self.lock:
+            store = self.pipeline.store
+            # A backfill and the live stream can both deliver a candle; closed
+            # candles are final, so anything not newer than the last is a repeat
+            if len(store) and open_time <= store.last_time():
+                logger.debug(f"🔍 {self.symbol}: skipping candle {open_time}, already stored")
+                return
+            if self.account is not None:
+                self.account.set_price(self.symbol, c)
+                self.strategy.reconcile_capital()     # once per candle, from cached balances
+            self.pipeline.on_candle(open_time, o, h, l, c, v)
+            if self.archive is not None:
+                try:
+                    self.archive.append(self.symbol, self.config.interval, open_time, o, h, l, c, v)
+                    if open_time // 86_400_000 != self._archive_day:
+                        self._archive_day = open_time // 86_400_000
+                        self.archive.compact(self.symbol, self.config.interval, now_ms=open_time)
+                except (OSError, ValueError) as e:
+                    logger.warning(f"⚠️ {self.symbol}: could not archive candle {open_time}: {e}")
+            self.save_state()
+
+    async def backfill(self, rest) -> int:
+        """Feed closed candles missed since the last stored one; returns how many"""
+        store = self.pipeline.store
+        if not len(store):
+            return 0
+        rows = await fetch_closed_klines(rest, self.symbol, self.config.interval,
+                                         store.last_time() + self.pipeline.interval_ms)
+        for row in rows:
+            self.on_candle(row[0], *(float(x) for x in row[1:6]))
+        if rows:
+            logger.info(f"📥 {self.symbol}: backfilled {len(rows)} missed {self.config.interval} candles")
+        return len(rows)
+
+    def on_quote(self, price: float, ask: float = None):
+        """A stream price; with ``ask`` it is a bookTicker's best bid. The book is
+        cached as it arrives, the strategy sees coalesced prices"""
+        if ask is not None and self.account is not None:
+            self.account.set_book(self.symbol, price, ask)
+        self.ticks.push(price)
+
+    def on_price(self, price: float):
+        with self.lock:
+            if self.account is not None:
+                self.account.set_price(self.symbol, price)
+            self.pipeline.on_price(price)
+            self.save_state()
+
+    def on_report(self, report):
+        self.fills.on_report(report)
+        self.save_state()
+
+    def settle_orders(self):
+        """Apply finished order calls to the strategy under the lock and persist them"""
+        with self.lock:
+            if self.strategy.settle_orders():
+                self.save_state()
+
+    def save_state(self):
+        """Queue changed strategy state for persistence (no-op without a StateStore)"""
+        if self.state is not None:
+            with self.lock:
+                self.state.sync(self.symbol, self.strategy)
+
+    def restore(self, reconcile_orders: bool = True) -> bool:
+        """Reload persisted strategy state (Redis, else the journal), then square
+        it with the exchange's open orders"""
+        with self.lock:
+            if self.state is not None:
+                restored = self.state.restore(self.symbol, self.strategy)
+            else:
+                restored = self.journal.replay(self.symbol, self.strategy) > 0
+            if reconcile_orders:
+                reconcile(self.strategy, self.order_mgr.client, self.symbol, self.fills)
+            self.save_state()
+        return restored
+
+    def resync(self):
+        """Square the strategy with the exchange's orders again (after a user-stream gap)"""
+        with self.lock:
+            reconcile(self.strategy, self.order_mgr.client, self.symbol, self.fills)
+            self.save_state()
+
+    async def warm_start(self, rest, cache=None, bars: int = WARM_BARS) -> int:
+        """Preload recent history so the first decision doesn't wait for MIN_BARS closes"""
+        records = await load_history(rest, self.symbol, self.config.interval, bars, cache)
+        with self.lock:
+            added = self.pipeline.warm_up(records.tolist())
+        logger.info(f"🔥 {self.symbol}: warm start with {len(self.pipeline.store)} candles")
+        return added
+
+    def status(self) -> dict:
+        strategy = self.strategy
+        store = self.pipeline.store
+        return {
+            "realised_pnl": strategy.realised,
+            "open_ladders": len(strategy.ladders),
+            "cycle_active": bool(strategy.cycle),
+            "capital_cap": strategy.fdusd_cap,
+            "funds_free": strategy.funds_free(),
+            "pending_buys": strategy.pending_buys,
+            "candles": len(store),
+            "last_close": store.last("close") if len(store) else nan,
+            "last_open": store.last_time() if len(store) else nan,
+            "pending_orders": self.executor.pending(),
+        }
+
+
+class SymbolRegistry:
+    """Routes combined-stream messages and execution reports to SymbolRunners"""
+
+    def __init__(self, tick_stream: str = "", archive=None, state=None, journal=None, account=None,
+                 filters=None):
+        self.tick_stream = tick_stream
+        self.archive = archive
+        self.state = state
+        self.journal = journal
+        self.account = account
+        self.filters = filters
+        self.runners = {}
+
+    def add(self, runner: SymbolRunner) -> SymbolRunner:
+        if runner.symbol in self.runners:
+            raise ValueError(f"❌ {runner.symbol} is already registered")
+        self.runners[runner.symbol] = runner
+        return runner
+
+    def __getitem__(self, symbol: str) -> SymbolRunner:
+        return self.runners[symbol]
+
+    def __iter__(self):
+        return iter(self.runners.values())
+
+    def __len__(self):
+        return len(self.runners)
+
+    @property
+    def symbols(self) -> list:
+        return list(self.runners)
+
+    def streams(self) -> list:
+        """Stream names for one combined subscription"""
+        return stream_names([runner.config for runner in self], self.tick_stream)
+
+    def handle_message(self, raw_msg: str):
+        """Dispatch one message (combined {"stream", "data"} envelope or raw stream payload).
+        In-flight klines are dropped by decode_market before they are parsed."""
+        try:
+            decoded = decode_market(raw_msg)
+            if decoded is None:
+                return
+            symbol, candle, price, ask = decoded
+            runner = self.runners.get(symbol)
+            if runner is None:
+                if symbol is not None or len(self.runners) != 1:
+                    return
+                runner = next(iter(self.runners.values()))
+            if candle is not None:
+                runner.on_candle(*candle[1:7])
+            else:
+                runner.on_quote(price, ask)
+        except Exception as e:
+            logger.error(f"❌ Error processing market data: {e}")
+            logger.debug(f"🔍 Raw message that caused error: {raw_msg[:200]}...")
+
+    async def warm_start(self, rest, cache=None, bars: int = WARM_BARS) -> int:
+        """Warm-start every symbol concurrently; a failure leaves that symbol cold"""
+        async def one(runner):
+            try:
+                return await runner.warm_start(rest, cache, bars)
+            except Exception as e:
+                logger.error(f"❌ {runner.symbol}: warm start failed, collecting candles live: {e}")
+                return 0
+
+        return sum(await asyncio.gather(*(one(runner) for runner in self)))
+
+    async def backfill(self, rest) -> int:
+        """Backfill every symbol concurrently"""
+        return sum(await asyncio.gather(*(runner.backfill(rest) for runner in self)))
+
+    def on_report(self, report):
+        """FillDispatcher interface for the account-wide user stream"""
+        runner = self.runners.get(report.symbol)
+        if runner is not None:
+            runner.on_report(report)
+
+    def on_account(self, event: dict):
+        """outboundAccountPosition events from the user stream update the cached balances"""
+        if self.account is not None:
+            self.account.on_account_position(event)
+
+    def resync(self) -> int:
+        """Resync every symbol with the exchange (user stream reconnected); returns how many succeeded"""
+        done = 0
+        for runner in self:
+            try:
+                runner.resync()
+                done += 1
+            except Exception as e:
+                logger.error(f"❌ {runner.symbol}: could not resync with the exchange: {e}")
+        return done
+
+    def restore(self, reconcile_orders: bool = True) -> int:
+        """Restore every symbol from the StateStore or journal; returns how many had saved state.
+        A symbol that fails to restore starts fresh rather than blocking the rest."""
+        restored = 0
+        for runner in self:
+            try:
+                restored += runner.restore(reconcile_orders)
+            except Exception as e:
+                logger.error(f"❌ {runner.symbol}: could not restore state: {e}")
+        return restored
+
+    def status(self) -> dict:
+        return {runner.symbol: runner.status() for runner in self}
+
+
+def build_registry(configs, tick_stream: str = "", tick_interval: float = 0.25,
+                   daily_target: float = DAILY_TARGET, make_order_mgr=None, archive=None,
+                   state=None, journal=None, account=None, filters=None,
+                   **strategy_params) -> SymbolRegistry:
+    """One SymbolRunner per config. By default every symbol gets its own
+    OrderMgr sharing the first one's Spot client (one REST session), one set
+    of exchange filters and the ``account`` prices; an ``account`` cache or
+    ``filters`` without a client gets that client too."""
+    if make_order_mgr is None:
+        shared = {}
+        filters = filters if filters is not None else ExchangeFilters()
+
+        def make_order_mgr(symbol):
+            if "client" not in shared:
+                order_mgr = OrderMgr(symbol=symbol, journal=journal, filters=filters, quotes=account)
+                shared["client"] = order_mgr.client
+                return order_mgr
+            return OrderMgr(symbol=symbol, client=shared["client"], journal=journal,
+                            filters=filters, quotes=account)
+
+    registry = SymbolRegistry(tick_stream=tick_stream, archive=archive, state=state, journal=journal,
+                              account=account, filters=filters)
+    for config in configs:
+        registry.add(SymbolRunner(config, make_order_mgr(config.symbol), daily_target=daily_target,
+                                  tick_interval=tick_interval, archive=archive, state=state,
+                                  journal=journal, account=account, **strategy_params))
+    if account is not None and account.client is None and len(registry):
+        account.client = next(iter(registry)).order_mgr.client
+    if filters is not None and filters.client is None and len(registry):
+        filters.client = next(iter(registry)).order_mgr.client
+    return registry
@@ -0,0 +1,196 @@
+"""
+User-data stream: listenKey lifecycle, executionReport parsing and fill
+dispatch to GridStrategy.
+
+Fills arrive over the account's websocket within milliseconds of matching.
+Each order is handed to the strategy once, when it is fully FILLED (or, for
+a BUY, cancelled or expired after a partial fill), at its volume-weighted
+fill price; partial fills accumulate until then (a rung SELL's progress is
+passed on, so close_all only liquidates the rest). After a reconnect the
+dispatcher is resynced with the exchange, as fills during the gap are not
+streamed.
+"""
+import asyncio
+import logging
+import os
+import random
+import threading
+from dataclasses import dataclass
+
+import websockets
+
+from bot.services.codec import decode_user_event, report_fields
+from bot.services.rest import AsyncRestClient
+
+logger = logging.getLogger(__name__)
+
+USER_STREAM_URL = os.getenv("USER_STREAM_URL", "wss://stream.binance.com:9443")
+KEEPALIVE_SECS = 30*60          # listenKeys expire after 60 minutes without a PUT
+DISPATCHED_MAX = int(os.getenv("FILL_DEDUP_MAX", 10_000))   # recent order IDs remembered as dispatched
+FINAL_STATUSES = ("FILLED", "CANCELED", "EXPIRED", "EXPIRED_IN_MATCH", "REJECTED")
+
+
+@dataclass
+class ExecutionReport:
+    """The executionReport fields the bot uses (names follow the Binance docs)"""
+    symbol: str
+    client_order_id: str
+    side: str
+    order_type: str
+    status: str             # X: NEW, PARTIALLY_FILLED, FILLED, CANCELED, ...
+    execution_type: str     # x: NEW, TRADE, CANCELED, EXPIRED, ...
+    order_id: int
+    price: float
+    qty: float
+    last_qty: float
+    last_price: float
+    filled_qty: float
+    filled_quote: float
+    commission: float
+    commission_asset: str
+    trade_id: int
+    time: int
+
+    @classmethod
+    def from_event(cls, e: dict) -> "ExecutionReport":
+        return cls(*report_fields(e))
+
+    @property
+    def avg_price(self) -> float:
+        return self.filled_quote / self.filled_qty if self.filled_qty else self.price
+
+
+class FillDispatcher:
+    """Turns execution reports into GridStrategy fill calls.
+
+    ``lock`` is shared with the candle handler so fills and ticks never
+    mutate the strategy at the same time.
+    """
+
+    def __init__(self, strategy, symbol: str, lock=None):
+        self.strategy = strategy
+        self.symbol = symbol
+        self.lock = lock or threading.RLock()
+        self._done = {}         # client IDs already dispatched, oldest first (at most DISPATCHED_MAX)
+
+    def mark_done(self, client_order_id: str):
+        """Remember an order as booked, so a report for it is not dispatched again"""
+        self._done[client_order_id] = None
+        if len(self._done) > DISPATCHED_MAX:
+            del self._done[next(iter(self._done))]
+
+    def on_report(self, report: ExecutionReport):
+        if report.symbol != self.symbol:
+            return
+        if report.execution_type == "TRADE":
+            logger.info(f"⚡ {report.side} fill {report.last_qty:g} @ {report.last_price:.6f} "
+                        f"({report.filled_qty:g}/{report.qty:g}) – {report.client_order_id}")
+            if report.side == "SELL" and report.status == "PARTIALLY_FILLED" and \
+                    hasattr(self.strategy, "handle_sell_partial"):
+                with self.lock:
+                    self.strategy.handle_sell_partial(report.client_order_id, report.filled_qty)
+        elif report.execution_type in ("CANCELED", "EXPIRED", "REJECTED"):
+            logger.info(f"🗑️ {report.side} {report.client_order_id} {report.execution_type.lower()}")
+            if report.side == "BUY" and not report.filled_qty and hasattr(self.strategy, "handle_buy_cancel"):
+                with self.lock:
+                    self.strategy.handle_buy_cancel(report.client_order_id)
+        # a BUY that ends part-filled still bought coins: they get their rung
+        filled = report.status == "FILLED" or \
+            (report.side == "BUY" and report.filled_qty > 0 and report.status in FINAL_STATUSES)
+        if not filled or report.client_order_id in self._done:
+            return
+        self.mark_done(report.client_order_id)
+        with self.lock:
+            if report.side == "BUY":
+                self.strategy.handle_buy_fill(report.avg_price, report.filled_qty, report.client_order_id)
+            else:
+                self.strategy.handle_sell_fill(report.avg_price, qty=report.filled_qty,
+                                               order_id=report.client_order_id)
+
+
+class UserStream:
+    """Keeps a listenKey alive and feeds its websocket events to a FillDispatcher"""
+
+    def __init__(self, rest: AsyncRestClient, dispatcher: FillDispatcher,
+                 stream_url: str = USER_STREAM_URL, keepalive: float = KEEPALIVE_SECS,
+                 max_backoff: float = 60.0):
+        self.rest = rest
+        self.dispatcher = dispatcher
+        self.stream_url = stream_url.rstrip("/")
+        self.keepalive = keepalive
+        self.max_backoff = max_backoff
+        self.listen_key = None
+        self.connects = 0
+        self.connected = asyncio.Event()
+        self._stopping = False
+        self._ws = None
+
+    async def run(self):
+        """Connect, consume and reconnect until stop() is called"""
+        backoff = 1.0
+        while not self._stopping:
+            try:
+                self.listen_key = (await self.rest.new_listen_key())["listenKey"]
+                keepalive = asyncio.create_task(self._keepalive(self.listen_key))
+                try:
+                    await self._consume(self.listen_key)
+                    backoff = 1.0
+                finally:
+                    keepalive.cancel()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"❌ User stream error: {e}")
+            self.connected.clear()
+            if not self._stopping:
+                delay = backoff*random.uniform(0.5, 1.0)
+                logger.info(f"🔄 Reconnecting user stream in {delay:.1f}s")
+                await asyncio.sleep(delay)
+                backoff = min(backoff*2, self.max_backoff)
+
+    async def _consume(self, listen_key: str):
+        async with websockets.connect(f"{self.stream_url}/ws/{listen_key}") as ws:
+            self._ws = ws
+            logger.info("📡 User data stream connected")
+            if self.connects and hasattr(self.dispatcher, "resync"):
+                # fills while we were disconnected were never streamed; events
+                # arriving meanwhile wait in the socket until this is done
+                await asyncio.to_thread(self.dispatcher.resync)
+            self.connects += 1
+            self.connected.set()
+            async for raw in ws:
+                if self.handle_message(raw) == "listenKeyExpired":
+                    logger.warning("⚠️ listenKey expired – reconnecting with a new one")
+                    return
+
+    def handle_message(self, raw):
+        """Parse one user-stream message and dispatch it; returns the event type"""
+        try:
+            kind, payload = decode_user_event(raw)
+            if kind == "executionReport":
+                self.dispatcher.on_report(ExecutionReport(*payload))
+            elif kind == "outboundAccountPosition" and hasattr(self.dispatcher, "on_account"):
+                self.dispatcher.on_account(payload)
+            return kind
+        except Exception as e:
+            logger.error(f"❌ Error processing user stream message: {e}")
+            logger.debug(f"🔍 Raw message that caused error: {str(raw)[:200]}...")
+
+    async def _keepalive(self, listen_key: str):
+        while True:
+            await asyncio.sleep(self.keepalive)
+            try:
+                await self.rest.renew_listen_key(listen_key)
+                logger.debug("💓 listenKey renewed")
+            except Exception as e:
+                logger.error(f"❌ listenKey keepalive failed: {e}")
+
+    async def stop(self):
+        self._stopping = True
+        if self._ws is not None:
+            await self._ws.close()
+        if self.listen_key:
+            try:
+                await self.rest.close_listen_key(self.listen_key)
+            except Exception as e:
+                logger.debug(f"🔍 listenKey close failed: {e}")
@@ -1,30 +1,14 @@
-import os, json, asyncio, pandas as pd, logging
-from datetime import datetime, date
-from binance.websocket.spot.websocket_stream import SpotWebsocketStreamClient
-from bot.core.strategy import GridStrategy
-from bot.core.order_mgr import OrderMgr
-from bot.core.indicators import atr, ema, boll_pct
-
-# DEBUG: Log environment variables to identify BASE_URL issue
-logging.basicConfig(level=logging.INFO)
-logging.info(f"🔍 DEBUG: BINANCE_BASE_URL env = {os.getenv('BINANCE_BASE_URL')!r}")
-logging.info(f"🔍 DEBUG: BASE_URL env = {os.getenv('BASE_URL')!r}")
-logging.info(f"🔍 DEBUG: API_KEY env = {(os.getenv('API_KEY') or 'None')[:20]}...")
-logging.info(f"🔍 DEBUG: BINANCE_API_KEY env = {(os.getenv('BINANCE_API_KEY') or 'None')[:20]}...")
-
-# Global configuration
-DAILY_TARGET = float(os.getenv("DAILY_TARGET", 6.0))
-_last_target_date: date = None
-
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.StreamHandler(),
-        logging.FileHandler('/tmp/dogebot_websocket.log')
-    ]
-)
+import os, asyncio, logging
+from bot.core.pipeline import DAILY_TARGET
+from bot.services.account import ACCOUNT_REFRESH_SECS, AccountCache
+from bot.services.history import kline_cache
+from bot.services.journal import JOURNAL_DIR, Journal, journal_dirs
+from bot.services.market_stream import MARKET_REST_URL, StreamSupervisor
+from bot.services.state import REDIS_URL, StateStore
+from bot.services.store import CANDLE_ARCHIVE_DIR, CandleArchive
+from bot.services.symbols import build_registry, parse_symbols
+from bot.services.user_stream import UserStream
+
 logger = logging.getLogger(__name__)
 
 SYMBOL  = "DOGEFDUSD"  # Your actual trading pair
@@ -35,131 +19,72 @@ IS_TEST = "testnet" in (os.getenv("BINANCE_BASE_URL") or os.getenv("BASE_URL", "
 # Note: For testnet trading, we still use LIVE market data streams
 # because Binance testnet doesn't provide separate WebSocket streams
 BASE = os.getenv("BINANCE_BASE_URL") or os.getenv("BASE_URL", "")  # Support both Railway and local
-if "testnet" in BASE:
-    # For testnet trading, use live market data streams
-    STREAM_URL = "wss://stream.binance.com:9443"
-    logger.info("🧪 Testnet mode: Using live market data streams")
-else:
-    STREAM_URL = "wss://stream.binance.com:9443"
-    logger.info("🚀 Live mode: Using live market data streams")
-
-# Initialize components  
-order_mgr = OrderMgr(symbol=SYMBOL)  # Explicitly pass the symbol to match
-strategy  = GridStrategy(order_mgr=order_mgr)
-
-bars = pd.DataFrame(columns=["open", "high", "low", "close","volume"])
+STREAM_URL = "wss://stream.binance.com:9443"
+
+TICK_STREAM = os.getenv("TICK_STREAM", "")   # optional sub-candle ladder placement: bookTicker | aggTrade
+TICK_INTERVAL = float(os.getenv("TICK_INTERVAL_MS", 250)) / 1000
+
+# Built by build() on first use, not at import: importing this module opens
+# no clients, files or connections
+COMPONENTS = ("symbol_configs", "registry", "order_mgr", "primary", "executor", "strategy", "pipeline",
+              "bars", "indicators", "strategy_lock", "fills", "ticks")
+
+
+def build():
+    """Create every symbol's runner and the shared clients (once); returns the registry.
+
+    Components: one runner per symbol, all sharing one REST client and one
+    combined market-data connection. The first symbol's pieces are also
+    module attributes (``strategy``, ``bars``, ...), as before.
+    """
+    global SYMBOL, symbol_configs, registry, order_mgr, primary, executor, strategy, pipeline
+    global bars, indicators, strategy_lock, fills, ticks
+    if "registry" in globals():
+        return registry
+    logger.info(f"{'🧪 Testnet' if 'testnet' in BASE else '🚀 Live'} mode: Using live market data streams")
+
+    symbol_configs = parse_symbols(os.getenv("SYMBOLS") or SYMBOL)  # e.g. DOGEFDUSD:1100,DOGEUSDT:500
+    SYMBOL = symbol_configs[0].symbol
+    built = build_registry(symbol_configs, tick_stream=TICK_STREAM, tick_interval=TICK_INTERVAL,
+                           daily_target=DAILY_TARGET,
+                           archive=CandleArchive() if CANDLE_ARCHIVE_DIR else None,
+                           state=StateStore.from_url(REDIS_URL).start() if REDIS_URL else None,
+                           journal=Journal(JOURNAL_DIR, peers=journal_dirs(JOURNAL_DIR)).start()
+                           if JOURNAL_DIR else None,
+                           account=AccountCache() if ACCOUNT_REFRESH_SECS else None)
+    if built.account is not None:
+        built.account.start()       # balances for funds_free and /status, kept current by the user stream
+    built.filters.preload(built.symbols)   # one exchangeInfo request for every symbol's tick/step sizes
+    order_mgr = built[SYMBOL].order_mgr   # the Spot client is shared by every symbol
+
+    # The first symbol's components, as before
+    primary   = built[SYMBOL]
+    executor  = primary.executor     # REST calls run off the websocket thread
+    strategy  = primary.strategy
+    pipeline  = primary.pipeline
+    bars = pipeline.store              # ring buffer, keeps the last MAX_BARS closed candles
+    indicators = pipeline.indicators   # streaming ATR/EMA/BB/VWAP, updated once per closed candle
+    strategy_lock = primary.lock       # candles arrive on the connector's thread, fills on the event loop
+    fills = primary.fills
+    ticks = primary.ticks
+    registry = built
+    return registry
+
+
+def __getattr__(name):
+    if name in COMPONENTS:
+        build()
+        return globals()[name]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 # ------------ 2.  message handlers -------------------------------
-def handle_kline(_, raw_msg: str):
-    """Handle incoming kline messages from WebSocket"""
-    global _last_target_date
-    now = datetime.utcnow()
-    
+def handle_message(_, raw_msg: str):
+    """Route market data (klines and optional price ticks) to each symbol's runner"""
     # Log all messages for debugging
     logger.debug(f"🔍 Raw WebSocket message: {raw_msg[:200]}...")
-    
-    # reset at midnight UTC
-    if _last_target_date != now.date():
-        strategy.realised = 0.0
-        _last_target_date = now.date()
-        logger.info(f"🌄 New day reset – realised PnL cleared")
-
-    # pause trading if daily target met
-    if strategy.realised >= DAILY_TARGET:
-        logger.info(f"🎯 Daily target ${DAILY_TARGET:.2f} reached – waiting for tomorrow")
-        return
+    build().handle_message(raw_msg)
 
-    try:
-        data = json.loads(raw_msg)
-        
-        # Spot WS sends an ACK first: {"result":null}
-        if "k" not in data:
-            return
-            
-        kline_data = data["k"]
-        
-        # Ignore inflight candles; wait until it closes
-        if not kline_data["x"]:  # "x" == candle_is_closed
-            return
-        
-        # Store closed candle data
-        idx = pd.to_datetime(kline_data["t"], unit="ms")
-        bars.loc[idx, ["open", "high", "low", "close"]] = [
-            float(kline_data[x]) for x in ["o", "h", "l", "c"]
-        ]
-        
-        # Prevent unbounded growth - keep only last 500 bars
-        if len(bars) > 500:
-            bars.drop(bars.index[:-250], inplace=True)
-        
-        # Log first successful closed candle
-        if len(bars) == 1:
-            logger.info(f"🎯 First closed kline stored: {kline_data['c']} at {idx}")
-        
-        logger.info(f"💹 Closed 15-min candle: {kline_data['c']} (#{len(bars)})")
-        
-        logger.debug(f"📊 Candles collected: {len(bars)}/10 (need 10 for strategy)")
-
-        if len(bars) < 20:
-            logger.info(f"⏳ Still collecting candles: {len(bars)}/10 needed")
-            return
-
-        df = bars.iloc[-30:].copy()
-        df["atr"]  = atr(df)
-        df["ema"]  = ema(df["close"])
-        df["bb"]   = boll_pct(df)
-
-        price   = df["close"].iat[-1]
-        atr_now = df["atr"].iat[-1]
-        
-        # Better ATR debugging
-        if pd.isna(atr_now):
-            logger.warning(f"⚠️ ATR is NaN, skipping this candle. Available data: {len(df)} candles")
-            return
-        
-        logger.info(f"📊 Technical Analysis - Price: {price:.6f}, ATR: {atr_now:.6f}, BB: {df['bb'].iat[-1]:.3f}, EMA_ratio: {price/df['ema'].iat[-1]:.4f}")
-
-        # Check for 2% drop in recent candles (CRITICAL MISSING CONDITION)
-        def check_recent_drop(df_data, lookback=2):
-            """Ensure we're buying the dip, not buying strength"""
-            if len(df_data) < lookback + 1:
-                return False
-            recent_high = df_data['high'].tail(lookback).max()
-            current_price = df_data['close'].iat[-1]
-            drop_percent = (recent_high - current_price) / recent_high
-            return drop_percent >= 0.02  # Require 2% pullback
-        
-        drop_confirmed = check_recent_drop(df)
-
-        # More flexible entry conditions for testing:
-        # Original: df["bb"].iat[-1] <= 0.15 and price > 0.97 * df["ema"].iat[-1]
-        # Test conditions: More lenient for easier triggering
-        bb_condition = df["bb"].iat[-1] <= 0.30  # Increased from 0.15 to 0.30
-        ema_condition = price > 0.95 * df["ema"].iat[-1]  # Decreased from 0.97 to 0.95
-
-        if not strategy.cycle:
-            logger.info(
-                f"⏳ Waiting for entry – BB: {df['bb'].iat[-1]:.3f} ≤ 0.30, "
-                f"EMA: {price/df['ema'].iat[-1]:.4f} > 0.95, Drop: {drop_confirmed}"
-            )
-            
-            # CRITICAL: Check all conditions and trigger buy if met
-            if bb_condition and ema_condition and drop_confirmed:
-                logger.info(
-                    f"🎯 ALL CONDITIONS MET! BB={df['bb'].iat[-1]:.3f} ≤ 0.30, "
-                    f"EMA={price/df['ema'].iat[-1]:.4f} > 0.95, 2% Drop=True"
-                )
-                strategy.start_cycle(price, atr_now)
-
-        strategy.on_tick(price, atr_now)
-        
-        # Optional: Print live price updates
-        logger.debug(f"💹 Kline update: {kline_data['c']}")
-        
-    except Exception as e:
-        logger.error(f"❌ Error processing kline data: {e}")
-        # Print the raw message for debugging
-        logger.debug(f"🔍 Raw message that caused error: {raw_msg[:200]}...")
+handle_kline = handle_message
 
 def handle_error(_, err):
     """Handle WebSocket errors"""
@@ -167,31 +92,47 @@ def handle_error(_, err):
 
 # ------------ 3.  async websocket coroutine -----------------------
 async def start_websocket():
-    """Start the websocket connection with new v3+ API"""
+    """Run the combined market-data stream under a StreamSupervisor: it reconnects
+    with jittered backoff when the stream errors, closes or goes quiet, and
+    backfills missed closed candles from REST before live data resumes"""
+    from bot.services.rest import AsyncRestClient
+    build()
+    market_rest = AsyncRestClient(base_url=MARKET_REST_URL)   # public klines, no keys
+    streams = registry.streams()
+    logger.info(f"🔌 Connecting to WebSocket for {', '.join(registry.symbols)} market data...")
+    logger.info(f"📡 Subscribing to {len(streams)} streams: {', '.join(streams)}")
+    if TICK_STREAM:
+        logger.info(f"⚡ Tick mode: {TICK_STREAM}, ladder checks at most every {TICK_INTERVAL*1000:.0f} ms")
+
+    # Load recent history first so the first decision comes on the next
+    # close instead of after MIN_BARS of them
+    await registry.warm_start(market_rest, kline_cache(registry.archive))
+
+    supervisor = StreamSupervisor(streams, lambda raw: handle_message(None, raw),
+                                  backfill=lambda: registry.backfill(market_rest),
+                                  stream_url=STREAM_URL)
     try:
-        logger.info(f"🔌 Connecting to WebSocket for {SYMBOL} market data...")
-        
-        # Initialize without custom stream_url - let Binance client handle it
-        ws = SpotWebsocketStreamClient(
-            on_message=handle_kline,
-            on_error=handle_error,
-        )
-        
-        logger.info(f"📡 Subscribing to {SYMBOL} 15m klines...")
-        # Subscribe without callback parameter (v3+ API)
-        ws.kline(symbol=SYMBOL, interval="15m")
-        
-        logger.info("🎉 WebSocket handshake successful, now listening…")
-        
-        # keep this async task alive forever (no ws.start() in v3+)
-        while True:
-            await asyncio.sleep(3600)  # 1 h heartbeat
-            
-    except Exception as e:
-        logger.error(f"❌ WebSocket failed to start: {e}")
-        # Retry after delay
-        await asyncio.sleep(10)
-        logger.info("🔄 Retrying WebSocket connection...")
-        await start_websocket()
+        await supervisor.run()
+    finally:
+        await market_rest.close()
+
+async def restore_state():
+    """Reload ladders/cycle/PnL from Redis (or the journal) and reconcile them with
+    open orders; runs before either stream starts so no fill is applied to a blank grid"""
+    build()
+    if registry.state is not None or registry.journal is not None:
+        restored = await asyncio.to_thread(registry.restore)
+        logger.info(f"♻️ Restored state for {restored}/{len(registry)} symbols")
+
+async def start_user_stream():
+    """Listen for our own order updates and hand fills to the strategy"""
+    from bot.services.rest import SharedLoopClient, get_async_client
+    build()
+    # the orders' session and weight budget: one per account
+    rest = SharedLoopClient(get_async_client(order_mgr.client.api_key, order_mgr.client.api_secret,
+                                             order_mgr.client.base_url))
+    stream_url = os.getenv("USER_STREAM_URL") or (
+        "wss://stream.testnet.binance.vision" if IS_TEST else "wss://stream.binance.com:9443")
+    await UserStream(rest, registry, stream_url=stream_url).run()
 
 # Don't auto-start - let it be started manually to avoid startup crashes
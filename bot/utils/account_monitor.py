@@ -1,16 +1,22 @@
 """
 Account monitoring utilities for DogeBot
+
+Balances and prices go through an AccountCache, so repeated calls within
+ACCOUNT_REFRESH_SECS / PRICE_TTL_SECS cost no extra REST requests.
 """
 import os
 import logging
-from binance.spot import Spot
 from datetime import datetime
 from dotenv import load_dotenv
 
+from bot.services.account import AccountCache
+
 logger = logging.getLogger(__name__)
 
 class AccountMonitor:
     def __init__(self):
+        from binance.spot import Spot
+
         load_dotenv()
         
         # Get environment variables - support both Railway.app and local names
@@ -45,6 +51,8 @@ class AccountMonitor:
         except Exception as e:
             print(f"❌ Failed to initialize public client: {e}")
             self.public_client = None
+
+        self.account = AccountCache(self.client)
     
     def get_account_balance(self):
         """Get account balances for relevant assets"""
@@ -53,24 +61,10 @@ class AccountMonitor:
             return {}
             
         try:
-            account_info = self.client.account()
-            balances = {}
-            
-            for balance in account_info['balances']:
-                asset = balance['asset']
-                free = float(balance['free'])
-                locked = float(balance['locked'])
-                total = free + locked
-                
-                # Only show assets with non-zero balance
-                if total > 0.001:  # Small threshold to avoid dust
-                    balances[asset] = {
-                        'free': free,
-                        'locked': locked,
-                        'total': total
-                    }
-            
-            return balances
+            # Only show assets with non-zero balance
+            return {asset: {'free': b.free, 'locked': b.locked, 'total': b.total}
+                    for asset, b in self.account.get_balances().items()
+                    if b.total > 0.001}  # Small threshold to avoid dust
             
         except Exception as e:
             logger.error(f"❌ Failed to get account balance: {e}")
@@ -79,8 +73,7 @@ class AccountMonitor:
     def get_current_price(self, symbol="DOGEFDUSD"):
         """Get current price for a symbol"""
         try:
-            ticker = self.client.ticker_price(symbol=symbol)
-            return float(ticker['price'])
+            return self.account.price(symbol)
         except Exception as e:
             logger.error(f"❌ Failed to get price for {symbol}: {e}")
             return None
@@ -92,7 +85,7 @@ class AccountMonitor:
     def get_24h_ticker(self, symbol="DOGEFDUSD"):
         """Get 24h ticker statistics"""
         try:
-            ticker = self.client.ticker_24hr(symbol=symbol)
+            ticker = self.account.ticker_24hr(symbol)
             return {
                 'symbol': ticker['symbol'],
                 'price': float(ticker['lastPrice']),
@@ -121,7 +114,8 @@ class AccountMonitor:
         else:
             print("❌ Unable to fetch account balances")
         
-        # Get DOGE prices
+        # Get DOGE prices (the 24h ticker fetched first also caches the price)
+        ticker = self.get_24h_ticker("DOGEFDUSD")
         print("\n📊 Current Prices:")
         
         doge_fdusd_price = self.get_current_price("DOGEFDUSD")
@@ -130,7 +124,6 @@ class AccountMonitor:
         
         # Get 24h stats
         print("\n📈 24h Statistics (DOGEFDUSD):")
-        ticker = self.get_24h_ticker("DOGEFDUSD")
         if ticker:
             change_emoji = "📈" if ticker['change'] >= 0 else "📉"
             print(f"  Price: ${ticker['price']:.6f}")
@@ -142,5 +135,18 @@ class AccountMonitor:
         print(f"\n🕐 Updated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
         print("=" * 50)
 
-# Create global monitor instance
-monitor = AccountMonitor()
+_monitor = None
+
+
+def get_monitor() -> AccountMonitor:
+    """Shared AccountMonitor, created on first use (its clients are not needed at import)"""
+    global _monitor
+    if _monitor is None:
+        _monitor = AccountMonitor()
+    return _monitor
+
+
+def __getattr__(name):
+    if name == "monitor":
+        return get_monitor()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
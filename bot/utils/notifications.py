@@ -1,52 +1,193 @@
 #!/usr/bin/env python3
 """
 Discord/Telegram webhook notifications for DogeBot
+
+Callers only enqueue: a background thread owns the webhook connections
+(one pooled requests.Session), so a slow endpoint never blocks fill
+handling. Messages arriving within NOTIFY_COALESCE_MS of each other go out
+as one post, with bursts of trade fills folded into a single digest line.
+The queue is bounded; when it is full, low-priority messages (fills) are
+dropped to make room for high-priority ones (targets, errors).
 """
+import atexit
+import logging
 import os
-import requests
-import asyncio
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
 from datetime import datetime
 
+logger = logging.getLogger(__name__)
+
 DISCORD_WEBHOOK_URL = os.getenv("DISCORD_WEBHOOK_URL")
-TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN") 
+TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
 TELEGRAM_CHAT_ID = os.getenv("TELEGRAM_CHAT_ID")
+QUEUE_SIZE = int(os.getenv("NOTIFY_QUEUE_SIZE", 100))
+COALESCE_SECS = float(os.getenv("NOTIFY_COALESCE_MS", 1000)) / 1000
+DIGEST_AFTER = 3            # more trade messages than this in one post become a digest line
 
-def send_notification(message: str, level: str = "INFO"):
-    """Send notification to Discord and/or Telegram"""
-    timestamp = datetime.now().strftime("%H:%M:%S")
-    formatted_message = f"🤖 **DogeBot** `{timestamp}` {message}"
-    
-    # Discord webhook
-    if DISCORD_WEBHOOK_URL:
-        try:
-            emoji = {"INFO": "📊", "SUCCESS": "✅", "ERROR": "❌", "PROFIT": "💰"}.get(level, "📊")
-            requests.post(DISCORD_WEBHOOK_URL, json={
-                "content": f"{emoji} {formatted_message}"
-            }, timeout=5)
-        except Exception as e:
-            print(f"Discord notification failed: {e}")
-    
-    # Telegram
-    if TELEGRAM_BOT_TOKEN and TELEGRAM_CHAT_ID:
+LOW, HIGH = 0, 1
+EMOJI = {"INFO": "📊", "SUCCESS": "✅", "ERROR": "❌", "PROFIT": "💰"}
+
+
+@dataclass
+class Message:
+    text: str
+    level: str = "INFO"
+    priority: int = LOW
+    trade: tuple = None     # (action, price, qty, pnl) for fill messages, so bursts can be summarised
+    time: float = 0.0
+
+
+def _digest(trades: list) -> Message:
+    sides = {}
+    for action, _, qty, _ in (m.trade for m in trades):
+        count, total = sides.get(action, (0, 0))
+        sides[action] = (count + 1, total + qty)
+    summary = ", ".join(f"{count} {action} ({total:,.0f} DOGE)" for action, (count, total) in sides.items())
+    pnl = next((m.trade[3] for m in reversed(trades) if m.trade[3]), None)
+    span = trades[-1].time - trades[0].time
+    text = f"📦 {len(trades)} fills in {span:.1f}s: {summary}" + (f" | PnL: ${pnl:.4f}" if pnl else "")
+    return Message(text, "PROFIT" if pnl else "SUCCESS", trade=None)
+
+
+def coalesce(messages: list) -> list:
+    """Fold runs of trade messages into digest lines; other messages are kept in order"""
+    trades = [m for m in messages if m.trade is not None]
+    if len(trades) <= DIGEST_AFTER:
+        return messages
+    others = [m for m in messages if m.trade is None]
+    return others + [_digest(trades)]
+
+
+class Notifier:
+    """Bounded queue of messages and the thread that posts them"""
+
+    def __init__(self, discord_url: str = DISCORD_WEBHOOK_URL, telegram_token: str = TELEGRAM_BOT_TOKEN,
+                 telegram_chat: str = TELEGRAM_CHAT_ID, maxsize: int = QUEUE_SIZE,
+                 coalesce_interval: float = COALESCE_SECS, session: "requests.Session" = None):
+        self.discord_url = discord_url
+        self.telegram_url = f"https://api.telegram.org/bot{telegram_token}/sendMessage" \
+            if telegram_token and telegram_chat else None
+        self.telegram_chat = telegram_chat
+        self.maxsize = maxsize
+        self.coalesce_interval = coalesce_interval
+        self.session = session
+        self.sent = 0               # posts made
+        self.dropped = 0
+        self._queue = deque()
+        self._cond = threading.Condition()
+        self._busy = False
+        self._thread = None
+        self._stopping = False
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.discord_url or self.telegram_url)
+
+    def submit(self, text: str, level: str = "INFO", priority: int = LOW, trade: tuple = None) -> bool:
+        """Queue a message without blocking; False if it was dropped"""
+        if not self.enabled:
+            return False
+        message = Message(text, level, priority, trade, time.monotonic())
+        with self._cond:
+            if len(self._queue) >= self.maxsize:
+                victim = next((m for m in self._queue if m.priority == LOW), None)
+                if victim is None or priority == LOW:
+                    self.dropped += 1
+                    return False
+                self._queue.remove(victim)     # make room: shed a fill for an alert
+                self.dropped += 1
+            self._queue.append(message)
+            self._cond.notify()
+        if self._thread is None:
+            self.start()
+        return True
+
+    # ---- sender thread -------------------------------------------------------
+    def start(self) -> "Notifier":
+        with self._cond:
+            if self._thread is None:
+                if self.session is None:
+                    import requests     # only once something is sent
+                    from requests.adapters import HTTPAdapter
+                    self.session = requests.Session()
+                    self.session.mount("https://", HTTPAdapter(pool_connections=2, pool_maxsize=2))
+                self._stopping = False
+                self._thread = threading.Thread(target=self._run, daemon=True, name="notifier")
+                self._thread.start()
+        return self
+
+    def _run(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._queue or self._stopping)
+                if not self._queue:
+                    return
+                self._busy = True
+            if not self._stopping:
+                time.sleep(self.coalesce_interval)      # let the rest of a burst arrive
+            with self._cond:
+                batch = list(self._queue)
+                self._queue.clear()
+            try:
+                self._send(coalesce(batch))
+            finally:
+                with self._cond:
+                    self._busy = False
+                    self._cond.notify_all()
+
+    def _send(self, messages: list):
+        stamp = datetime.now().strftime("%H:%M:%S")
+        lines = [f"🤖 **DogeBot** `{stamp}` {m.text}" for m in messages]
+        if self.discord_url:
+            content = "\n".join(f"{EMOJI.get(m.level, '📊')} {line}" for m, line in zip(messages, lines))
+            self._post(self.discord_url, {"content": content[:2000]}, "Discord")
+        if self.telegram_url:
+            self._post(self.telegram_url, {"chat_id": self.telegram_chat, "text": "\n".join(lines)[:4096],
+                                           "parse_mode": "Markdown"}, "Telegram")
+
+    def _post(self, url: str, payload: dict, name: str):
         try:
-            url = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/sendMessage"
-            requests.post(url, json={
-                "chat_id": TELEGRAM_CHAT_ID,
-                "text": formatted_message,
-                "parse_mode": "Markdown"
-            }, timeout=5)
+            self.session.post(url, json=payload, timeout=5).raise_for_status()
+            self.sent += 1
         except Exception as e:
-            print(f"Telegram notification failed: {e}")
+            logger.warning(f"⚠️ {name} notification failed: {e}")
+
+    def flush(self, timeout: float = 10.0) -> bool:
+        """Wait until everything queued so far has been posted"""
+        with self._cond:
+            return self._cond.wait_for(lambda: not self._queue and not self._busy, timeout)
+
+    def stop(self, timeout: float = 10.0):
+        """Send what is queued, then stop the sender"""
+        if self._thread is None:
+            return
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+        self._thread.join(timeout)
+        self._thread = None
+
+
+notifier = Notifier()
+atexit.register(notifier.stop)
+
+
+def send_notification(message: str, level: str = "INFO", priority: int = LOW, trade: tuple = None) -> bool:
+    """Queue a notification to Discord and/or Telegram; returns immediately"""
+    return notifier.submit(message, level, priority, trade)
 
 # Convenience functions
 def notify_trade(action: str, price: float, qty: int, pnl: float = None):
     if pnl:
-        send_notification(f"{action} {qty} DOGE @ ${price:.6f} | PnL: ${pnl:.4f}", "PROFIT")
+        send_notification(f"{action} {qty} DOGE @ ${price:.6f} | PnL: ${pnl:.4f}", "PROFIT", trade=(action, price, qty, pnl))
     else:
-        send_notification(f"{action} {qty} DOGE @ ${price:.6f}", "SUCCESS")
+        send_notification(f"{action} {qty} DOGE @ ${price:.6f}", "SUCCESS", trade=(action, price, qty, pnl))
 
 def notify_target_hit(pnl: float, target: float):
-    send_notification(f"🎯 DAILY TARGET HIT! PnL: ${pnl:.4f} >= ${target:.4f}", "SUCCESS")
+    send_notification(f"🎯 DAILY TARGET HIT! PnL: ${pnl:.4f} >= ${target:.4f}", "SUCCESS", priority=HIGH)
 
 def notify_error(error: str):
-    send_notification(f"Error: {error}", "ERROR")
+    send_notification(f"Error: {error}", "ERROR", priority=HIGH)
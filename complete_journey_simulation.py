@@ -14,18 +14,29 @@ from datetime import datetime, timedelta
 sys.path.append('/home/shubham/DogeBot')
 from bot.core.indicators import atr, ema, boll_pct
 from bot.core.strategy import GridStrategy
+from bot.core.signals import EntryParams, check_recent_drop
 
 class MockOrderMgr:
     def __init__(self):
         self.orders = []
     
-    def post_limit_maker(self, side, price, qty):
+    def post_limit_maker(self, side, price, qty, client_order_id=None):
         self.orders.append({"side": side, "price": price, "qty": qty})
         print(f"        🔥 ORDER PLACED: {side} {qty} DOGE @ {price:.6f}")
         return {"orderId": len(self.orders)}
 
-def simulate_websocket_tick(df, strategy, candle_num):
-    """Simulate exact websocket logic for each candle"""
+    def post_batch(self, orders):
+        return [self.post_limit_maker(*order) for order in orders]
+
+    def cancel_order(self, order_id=None, client_order_id=None):
+        pass
+
+def simulate_websocket_tick(df, strategy, candle_num, drop_lookback=3):
+    """Simulate exact websocket logic for each candle.
+
+    ``drop_lookback`` highs (current bar included) set the 2% drop reference;
+    the default 3 is this script's original ``tail(lookback + 1)`` window,
+    pass 2 for the live bot's DROP_LOOKBACK."""
     
     print(f"\n📊 CANDLE #{candle_num} - Processing...")
     
@@ -48,15 +59,8 @@ def simulate_websocket_tick(df, strategy, candle_num):
         return False, "ATR NaN"
     
     # 2% drop check (from enhanced websocket.py)
-    def check_recent_drop(df_data, lookback=2):
-        if len(df_data) < lookback + 1:
-            return False
-        recent_high = df_data['high'].tail(lookback + 1).max()
-        current_price = df_data['close'].iat[-1]
-        drop_percent = (recent_high - current_price) / recent_high
-        return drop_percent >= 0.02
-    
-    drop_confirmed = check_recent_drop(df)
+    drop_confirmed = check_recent_drop(df['high'].to_numpy(), df['close'].iat[-1],
+                                       EntryParams(drop_lookback=drop_lookback))
     
     # Check all conditions (exactly like websocket.py)
     bb_condition = df["bb"].iat[-1] <= 0.30
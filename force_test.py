@@ -83,14 +83,13 @@ def create_test_candles():
             'close': close_price
         })
     
-    # Update the global bars DataFrame
-    global bars
+    # Update the global candle store
     for i, (date, data) in enumerate(zip(dates, test_data)):
-        bars.loc[date] = [data['open'], data['high'], data['low'], data['close']]
+        bars.append(int(date.value // 10**6), data['open'], data['high'], data['low'], data['close'])
     
     print(f"✅ Created {len(bars)} test candles")
-    print(f"  - Price range: ${bars['low'].min():.6f} - ${bars['high'].max():.6f}")
-    print(f"  - Latest close: ${bars['close'].iloc[-1]:.6f}")
+    print(f"  - Price range: ${bars.column('low').min():.6f} - ${bars.column('high').max():.6f}")
+    print(f"  - Latest close: ${bars.last('close'):.6f}")
     
     return True
 
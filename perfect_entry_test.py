@@ -15,11 +15,17 @@ class MockOrderMgr:
     def __init__(self):
         self.orders = []
     
-    def post_limit_maker(self, side, price, qty):
+    def post_limit_maker(self, side, price, qty, client_order_id=None):
         self.orders.append({"side": side, "price": price, "qty": qty})
         print(f"    🔥 {side} ORDER: {qty} DOGE @ {price:.6f} FDUSD")
         return {"orderId": len(self.orders)}
 
+    def post_batch(self, orders):
+        return [self.post_limit_maker(*order) for order in orders]
+
+    def cancel_order(self, order_id=None, client_order_id=None):
+        pass
+
 def create_perfect_entry_scenario():
     """Create a scenario that will definitely trigger all conditions"""
     
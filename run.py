@@ -1,11 +1,22 @@
+import argparse
 import os
 import uvicorn
 from bot.utils.env_mapper import setup_environment
-from bot.app import app
 
 # Set up environment variables for Railway.app compatibility
 setup_environment()
 
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="DogeBot")
+    parser.add_argument("--shards", type=int, default=None,
+                        help="supervisor mode: run SYMBOLS in N worker processes (env SHARDS, 0 = single process)")
+    args = parser.parse_args()
+    if args.shards is not None:
+        os.environ["SHARDS"] = str(args.shards)
+
+    # Imported here so spawned shard processes don't build the app
+    from bot.app import app, configure_logging
+    configure_logging()
+
     port = int(os.getenv('PORT', 8000))
     uvicorn.run(app, host='0.0.0.0', port=port)
\ No newline at end of file
@@ -5,6 +5,7 @@ Test script to verify DogeBot buy conditions are working properly
 import pandas as pd
 import numpy as np
 from bot.core.indicators import atr, ema, boll_pct
+from bot.core.signals import check_recent_drop
 
 def test_buy_conditions():
     """Test all buy condition logic"""
@@ -58,16 +59,7 @@ def test_buy_conditions():
     print(f"   EMA ratio: {ema_ratio:.4f}")
     
     # Test 2% drop detection
-    def check_recent_drop(df_data, lookback=2):
-        """Ensure we're buying the dip, not buying strength"""
-        if len(df_data) < lookback + 1:
-            return False
-        recent_high = df_data['high'].tail(lookback).max()
-        current_price = df_data['close'].iat[-1]
-        drop_percent = (recent_high - current_price) / recent_high
-        return drop_percent >= 0.02  # Require 2% pullback
-    
-    drop_confirmed = check_recent_drop(df_last30)
+    drop_confirmed = check_recent_drop(df_last30['high'].to_numpy(), df_last30['close'].iat[-1])
     recent_high = df_last30['high'].tail(2).max()
     drop_pct = (recent_high - price) / recent_high * 100
     
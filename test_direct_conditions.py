@@ -4,6 +4,7 @@ Direct test of the exact buy condition logic from websocket.py
 """
 import pandas as pd
 import numpy as np
+from bot.core.signals import check_recent_drop
 
 def test_buy_conditions_directly():
     """Test buy conditions with exact websocket.py logic"""
@@ -49,15 +50,7 @@ def test_buy_conditions_directly():
     print(f"  EMA ratio: {ema_ratio:.4f}")
     
     # Exact drop check from websocket.py
-    def check_recent_drop(df_data, lookback=2):
-        if len(df_data) < lookback + 1:
-            return False
-        recent_high = df_data['high'].tail(lookback).max()
-        current_price = df_data['close'].iat[-1]
-        drop_percent = (recent_high - current_price) / recent_high
-        return drop_percent >= 0.02
-    
-    drop_confirmed = check_recent_drop(df)
+    drop_confirmed = check_recent_drop(df['high'].to_numpy(), df['close'].iat[-1])
     recent_high = df['high'].tail(2).max()
     drop_pct = (recent_high - price) / recent_high * 100
     
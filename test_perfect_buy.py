@@ -5,6 +5,7 @@ Test that creates a perfect buy scenario to verify all conditions trigger
 import pandas as pd
 import numpy as np
 from bot.core.indicators import atr, ema, boll_pct
+from bot.core.signals import check_recent_drop
 
 def create_perfect_buy_scenario():
     """Create data that will trigger all buy conditions"""
@@ -74,15 +75,7 @@ def create_perfect_buy_scenario():
     print(f"   EMA Ratio: {ema_ratio:.4f}")
     
     # Test 2% drop (same function as websocket.py)
-    def check_recent_drop(df_data, lookback=2):
-        if len(df_data) < lookback + 1:
-            return False
-        recent_high = df_data['high'].tail(lookback).max()
-        current_price = df_data['close'].iat[-1]
-        drop_percent = (recent_high - current_price) / recent_high
-        return drop_percent >= 0.02
-    
-    drop_confirmed = check_recent_drop(df_test)
+    drop_confirmed = check_recent_drop(df_test['high'].to_numpy(), df_test['close'].iat[-1])
     recent_high = df_test['high'].tail(2).max()
     drop_pct = (recent_high - price) / recent_high * 100
     
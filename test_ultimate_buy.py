@@ -5,6 +5,7 @@ Create the PERFECT buy signal that triggers all 3 conditions
 import pandas as pd
 import numpy as np
 from bot.core.indicators import atr, ema, boll_pct
+from bot.core.signals import check_recent_drop
 
 def force_perfect_buy():
     """Force create data that WILL trigger all conditions"""
@@ -142,15 +143,7 @@ def test_actual_websocket_logic():
         ema_ratio = price / df["ema"].iat[-1]
         
         # Exact same drop check as websocket.py
-        def check_recent_drop(df_data, lookback=2):
-            if len(df_data) < lookback + 1:
-                return False
-            recent_high = df_data['high'].tail(lookback).max()
-            current_price = df_data['close'].iat[-1]
-            drop_percent = (recent_high - current_price) / recent_high
-            return drop_percent >= 0.02
-        
-        drop_confirmed = check_recent_drop(df)
+        drop_confirmed = check_recent_drop(df['high'].to_numpy(), df['close'].iat[-1])
         
         # Exact same conditions as websocket.py
         bb_condition = bb_value <= 0.30
@@ -0,0 +1,24 @@
+import pytest
+
+
+def pytest_addoption(parser):
+    parser.addoption("--runslow", action="store_true", default=False,
+                     help="also run tests marked slow (e.g. 10M-bar benchmarks)")
+
+
+def pytest_collection_modifyitems(config, items):
+    if config.getoption("--runslow"):
+        return
+    skip_slow = pytest.mark.skip(reason="needs --runslow")
+    for item in items:
+        if "slow" in item.keywords:
+            item.add_marker(skip_slow)
+
+
+@pytest.fixture
+def fake_binance():
+    """Local stand-in for the spot REST API (see fake_binance.py)"""
+    from fake_binance import FakeBinance
+    fake = FakeBinance().start()
+    yield fake
+    fake.stop()
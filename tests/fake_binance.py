@@ -0,0 +1,155 @@
+"""
+Local stand-in for the Binance spot REST API, served from a
+ThreadingHTTPServer so the real HTTP clients can be exercised in tests.
+"""
+import hashlib
+import hmac
+import itertools
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
+
+API_KEY = "key"
+SECRET = "test-secret"
+MATCH_AND_TAKE = "Order would immediately match and take."
+
+
+class FakeBinance:
+    """Order book of one symbol with a settable market price.
+
+    LIMIT_MAKER orders that would cross ``market`` are rejected with -2010
+    like the real exchange. Extra endpoints can be registered in ``routes``
+    as ``(method, path) -> fn(params) -> (status, body)``.
+    """
+
+    def __init__(self, market: float = 0.2):
+        self.market = market
+        self.delay = 0.0            # seconds to hold every request
+        self.used_weight = 100
+        self.orders = {}
+        self.requests = []
+        self.routes = {}
+        self.klines = {}            # symbol -> kline rows (REST array layout), oldest first
+        self.peers = set()
+        self.inflight = 0
+        self.max_inflight = 0
+        self.lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._httpd = None
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self._httpd.server_port}"
+
+    def start(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"   # keep-alive
+
+            def log_message(self, *args):
+                pass
+
+            def handle_any(self):
+                fake._dispatch(self)
+
+            do_GET = do_POST = do_PUT = do_DELETE = handle_any
+
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=self._httpd.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    # ---- request handling ---------------------------------------------------
+    def _dispatch(self, handler):
+        url = urlsplit(handler.path)
+        length = int(handler.headers.get("Content-Length") or 0)
+        body = handler.rfile.read(length).decode() if length else ""
+        query = url.query or body
+        with self.lock:
+            self.peers.add(handler.client_address)
+            self.inflight += 1
+            self.max_inflight = max(self.max_inflight, self.inflight)
+            self.used_weight += 1
+            self.requests.append((handler.command, url.path))
+        try:
+            if self.delay:
+                time.sleep(self.delay)
+            status, payload, headers = self._route(handler, url.path, query)
+        finally:
+            with self.lock:
+                self.inflight -= 1
+        data = json.dumps(payload).encode()
+        handler.send_response(status)
+        handler.send_header("Content-Type", "application/json")
+        handler.send_header("Content-Length", str(len(data)))
+        handler.send_header("X-MBX-USED-WEIGHT-1M", str(self.used_weight))
+        for key, value in headers:
+            handler.send_header(key, value)
+        handler.end_headers()
+        handler.wfile.write(data)
+
+    def _route(self, handler, path, query):
+        params = dict(parse_qsl(query))
+        if "signature" in params:
+            unsigned, _, signature = query.rpartition("&signature=")
+            expected = hmac.new(SECRET.encode(), unsigned.encode(), hashlib.sha256).hexdigest()
+            if handler.headers.get("X-MBX-APIKEY") != API_KEY or signature != expected:
+                return 401, {"code": -1022, "msg": "Signature for this request is not valid."}, ()
+            del params["signature"]
+
+        custom = self.routes.get((handler.command, path))
+        if custom is not None:
+            status, payload = custom(params)
+            return status, payload, ()
+        if path == "/api/v3/ping":
+            return 200, {}, ()
+        if path == "/api/v3/busy":
+            return 429, {"code": -1003, "msg": "Too many requests"}, [("Retry-After", "7")]
+        if path == "/api/v3/order" and handler.command == "POST":
+            return self._new_order(params)
+        if path == "/api/v3/order" and handler.command == "DELETE":
+            return self._cancel_order(params)
+        if path == "/api/v3/klines":
+            return 200, self._klines(params), ()
+        if path == "/api/v3/openOrders":
+            with self.lock:
+                return 200, [o for o in self.orders.values() if o["status"] == "NEW"], ()
+        return 200, {"path": path, "params": params}, ()
+
+    def _klines(self, params):
+        start = int(params.get("startTime", 0))
+        end = int(params.get("endTime", 2**63 - 1))
+        limit = min(int(params.get("limit", 500)), 1000)
+        rows = [r for r in self.klines.get(params["symbol"], []) if start <= r[0] <= end]
+        return rows[:limit] if "startTime" in params else rows[-limit:]
+
+    def _new_order(self, params):
+        price, side = float(params["price"]), params["side"]
+        if params["type"] == "LIMIT_MAKER" and (
+                (side == "BUY" and price >= self.market) or (side == "SELL" and price <= self.market)):
+            return 400, {"code": -2010, "msg": MATCH_AND_TAKE}, ()
+        with self.lock:
+            order_id = next(self._ids)
+            order = {"symbol": params["symbol"], "orderId": order_id,
+                     "clientOrderId": params.get("newClientOrderId", f"fake-{order_id}"),
+                     "price": params["price"], "origQty": params["quantity"], "side": side,
+                     "type": params["type"], "status": "NEW", "fills": []}
+            self.orders[order_id] = order
+        return 200, order, ()
+
+    def _cancel_order(self, params):
+        with self.lock:
+            for order in self.orders.values():
+                if str(order["orderId"]) == params.get("orderId") or \
+                        order["clientOrderId"] == params.get("origClientOrderId"):
+                    if order["status"] != "NEW":
+                        break
+                    order["status"] = "CANCELED"
+                    return 200, order, ()
+        return 400, {"code": -2011, "msg": "Unknown order sent."}, ()
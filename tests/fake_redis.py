@@ -0,0 +1,60 @@
+"""
+In-memory stand-in for the few redis-py hash commands StateStore uses.
+
+    fake = FakeRedis()
+    fake.down = True        # every command raises ConnectionError until reset
+"""
+
+
+class FakeRedis:
+    def __init__(self):
+        self.data = {}          # key -> {field: value}
+        self.executed = []      # command count of every executed pipeline
+        self.down = False
+
+    def _check(self):
+        if self.down:
+            raise ConnectionError("fake redis is down")
+
+    def hset(self, key, mapping):
+        self._check()
+        self.data.setdefault(key, {}).update({k: str(v) for k, v in mapping.items()})
+        return len(mapping)
+
+    def hdel(self, key, *fields):
+        self._check()
+        table = self.data.get(key, {})
+        removed = sum(table.pop(f, None) is not None for f in fields)
+        if not table:
+            self.data.pop(key, None)
+        return removed
+
+    def hgetall(self, key):
+        self._check()
+        return dict(self.data.get(key, {}))
+
+    def delete(self, *keys):
+        self._check()
+        return sum(self.data.pop(k, None) is not None for k in keys)
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+
+class FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.commands = []
+
+    def __getattr__(self, name):
+        def queue(*args, **kwargs):
+            self.commands.append((name, args, kwargs))
+            return self
+        return queue
+
+    def execute(self):
+        self.redis._check()
+        self.redis.executed.append(len(self.commands))
+        results = [getattr(self.redis, name)(*args, **kwargs) for name, args, kwargs in self.commands]
+        self.commands = []
+        return results
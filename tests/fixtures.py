@@ -0,0 +1,72 @@
+"""
+Shared test data and the original pandas indicator implementations, kept as
+the reference the NumPy kernels and streaming indicators are checked against.
+"""
+import numpy as np
+import pandas as pd
+
+from bot.backtest import Klines
+
+
+def make_candles(n: int, seed: int = 42, price: float = 0.2) -> pd.DataFrame:
+    """Random-walk DOGE-like OHLCV bars"""
+    rng = np.random.default_rng(seed)
+    close = price * np.exp(np.cumsum(rng.normal(0, 0.002, n)))
+    spread = np.abs(rng.normal(0, 0.001, (2, n)))
+    return pd.DataFrame({
+        "open": np.r_[close[:1], close[:-1]],
+        "high": close * (1 + spread[0]),
+        "low": close * (1 - spread[1]),
+        "close": close,
+        "volume": rng.uniform(1e4, 1e5, n),
+    })
+
+
+def legacy_atr(df: pd.DataFrame, win: int = 14) -> pd.Series:
+    if len(df) < win:
+        return pd.Series([np.nan] * len(df), index=df.index)
+    with np.errstate(invalid='ignore'):
+        tr = np.maximum.reduce([
+            df['high'] - df['low'],
+            (df['high'] - df['close'].shift()).abs(),
+            (df['low'] - df['close'].shift()).abs()
+        ])
+    atr_series = pd.Series(tr, index=df.index).rolling(win).mean()
+    if len(df) >= 2 and atr_series.first_valid_index() is not None:
+        atr_series = atr_series.bfill()
+    return atr_series
+
+
+def legacy_boll_pct(df: pd.DataFrame, win: int = 20, dev: int = 2) -> pd.Series:
+    if len(df) < win:
+        return pd.Series([np.nan] * len(df), index=df.index)
+    mb = df['close'].rolling(win, min_periods=1).mean()
+    sd = df['close'].rolling(win, min_periods=1).std()
+    upper = mb + dev*sd
+    lower = mb - dev*sd
+    return (df['close'] - lower)/(upper - lower)
+
+
+def legacy_ema(series: pd.Series, span: int = 200) -> pd.Series:
+    return series.ewm(span=span, adjust=False).mean()
+
+
+def legacy_vwap(df: pd.DataFrame) -> pd.Series:
+    typical_price = (df['high'] + df['low'] + df['close']) / 3
+    return (typical_price * df['volume']).cumsum() / df['volume'].cumsum()
+
+
+T0 = 1_700_000_000_000
+MIN = 60_000
+
+
+def dip_and_recover(n_flat=60, price=0.2):
+    """Flat market, a sharp 4% dip (entry signal), a leg lower, then a bounce"""
+    closes = [price]*n_flat + [price*0.96, price*0.955, price*0.95, price*0.96, price*0.97, price*0.98]
+    closes += [price*0.98]*10
+    closes = np.array(closes)
+    opens = np.r_[closes[0], closes[:-1]]
+    highs = np.maximum(opens, closes)*1.002
+    lows = np.minimum(opens, closes)*0.998
+    times = T0 + np.arange(len(closes))*MIN
+    return Klines(times, opens, highs, lows, closes, np.full(len(closes), 1e5))
@@ -0,0 +1,97 @@
+import json
+import threading
+import time
+
+from bot.services.account import AccountCache, quote_asset
+from bot.services.symbols import build_registry, parse_symbols
+from bot.services.user_stream import UserStream
+from test_symbols import Recorder, kline
+from test_user_stream import RECORDED
+
+
+class FakeSpot:
+    """account/ticker endpoints with a call log; ``delay`` keeps a request in flight"""
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.calls = []
+
+    def account(self):
+        self.calls.append("account")
+        time.sleep(self.delay)
+        return {"updateTime": 1, "balances": [
+            {"asset": "FDUSD", "free": "500.0", "locked": "0.0"},
+            {"asset": "DOGE", "free": "0.0", "locked": "0.0"}]}
+
+    def ticker_price(self, symbol):
+        self.calls.append(("price", symbol))
+        return {"symbol": symbol, "price": "0.2"}
+
+    def ticker_24hr(self, symbol):
+        self.calls.append(("24hr", symbol))
+        return {"symbol": symbol, "lastPrice": "0.21", "priceChange": "0.01", "priceChangePercent": "5",
+                "highPrice": "0.22", "lowPrice": "0.19", "volume": "1000"}
+
+
+def test_concurrent_callers_share_one_refresh():
+    client = FakeSpot(delay=0.2)
+    account = AccountCache(client, ttl=60)
+    assert account.free("FDUSD") is None                # nothing cached yet, and no request made
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(account.get_balances())) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert client.calls == ["account"] and len(results) == 8
+    assert all(r["FDUSD"].free == 500.0 and "DOGE" not in r for r in results)
+    account.get_balances()
+    assert client.calls == ["account"]                  # fresh: served from memory
+    account.get_balances(max_age=0)
+    assert client.calls == ["account"]*2
+
+
+def test_prices_come_from_the_stream_before_rest():
+    client = FakeSpot()
+    account = AccountCache(client, price_ttl=60)
+    account.set_price("DOGEFDUSD", 0.19)
+    assert account.price("DOGEFDUSD") == 0.19 and client.calls == []
+    assert account.ticker_24hr("DOGEUSDT")["lastPrice"] == "0.21"
+    assert account.price("DOGEUSDT") == 0.21 and client.calls == [("24hr", "DOGEUSDT")]
+    assert account.price("SHIBFDUSD") == 0.2 and account.price("SHIBFDUSD") == 0.2
+    assert client.calls.count(("price", "SHIBFDUSD")) == 1
+
+
+def test_account_events_update_balances_and_cap_funds_free():
+    account = AccountCache(FakeSpot(), ttl=60)
+    registry = build_registry(parse_symbols("DOGEFDUSD:1100,DOGEUSDT:250", interval="1m"),
+                              make_order_mgr=Recorder, notify=False, account=account)
+    try:
+        doge = registry["DOGEFDUSD"]
+        assert doge.strategy.quote_asset == "FDUSD" and registry["DOGEUSDT"].strategy.quote_asset == "USDT"
+        assert doge.strategy.funds_free() == 1100            # no balances yet: the cap alone
+        account.refresh()
+        registry.handle_message(json.dumps(kline("DOGEFDUSD", 0, "0.195")))     # candles reconcile
+        assert doge.strategy.funds_free() == 500             # the exchange has less than the cap
+        assert account.snapshot()["prices"] == {"DOGEFDUSD": 0.195}
+
+        stream = UserStream(rest=None, dispatcher=registry)
+        assert stream.handle_message(RECORDED[2]) == "outboundAccountPosition"
+        assert account.events == 1 and account.free("FDUSD") == 1043.0
+        assert account.balances["DOGE"].total == 100.0
+        for i, symbol in enumerate(("DOGEFDUSD", "DOGEUSDT")):
+            registry.handle_message(json.dumps(kline(symbol, 60_000*(i + 1), "0.195")))
+        assert doge.strategy.funds_free() == 1043.0
+        assert registry["DOGEUSDT"].strategy.funds_free() == 0.0   # no USDT in the account
+
+        account.on_account_position({"u": 0, "B": [{"a": "FDUSD", "f": "1", "l": "0"}]})   # stale
+        assert account.free("FDUSD") == 1043.0
+    finally:
+        for runner in registry:
+            runner.executor.shutdown()
+
+
+def test_quote_asset():
+    assert quote_asset("DOGEFDUSD") == "FDUSD" and quote_asset("DOGEUSDT") == "USDT"
+    assert quote_asset("DOGEBTC") == "BTC"
@@ -0,0 +1,118 @@
+import asyncio
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from bot.backtest import load_klines
+from bot.services.history import load_history
+from bot.services.rest import AsyncRestClient
+from bot.services.store import HISTORY, CandleArchive
+from bot.services.symbols import build_registry, parse_symbols
+from test_market_stream import MIN, rows
+from test_symbols import Recorder
+
+MARCH = int(pd.Timestamp("2024-03-31 23:00", tz="UTC").value // 10**6)
+HOUR = 60*MIN
+
+
+def candles(start, n, step=MIN, price=0.2):
+    records = np.zeros(n, dtype=HISTORY)
+    records["time"] = start + np.arange(n)*step
+    records["close"] = price + np.arange(n)*1e-4
+    records["open"] = records["high"] = records["low"] = records["close"]
+    records["volume"] = 1.0
+    return records
+
+
+def test_appends_are_split_into_monthly_segments_and_read_by_range(tmp_path):
+    archive = CandleArchive(str(tmp_path))
+    assert archive.extend("DOGEFDUSD", "1h", candles(MARCH, 3, HOUR)) == 3   # Mar 31 23:00 -> Apr 1 01:00
+    assert not archive.append("DOGEFDUSD", "1h", MARCH, 1, 1, 1, 1, 1)        # not newer: dropped
+    assert archive.append("DOGEFDUSD", "1h", MARCH + 3*HOUR, 1, 1, 1, 1, 1)
+
+    index = archive.index("DOGEFDUSD", "1h")
+    assert [(i["month"], i["count"]) for i in index] == [("2024-03", 1), ("2024-04", 3)]
+    assert index[1]["capacity"] == 30*24 and index[1]["last"] == MARCH + 3*HOUR
+
+    klines = archive.read("DOGEFDUSD", "1h", start=MARCH + HOUR, end=MARCH + 2*HOUR)
+    assert klines.time.tolist() == [MARCH + HOUR, MARCH + 2*HOUR]
+    assert isinstance(klines.time.base, np.memmap) or isinstance(klines.time, np.memmap)
+    assert len(archive.read("DOGEFDUSD", "1h")) == 4
+    assert len(archive.read("DOGEUSDT", "1h")) == 0
+
+
+def test_older_candles_fill_holes_and_compaction_shrinks_finished_months(tmp_path):
+    archive = CandleArchive(str(tmp_path))
+    records = candles(MARCH - 10*HOUR, 14, HOUR)
+    archive.extend("DOGEFDUSD", "1h", records[::2])
+    assert archive.extend("DOGEFDUSD", "1h", records) == 7
+    assert np.array_equal(archive.load("DOGEFDUSD", "1h"), records)
+
+    march = os.path.join(str(tmp_path), "DOGEFDUSD", "1h", "2024-03.bin")
+    assert archive.compact("DOGEFDUSD", "1h", now_ms=MARCH + 2*HOUR) > 0
+    assert os.path.getsize(march) == 64 + 11*6*8
+    assert np.array_equal(archive.load("DOGEFDUSD", "1h"), records)
+    assert archive.compact("DOGEFDUSD", "1h", now_ms=MARCH + 2*HOUR) == 0
+
+
+def test_late_bars_reopen_a_compacted_month(tmp_path):
+    archive = CandleArchive(str(tmp_path))
+    records = candles(MARCH - 10*HOUR, 11, HOUR)
+    archive.extend("DOGEFDUSD", "1h", records[:5])
+    assert archive.compact("DOGEFDUSD", "1h", now_ms=MARCH + 2*HOUR) > 0      # full: 5 of 5 slots
+    assert archive.index("DOGEFDUSD", "1h")[0]["capacity"] == 5
+
+    archive = CandleArchive(str(tmp_path))                                    # after a restart
+    assert archive.append("DOGEFDUSD", "1h", *records[5].tolist())           # a late backfill
+    assert archive.extend("DOGEFDUSD", "1h", records) == 5
+    assert not archive.append("DOGEFDUSD", "1h", *records[-1].tolist())      # already archived
+    assert np.array_equal(archive.load("DOGEFDUSD", "1h"), records)
+    assert archive.index("DOGEFDUSD", "1h")[0]["capacity"] == 31*24
+
+
+def test_runner_archives_closed_candles_for_backtests(tmp_path):
+    archive = CandleArchive(str(tmp_path))
+    registry = build_registry(parse_symbols("DOGEFDUSD", interval="1m"), make_order_mgr=Recorder,
+                              notify=False, archive=archive)
+    runner = registry["DOGEFDUSD"]
+    try:
+        for t in (0, 1, 1, 2):      # the repeat is deduped before archiving
+            runner.on_candle(t*MIN, 0.2, 0.2, 0.2, 0.2 + t/100, 1.0)
+    finally:
+        runner.executor.shutdown()
+    archive.close()
+
+    klines = load_klines(tmp_path, "DOGEFDUSD", "1m", start="1970-01-01 00:01")
+    assert klines.time.tolist() == [MIN, 2*MIN] and klines.close.tolist() == pytest.approx([0.21, 0.22])
+
+
+def test_runner_compacts_finished_months_on_a_new_day(tmp_path):
+    archive = CandleArchive(str(tmp_path))
+    registry = build_registry(parse_symbols("DOGEFDUSD", interval="1h"), make_order_mgr=Recorder,
+                              notify=False, archive=archive)
+    runner = registry["DOGEFDUSD"]
+    try:
+        for t in range(3):          # 23:00 on March 31st, then April
+            runner.on_candle(MARCH + t*HOUR, 0.2, 0.2, 0.2, 0.2, 1.0)
+    finally:
+        runner.executor.shutdown()
+    archive.close()
+    march, april = archive.index("DOGEFDUSD", "1h")
+    assert (march["count"], march["capacity"]) == (1, 1) and april["count"] == 2
+
+
+def test_warm_start_reads_the_archive_and_stores_what_it_fetched(fake_binance, tmp_path):
+    archive = CandleArchive(str(tmp_path))
+    archive.extend("DOGEFDUSD", "1m", candles(0, 90))
+    fake_binance.klines["DOGEFDUSD"] = rows(0, 101)
+
+    async def go():
+        async with AsyncRestClient(base_url=fake_binance.url) as rest:
+            return await load_history(rest, "DOGEFDUSD", "1m", 100, archive, now_ms=100*MIN + 1)
+
+    records = asyncio.run(go())
+    assert len(records) == 100 and records["close"][0] == pytest.approx(0.2)
+    assert fake_binance.requests.count(("GET", "/api/v3/klines")) == 1
+    assert archive.index("DOGEFDUSD", "1m")[0]["count"] == 100
@@ -0,0 +1,58 @@
+import numpy as np
+import pytest
+
+from bot.backtest import Backtest, SimOrderMgr, SimOrderRejected, load_klines
+from fixtures import MIN, T0, dip_and_recover
+
+
+def test_sim_limit_maker_reprices_and_fills_next_bar():
+    sim = SimOrderMgr(cash=1000)
+    sim.last_price = 0.2
+    resp = sim.post_limit_maker("BUY", 0.21, 100)       # would take, lands one tick below
+    assert float(resp["price"]) == pytest.approx(0.19999)
+    assert sim.match(0, T0, 0.25, 0.1) == []            # same bar: not eligible yet
+    fills = sim.match(1, T0 + MIN, 0.2, 0.1999)
+    assert [f.order_id for f in fills] == [resp["orderId"]]
+    assert sim.base == 100
+    assert sim.equity(0.19999) == pytest.approx(1000)
+
+
+def test_sim_rejects_unfunded_orders_and_releases_on_cancel():
+    sim = SimOrderMgr(cash=10)
+    with pytest.raises(SimOrderRejected):
+        sim.post_limit_maker("BUY", 0.2, 100)
+    with pytest.raises(SimOrderRejected):
+        sim.post_limit_maker("SELL", 0.2, 1)
+    resp = sim.post_limit_maker("BUY", 0.05, 100)
+    assert sim.cash == pytest.approx(5)
+    sim.cancel_order(resp["orderId"])
+    assert sim.cash == pytest.approx(10) and not sim.open
+
+
+def test_backtest_enters_on_dip_and_round_trips():
+    result = Backtest(dip_and_recover(), interval="1m", step_mult=0.25,
+                      qty0=300, qty_inc=50, fdusd_cap=1100, daily_target=1e9).run()
+    assert result.cycles == 1
+    trades = result.trades_frame()
+    assert {"BUY", "SELL"} <= set(trades["side"])
+    sells = trades[trades["side"] == "SELL"]
+    assert (sells["pnl"] > 0).all()
+    assert len(result.equity) == len(dip_and_recover())
+    assert result.summary()["fills"] == len(trades)
+
+
+def test_load_klines_binance_dump_and_header_csv(tmp_path):
+    raw = tmp_path / "DOGEFDUSD-1m.csv"
+    # Binance dumps: no header, microsecond timestamps since 2025
+    raw.write_text("\n".join(
+        f"{(T0 + i*MIN)*1000},0.2,0.21,0.19,0.2{i},1000,{(T0 + (i+1)*MIN)*1000 - 1},200,10,500,100,0"
+        for i in (1, 0, 2)))
+    k = load_klines(raw)
+    assert k.time.tolist() == [T0, T0 + MIN, T0 + 2*MIN]
+    assert k.close.tolist() == [0.20, 0.21, 0.22]
+
+    named = tmp_path / "bars.csv"
+    k.to_frame().assign(time=k.time).to_csv(named, index=False)
+    again = load_klines(named)
+    np.testing.assert_array_equal(again.time, k.time)
+    np.testing.assert_array_equal(again.close, k.close)
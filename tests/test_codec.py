@@ -0,0 +1,50 @@
+import json
+from pathlib import Path
+
+import pytest
+
+from bot.services.codec import BACKENDS, Candle, Codec, kline_closed
+from bot.services.user_stream import ExecutionReport
+from test_user_stream import RECORDED
+
+STREAM = (Path(__file__).parent / "data" / "market_stream.jsonl").read_text().splitlines()
+
+
+def reference(raw):
+    """What the stdlib path decodes, without the pre-filter"""
+    return Codec("json").decode_market(raw, closed_only=False)
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_backends_agree_on_captured_market_stream(backend):
+    codec = Codec(backend)
+    decoded = [codec.decode_market(raw) for raw in STREAM]
+    expected = [d if d is None or d[1] is None or d[1].closed else None for d in map(reference, STREAM)]
+    assert decoded == expected
+    candles = [d[1] for d in decoded if d and d[1]]
+    assert len(candles) == 10 and all(isinstance(c, Candle) and c.closed for c in candles)
+    assert sum(1 for d in decoded if d and d[2] is not None) > 100
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_backends_agree_on_execution_reports(backend):
+    codec = Codec(backend)
+    for raw in RECORDED:
+        kind, payload = codec.decode_user_event(raw)
+        assert kind == json.loads(raw)["e"]
+        if kind == "executionReport":
+            assert ExecutionReport(*payload) == ExecutionReport.from_event(json.loads(raw))
+
+
+def test_prefilter_skips_inflight_klines_in_either_spacing():
+    compact = next(raw for raw in STREAM if '"x":false' in raw)
+    assert not kline_closed(compact)
+    assert not kline_closed(json.dumps(json.loads(compact)))
+    assert kline_closed(next(raw for raw in STREAM if '"x":true' in raw))
+    assert Codec("json").decode_market(compact) is None
+    assert Codec("json").decode_market(compact, closed_only=False)[1].closed is False
+
+
+def test_unknown_backend_is_rejected():
+    with pytest.raises(ValueError):
+        Codec("simdjson")
@@ -0,0 +1,26 @@
+"""
+Stream decoding throughput on captured payloads (tests/data/market_stream.jsonl:
+in-flight and closed 1m klines, aggTrades and bookTickers in combined envelopes).
+``legacy`` is the old handle_kline path: json.loads on everything, float() per field.
+
+    pytest tests/test_codec_benchmarks.py --benchmark-columns=mean,ops
+    python -m bot.services.codec tests/data/market_stream.jsonl
+"""
+import pytest
+
+from bot.services.codec import BACKENDS, Codec, _legacy
+from test_codec import STREAM
+
+
+def decode_all(fn):
+    for raw in STREAM:
+        fn(raw)
+
+
+@pytest.mark.parametrize("impl", ["legacy"] + BACKENDS)
+def test_decode_throughput(benchmark, impl):
+    fn = _legacy if impl == "legacy" else Codec(impl).decode_market
+    benchmark.group = "stream-decode"
+    benchmark(decode_all, fn)
+    if benchmark.stats:
+        benchmark.extra_info["msgs_per_sec"] = round(len(STREAM) / benchmark.stats.stats.mean)
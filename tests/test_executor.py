@@ -0,0 +1,67 @@
+import threading
+import time
+
+import pytest
+
+from bot.core.executor import OrderExecutor, OrderQueueFull
+
+
+class SlowOrderMgr:
+    symbol = "DOGEFDUSD"
+
+    def __init__(self):
+        self.events = []
+        self.release = threading.Event()
+
+    def post_limit_maker(self, side, price, qty, client_order_id=None):
+        self.release.wait(5)
+        if qty <= 0:
+            raise ValueError("bad qty")
+        self.events.append((side, price, qty))
+        return {"orderId": len(self.events), "side": side}
+
+    def cancel_order(self, order_id=None, client_order_id=None):
+        self.events.append(("CANCEL", order_id))
+        return {"orderId": order_id}
+
+
+def test_submit_returns_immediately_and_preserves_order():
+    mgr = SlowOrderMgr()
+    ex = OrderExecutor(mgr)
+    started = time.perf_counter()
+    futures = [ex.post_limit_maker("BUY", 0.2, 100), ex.cancel_order(7),
+               ex.post_limit_maker("SELL", 0.21, 100)]
+    assert time.perf_counter() - started < 0.5
+    assert not futures[0].done()
+
+    mgr.release.set()
+    assert futures[2].result(timeout=5)["side"] == "SELL"
+    assert mgr.events == [("BUY", 0.2, 100), ("CANCEL", 7), ("SELL", 0.21, 100)]
+    ex.shutdown()
+
+
+def test_errors_surface_on_the_future():
+    mgr = SlowOrderMgr()
+    mgr.release.set()
+    ex = OrderExecutor(mgr)
+    with pytest.raises(ValueError):
+        ex.post_limit_maker("BUY", 0.2, 0).result(timeout=5)
+    assert ex.post_limit_maker("BUY", 0.2, 1).result(timeout=5)["orderId"] == 1
+    ex.shutdown()
+
+
+def test_bounded_queue_applies_backpressure():
+    mgr = SlowOrderMgr()
+    ex = OrderExecutor(mgr, maxsize=2)
+    first = ex.post_limit_maker("BUY", 0.2, 1)
+    while not first.running():        # worker picked it up and is blocked on the REST call
+        time.sleep(0.001)
+    ex.post_limit_maker("BUY", 0.2, 2)
+    ex.post_limit_maker("BUY", 0.2, 3)
+    with pytest.raises(OrderQueueFull):
+        ex.post_limit_maker("BUY", 0.2, 4)
+    mgr.release.set()
+    ex.shutdown()
+    assert [e[2] for e in mgr.events] == [1, 2, 3]
+    with pytest.raises(RuntimeError):
+        ex.post_limit_maker("BUY", 0.2, 5)
@@ -0,0 +1,79 @@
+from decimal import Decimal
+
+import pytest
+from binance.spot import Spot
+
+from bot.core.filters import ExchangeFilters, FilterError, SymbolFilters
+from bot.core.order_mgr import OrderMgr
+from bot.services.account import AccountCache
+from fake_binance import API_KEY, SECRET
+
+DOGE = {"symbol": "DOGEFDUSD", "filters": [
+    {"filterType": "PRICE_FILTER", "minPrice": "0.00001000", "maxPrice": "1000.00000000",
+     "tickSize": "0.00001000"},
+    {"filterType": "LOT_SIZE", "minQty": "1.00000000", "maxQty": "9000000.00000000", "stepSize": "1.00000000"},
+    {"filterType": "NOTIONAL", "minNotional": "1.00000000", "applyMinToMarket": True,
+     "maxNotional": "9000000.00000000"},
+]}
+
+
+def test_exchange_info_rounding_is_decimal_exact():
+    rules = SymbolFilters.from_symbol_info(DOGE)
+    assert (rules.tick_size, rules.step_size, rules.min_notional) == (Decimal("0.00001"), 1, 1)
+    assert format(rules.round_price(0.19, "BUY"), "f") == "0.19000"     # no 0.18999999...
+    assert rules.round_price(0.190019, "BUY") == Decimal("0.19001")
+    assert rules.round_price(0.190011, "SELL") == Decimal("0.19002")
+    assert format(rules.round_qty(1052.7), "f") == "1052"
+
+    assert rules.prepare("BUY", 0.2, 1000, last=0.19) == (Decimal("0.18999"), 1000)    # would take
+    assert rules.prepare("SELL", 0.18, 1000, last=0.19) == (Decimal("0.19001"), 1000)
+    book = (0.19, 0.19002)                                                              # best bid, ask
+    assert rules.prepare("BUY", 0.19001, 1000, last=0.19, book=book) == (Decimal("0.19001"), 1000)
+    assert rules.prepare("BUY", 0.2, 1000, book=book) == (Decimal("0.19001"), 1000)
+    assert rules.prepare("SELL", 0.19, 1000, book=book) == (Decimal("0.19001"), 1000)
+    with pytest.raises(FilterError, match="MIN_NOTIONAL"):
+        rules.prepare("BUY", 0.19, 5)
+    with pytest.raises(FilterError, match="LOT_SIZE"):
+        rules.prepare("SELL", 0.19, 0.6)
+    with pytest.raises(FilterError, match="PRICE_FILTER"):
+        rules.prepare("SELL", 1001, 10)
+
+
+def test_filters_load_once_and_fall_back_when_unreachable():
+    class Client:
+        calls = 0
+        fail = False
+
+        def exchange_info(self, symbol=None, symbols=None):
+            self.calls += 1
+            if self.fail:
+                raise ConnectionError("down")
+            return {"symbols": [{**DOGE, "symbol": s} for s in (symbols or [symbol])]}
+
+    client = Client()
+    filters = ExchangeFilters(client, ttl=3600)
+    assert filters.preload(["DOGEFDUSD", "DOGEUSDT"]) and client.calls == 1
+    assert filters.get("DOGEUSDT").min_notional == 1 and client.calls == 1
+
+    client.fail = True
+    assert filters.get("SHIBFDUSD").tick_size == Decimal("0.00001")     # defaults, logged
+    assert filters.get("SHIBFDUSD") and client.calls == 2               # not retried per order
+    assert filters.get("DOGEFDUSD").min_notional == 1                   # earlier rules are kept
+
+
+def test_doomed_orders_never_reach_the_exchange(fake_binance):
+    fake_binance.routes[("GET", "/api/v3/exchangeInfo")] = lambda params: (200, {"symbols": [DOGE]})
+    client = Spot(api_key=API_KEY, api_secret=SECRET, base_url=fake_binance.url)
+    quotes = AccountCache(client, price_ttl=60)
+    quotes.set_price("DOGEFDUSD", 0.2)
+    mgr = OrderMgr(symbol="DOGEFDUSD", client=client, filters=ExchangeFilters(client), quotes=quotes)
+
+    with pytest.raises(FilterError):
+        mgr.post_limit_maker("BUY", 0.19, 3)                 # 0.57 FDUSD
+    assert not mgr.post_batch([("SELL", 0.21, 2)]).all_ok
+    assert ("POST", "/api/v3/order") not in fake_binance.requests
+
+    resp = mgr.post_limit_maker("BUY", 0.20003, 100)         # above the market: priced below it up front
+    assert resp["price"] == "0.19999" and resp["origQty"] == "100"
+    assert fake_binance.requests.count(("POST", "/api/v3/order")) == 1
+    assert fake_binance.requests.count(("GET", "/api/v3/exchangeInfo")) == 1
@@ -0,0 +1,64 @@
+import asyncio
+
+import numpy as np
+
+import bot.services.history as hist
+from bot.services.history import HISTORY, KlineCache, last_closed_open, load_history
+from bot.services.rest import AsyncRestClient
+from bot.services.symbols import build_registry, parse_symbols
+from test_market_stream import MIN, rows
+from test_symbols import Recorder
+
+NOW = 3000*MIN + 20_000         # candle 3000 is still open
+
+
+def history(fake, bars, cache=None):
+    async def go():
+        async with AsyncRestClient(base_url=fake.url) as rest:
+            return await load_history(rest, "DOGEFDUSD", "1m", bars, cache, now_ms=NOW)
+    return asyncio.run(go())
+
+
+def test_history_is_fetched_as_concurrent_pages(fake_binance):
+    fake_binance.klines["DOGEFDUSD"] = rows(0, 3001)
+    fake_binance.delay = 0.05
+    records = history(fake_binance, 2500)
+    assert records.dtype == HISTORY and len(records) == 2500
+    assert records["time"][0] == 500*MIN and records["time"][-1] == 2999*MIN
+    assert np.all(np.diff(records["time"]) == MIN)
+    assert fake_binance.max_inflight >= 2
+
+
+def test_cache_supplies_history_and_only_the_tail_is_fetched(fake_binance, tmp_path):
+    cache = KlineCache(str(tmp_path), max_bars=5000)
+    fake_binance.klines["DOGEFDUSD"] = rows(0, 3001)
+    history(fake_binance, 1000, cache)
+    assert len(cache.load("DOGEFDUSD", "1m")) == 1000
+
+    fake_binance.klines["DOGEFDUSD"] = rows(2990, 11, price=0.3)    # exchange only has the tail now
+    records = history(fake_binance, 1000, cache)
+    assert len(records) == 1000 and records["time"][-1] == 2999*MIN
+    assert records["close"][-2] == 0.2 and records["close"][-1] == 0.2   # cache had up to 2999 already
+    (tmp_path / "DOGEFDUSD-1m.npy").write_bytes(b"garbage")
+    assert len(cache.load("DOGEFDUSD", "1m")) == 0
+
+
+def test_warm_start_makes_the_first_close_a_decision(fake_binance, monkeypatch):
+    registry = build_registry(parse_symbols("DOGEFDUSD", interval="1m"), make_order_mgr=Recorder, notify=False)
+    runner = registry["DOGEFDUSD"]
+    fake_binance.klines["DOGEFDUSD"] = rows(0, 3001)
+
+    async def go():
+        async with AsyncRestClient(base_url=fake_binance.url) as rest:
+            return await runner.warm_start(rest, bars=300)
+
+    monkeypatch.setattr(hist, "last_closed_open", lambda interval, now_ms=None: last_closed_open(interval, NOW))
+    try:
+        assert asyncio.run(go()) == 300
+        pipeline = runner.pipeline
+        assert pipeline.indicators.count == 300 and len(pipeline.store) == 300
+        assert pipeline.store.last_time() == 2999*MIN
+        runner.on_candle(2999*MIN, 0.2, 0.2, 0.2, 0.2, 1.0)        # stream repeat is ignored
+        assert pipeline.indicators.count == 300
+    finally:
+        runner.executor.shutdown()
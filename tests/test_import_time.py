@@ -0,0 +1,54 @@
+"""
+Import cost and side effects of the app, measured in a fresh interpreter with
+``python -X importtime``. Importing must not print, create files, configure
+logging or build clients; those happen when the app starts.
+
+    IMPORT_BUDGET_MS=600 pytest tests/test_import_time.py
+"""
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BUDGET_MS = float(os.getenv("IMPORT_BUDGET_MS", 1000))     # ~360 ms measured, mostly fastapi
+
+
+def import_fresh(module: str, cwd, code: str = "") -> tuple:
+    """Import ``module`` in a new interpreter; returns (stdout, {module: cumulative µs})"""
+    env = {**os.environ, "PYTHONPATH": ROOT, "JOURNAL_DIR": "data/journal", "CANDLE_ARCHIVE_DIR": "data/candles"}
+    env.pop("REDIS_URL", None)
+    done = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}\n{code}"],
+                          cwd=cwd, env=env, capture_output=True, text=True, timeout=60)
+    assert done.returncode == 0, done.stderr[-2000:]
+    times = {}
+    for line in done.stderr.splitlines():
+        if line.startswith("import time:") and "|" in line:
+            _, cumulative, name = line[12:].split("|")
+            if cumulative.strip().isdigit():
+                times[name.strip()] = int(cumulative)
+    return done.stdout, times
+
+
+def test_importing_the_app_builds_nothing(tmp_path):
+    stdout, times = import_fresh("bot.app", tmp_path)
+    assert stdout == ""
+    assert list(tmp_path.iterdir()) == []
+    for heavy in ("pandas", "binance.spot", "bot.services.websocket", "bot.services.shard"):
+        assert heavy not in times, f"{heavy} imported by bot.app"
+
+
+def test_importing_websocket_opens_no_clients_or_files(tmp_path):
+    stdout, times = import_fresh("bot.services.websocket", tmp_path, code="\n".join([
+        "import logging, sys",
+        "assert not logging.getLogger().handlers, 'logging configured at import'",
+        "assert 'registry' not in vars(sys.modules['bot.services.websocket'])",
+        "import bot.utils.account_monitor, bot.services.rest",
+    ]))
+    assert stdout == ""
+    assert list(tmp_path.iterdir()) == []
+    assert "binance.spot" not in times and "pandas" not in times
+
+
+def test_app_import_time_is_within_budget(tmp_path):
+    best = min(import_fresh("bot.app", tmp_path)[1]["bot.app"] for _ in range(3)) / 1000
+    assert best <= BUDGET_MS, f"bot.app import took {best:.0f} ms (budget {BUDGET_MS:.0f} ms)"
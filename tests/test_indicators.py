@@ -0,0 +1,90 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from bot.core.indicators import (
+    atr, boll_pct, ema, vwap, ema_kernel, rolling_mean_std, IndicatorSet, RollingVar,
+)
+from fixtures import legacy_atr, legacy_boll_pct, legacy_ema, legacy_vwap
+
+
+@pytest.fixture
+def candles():
+    rng = np.random.default_rng(42)
+    close = 0.2 + np.cumsum(rng.normal(0, 0.001, 3000))
+    spread = np.abs(rng.normal(0, 0.0008, (2, 3000)))
+    return pd.DataFrame({
+        "open": np.r_[close[0], close[:-1]],
+        "high": close + spread[0],
+        "low": close - spread[1],
+        "close": close,
+        "volume": rng.uniform(1e4, 1e5, 3000),
+    })
+
+
+def stream(df):
+    ind = IndicatorSet()
+    out = {"atr": [], "ema": [], "bb": [], "vwap": []}
+    for row in df.itertuples(index=False):
+        ind.update(row.open, row.high, row.low, row.close, row.volume)
+        for name in out:
+            out[name].append(getattr(ind, name).value)
+    return {name: np.array(values) for name, values in out.items()}
+
+
+def test_streaming_matches_pandas_reference_exactly(candles):
+    got = stream(candles)
+    # atr() back-fills the warm-up rows; compare from the first real value on
+    np.testing.assert_array_equal(got["atr"][14:], legacy_atr(candles).to_numpy()[14:])
+    np.testing.assert_array_equal(got["ema"], legacy_ema(candles["close"]).to_numpy())
+    np.testing.assert_array_equal(got["bb"][19:], legacy_boll_pct(candles).to_numpy()[19:])
+    np.testing.assert_array_equal(got["vwap"], legacy_vwap(candles).to_numpy())
+
+
+def test_streaming_matches_batch_kernels(candles):
+    got = stream(candles)
+    np.testing.assert_allclose(got["atr"][14:], atr(candles).to_numpy()[14:], rtol=1e-12)
+    np.testing.assert_allclose(got["ema"], ema(candles["close"]).to_numpy(), rtol=1e-12)
+    np.testing.assert_allclose(got["bb"][19:], boll_pct(candles).to_numpy()[19:], atol=1e-9)
+    np.testing.assert_allclose(got["vwap"], vwap(candles).to_numpy(), rtol=1e-12)
+
+
+def test_batch_wrappers_keep_warmup_behaviour(candles):
+    short = candles.iloc[:10]
+    assert atr(short).isna().all()
+    assert boll_pct(short).isna().all()
+    head = candles.iloc[:40]
+    np.testing.assert_allclose(atr(head), legacy_atr(head), rtol=1e-12)
+    assert np.isnan(boll_pct(head).iat[0])
+
+
+@pytest.mark.parametrize("span", [1, 2, 10, 200])
+def test_ema_kernel_in_place(candles, span):
+    x = candles["close"].to_numpy().copy()
+    expected = legacy_ema(candles["close"], span).to_numpy()
+    ema_kernel(x, span, out=x)
+    np.testing.assert_allclose(x, expected, rtol=1e-13)
+
+
+def test_rolling_mean_std_against_two_pass():
+    x = np.random.default_rng(3).normal(1.0, 0.01, 5000)
+    mean, std = rolling_mean_std(x, 20)
+    windows = np.lib.stride_tricks.sliding_window_view(x, 20)
+    np.testing.assert_allclose(mean[19:], windows.mean(axis=1), rtol=1e-13)
+    np.testing.assert_allclose(std[19:], windows.std(axis=1, ddof=1), rtol=1e-9)
+    assert np.isnan(mean[:19]).all()
+
+
+def test_streaming_warmup_is_nan(candles):
+    got = stream(candles.iloc[:20])
+    assert np.isnan(got["atr"][:14]).all()
+    assert np.isnan(got["bb"][:19]).all()
+    assert not np.isnan(got["atr"][14])
+
+
+def test_rolling_var_constant_window_is_zero():
+    rv = RollingVar(5)
+    for _ in range(8):
+        rv.update(0.25)
+    assert rv.value == 0.0
+    assert rv.std == 0.0
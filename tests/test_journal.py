@@ -0,0 +1,183 @@
+import os
+import threading
+
+import pytest
+
+from bot.core.order_mgr import OrderMgr
+from bot.core.pipeline import CandlePipeline
+from bot.core.strategy import GridStrategy
+from bot.services.journal import Journal, journal_dirs, replay
+from test_symbols import Recorder
+
+
+class Book(Recorder):
+    def post_batch(self, orders):
+        self.events.extend(tuple(order[:3]) for order in orders)
+
+    def cancel_batch(self, client_order_ids):
+        self.events.extend(("CANCEL", order_id) for order_id in client_order_ids)
+
+
+def journaled_grid(journal, **params):
+    return GridStrategy(order_mgr=Book("DOGEFDUSD"), notify=False, fdusd_cap=1000,
+                        journal=journal, **params)
+
+
+def test_replay_rebuilds_the_strategy(tmp_path):
+    journal = Journal(str(tmp_path))
+    live = journaled_grid(journal, preplace=2)
+    live.start_cycle(0.2, 0.004)
+    live.on_tick(live.next_buy, 0.004)
+    live.handle_buy_fill(0.199, 300, next(iter(live.ledger)))
+    live.handle_buy_fill(0.197, 400)
+    live.handle_sell_fill(live.ladders[1].sell, order_id=live.ladders[1].order_id)
+    journal.close()
+
+    restored = journaled_grid(None)
+    assert replay(str(tmp_path), "DOGEFDUSD", restored) == 7
+    for name in ("cycle", "step", "next_buy", "qty_next", "realised", "pending_buys"):
+        assert getattr(restored, name) == pytest.approx(getattr(live, name)), name
+    assert restored.ledger.items() == pytest.approx(live.ledger.items())
+    assert [(l.buy, l.sell, l.qty, l.order_id) for l in restored.ladders] == \
+        [(l.buy, l.sell, l.qty, l.order_id) for l in live.ladders]
+
+
+def test_replay_starts_at_the_last_cycle_and_after_a_close(tmp_path):
+    journal = Journal(str(tmp_path))
+    live = journaled_grid(journal, profit_target=0.5)
+    live.start_cycle(0.2, 0.004)
+    live.handle_buy_fill(0.199, 300)
+    live.handle_sell_fill(0.3, order_id=live.ladders[0].order_id)     # hits the target: close_all
+    assert not live.cycle
+    live.start_cycle(0.25, 0.002)
+    live.handle_buy_fill(0.249, 100)
+    journal.close()
+
+    restored = journaled_grid(None)
+    assert replay(str(tmp_path), "DOGEFDUSD", restored) == 2
+    assert restored.cycle and restored.realised == 0 and len(restored.ladders) == 1
+    assert replay(str(tmp_path), "DOGEUSDT", journaled_grid(None)) == 0
+
+
+def test_replayed_day_keeps_its_pnl(tmp_path):
+    journal = Journal(str(tmp_path))
+    live = journaled_grid(journal)
+    day = 20_000*86_400_000
+    CandlePipeline(live, interval="1m").roll_day(day)
+    live.start_cycle(0.2, 0.004)
+    live.handle_buy_fill(0.199, 300)
+    live.handle_sell_fill(0.205, order_id=live.ladders[0].order_id)
+    journal.close()
+
+    restored = journaled_grid(None)
+    replay(str(tmp_path), "DOGEFDUSD", restored)
+    assert restored.day == live.day and restored.realised == pytest.approx(1.8)
+    pipeline = CandlePipeline(restored, interval="1m")
+    pipeline.roll_day(day + 60_000)                                  # same day: kept
+    assert restored.realised == pytest.approx(1.8)
+
+    CandlePipeline(live, interval="1m").roll_day(day + 86_400_000)  # midnight, mid-cycle
+    restored = journaled_grid(None)
+    replay(str(tmp_path), "DOGEFDUSD", restored)
+    assert restored.realised == 0 and restored.day == live.day and restored.cycle
+
+
+def test_a_symbol_that_moved_shards_resumes_from_its_old_directory(tmp_path):
+    old = Journal(str(tmp_path / "shard0"))
+    live = journaled_grid(old, preplace=1)
+    live.start_cycle(0.2, 0.004)
+    live.handle_buy_fill(0.199, 300)
+    live.handle_sell_fill(live.ladders[0].sell, order_id=live.ladders[0].order_id)
+    live.handle_buy_fill(0.197, 400)
+    old.close()
+
+    new = Journal(str(tmp_path / "shard1"), peers=journal_dirs(str(tmp_path)))
+    restored = journaled_grid(None)
+    assert new.replay("DOGEFDUSD", restored) > 0
+    new.close()
+    again = journaled_grid(None)                      # the checkpoint alone is enough now
+    assert replay(str(tmp_path / "shard1"), "DOGEFDUSD", again) == 1
+    for strategy in (restored, again):
+        for name in ("cycle", "step", "next_buy", "qty_next", "realised"):
+            assert getattr(strategy, name) == pytest.approx(getattr(live, name)), name
+        assert strategy.ledger.items() == pytest.approx(live.ledger.items())
+        assert [(l.buy, l.sell, l.qty, l.order_id) for l in strategy.ladders] == \
+            [(l.buy, l.sell, l.qty, l.order_id) for l in live.ladders]
+
+
+def test_group_commit_batches_concurrent_appends(tmp_path):
+    journal = Journal(str(tmp_path), commit_interval=0.01).start()
+    try:
+        threads = [threading.Thread(target=journal.append, args=("DOGEFDUSD", "intent"),
+                                    kwargs={"wait": True, "side": "BUY"}) for _ in range(20)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert journal.durable == 20 and journal.commits < 20
+    finally:
+        journal.close()
+    assert [e["seq"] for e in journal.events()] == list(range(1, 21))
+
+
+def test_segments_rotate_are_pruned_and_survive_a_torn_write(tmp_path):
+    journal = Journal(str(tmp_path), segment_bytes=200, keep=2)
+    for i in range(3):
+        journal.append("DOGEFDUSD", "cycle", step=0.001, next_buy=0.2, qty_next=300)
+        for _ in range(3):
+            journal.append("DOGEFDUSD", "ack", oid=i)
+    assert len(journal.segments) == 2 and journal.segments[0] > 1
+    journal.close()
+
+    last = os.path.join(str(tmp_path), sorted(os.listdir(tmp_path))[-1])
+    with open(last, "ab") as f:
+        f.write(b'{"seq":99,"ts":1,"sym":"DOGEF')               # crash mid-record
+    reopened = Journal(str(tmp_path), segment_bytes=200, keep=2)
+    assert reopened.seq == 12
+    assert reopened.append("DOGEFDUSD", "ack") == 13
+    reopened.close()
+    assert [e["seq"] for e in reopened.events(since=11)] == [11, 12, 13]
+
+
+def test_segments_are_pruned_after_a_restart_without_a_new_cycle(tmp_path):
+    def cycle(journal, symbol):
+        journal.append(symbol, "cycle", step=0.001, next_buy=0.2, qty_next=300)
+        for i in range(3):
+            journal.append(symbol, "ack", oid=i)
+
+    journal = Journal(str(tmp_path), segment_bytes=200, keep=2)
+    cycle(journal, "DOGEUSDT")
+    cycle(journal, "DOGEFDUSD")
+    journal.close()
+    usdt_cycle = journal.segments[0]
+
+    reopened = Journal(str(tmp_path), segment_bytes=200, keep=2)
+    for _ in range(4):
+        cycle(reopened, "DOGEFDUSD")
+        reopened.append("DOGEUSDT", "ack", oid=0)       # no new DOGEUSDT cycle from this process
+    reopened.close()
+    assert reopened.segments[0] == usdt_cycle           # still needed by DOGEUSDT
+    assert replay(str(tmp_path), "DOGEUSDT", journaled_grid(None)) == 1
+
+    reopened = Journal(str(tmp_path), segment_bytes=200, keep=2)
+    cycle(reopened, "DOGEUSDT")
+    for _ in range(2):
+        cycle(reopened, "DOGEFDUSD")
+    reopened.close()
+    assert reopened.segments[0] > usdt_cycle             # both symbols moved on: old segments go
+
+
+def test_order_mgr_journals_intents_before_sending(tmp_path):
+    journal = Journal(str(tmp_path))
+    seen = []
+
+    class Rest:
+        async def new_order(self, **kwargs):
+            seen.append(len(list(journal.events())))       # the intent is already on disk
+            return {"orderId": 7, "clientOrderId": kwargs.get("newClientOrderId", "x")}
+
+    mgr = OrderMgr(symbol="DOGEFDUSD", client=object(), rest=Rest(), journal=journal)
+    mgr.post_limit_maker("BUY", 0.2, 100, client_order_id="dgbb-1")
+    assert seen == [1]
+    assert [(e["ev"], e.get("cid")) for e in journal.events()] == [("intent", "dgbb-1"), ("ack", "dgbb-1")]
+    assert mgr.events.maxlen is not None and len(mgr.events) == 1
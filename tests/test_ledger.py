@@ -0,0 +1,136 @@
+import time
+
+import pytest
+
+from bot.core.executor import OrderExecutor
+from bot.core.ledger import CapitalLedger
+from bot.core.strategy import GridStrategy
+from bot.services.account import AccountCache
+from bot.services.symbols import SymbolRunner, parse_symbols
+from bot.services.user_stream import ExecutionReport, FillDispatcher
+from test_executor import SlowOrderMgr
+
+
+def test_orders_move_through_reserved_locked_and_filled():
+    ledger = CapitalLedger()
+    ledger.cash = 1000.0
+    ledger.reserve("b1", 100.0)
+    ledger.reserve("b2", 200.0)
+    assert ledger.available(1100, deployed=0) == pytest.approx(700)      # cash - reserved
+    ledger.ack("b1")
+    assert (ledger.reserved, ledger.locked, ledger.cash) == (200.0, 100.0, 900.0)
+    assert ledger.release("b2") == 200.0 and ledger.release("b2") == 0.0
+    assert ledger.fill("b1", 100.0) == 100.0                              # locked quote was spent
+    assert (ledger.committed, ledger.cash) == (0.0, 900.0)
+    assert ledger.available(1100, deployed=100.0) == 900.0
+    assert ledger.available(950, deployed=100.0) == 850.0                 # the cap binds first
+    ledger.credit(104.0)
+    assert ledger.cash == 1004.0
+
+    ledger.reserve("b3", 50.0)
+    ledger.ack("b3")
+    ledger.reserve("b4", 30.0)
+    ledger.clear()                                                        # cycle closed, BUYs cancelled
+    assert (ledger.committed, ledger.cash) == (0.0, 1004.0)
+
+
+def test_reconcile_only_adopts_balances_newer_than_our_own_changes():
+    account = AccountCache(client=None)
+    ledger = CapitalLedger()
+    assert not ledger.reconcile(account, "FDUSD")
+    account.on_account_position({"u": 1, "B": [{"a": "FDUSD", "f": "500", "l": "0"}]})
+    assert ledger.reconcile(account, "FDUSD") and ledger.cash == 500.0
+    assert not ledger.reconcile(account, "FDUSD")                         # nothing new
+
+    ledger.reserve("b1", 100.0)
+    ledger.ack("b1")                                                      # cash 400, not yet on the exchange
+    assert not ledger.reconcile(account, "FDUSD") and ledger.cash == 400.0
+    account.on_account_position({"u": 2, "B": [{"a": "FDUSD", "f": "398", "l": "100"}]})
+    assert ledger.reconcile(account, "FDUSD") and ledger.drift == pytest.approx(-2.0)
+
+
+def test_a_snapshot_requested_before_our_ack_is_not_adopted():
+    ledger = CapitalLedger()
+    ledger.cash = 500.0
+
+    class Client:
+        def account(self):
+            ledger.reserve("b1", 100.0)
+            ledger.ack("b1")                   # acked while the snapshot is in flight
+            return {"updateTime": 1, "balances": [{"asset": "FDUSD", "free": "500", "locked": "0"}]}
+
+    account = AccountCache(client=Client())
+    account.refresh()
+    assert not ledger.reconcile(account, "FDUSD") and ledger.cash == 400.0
+    account.client = type("After", (), {"account": lambda self: {
+        "updateTime": 2, "balances": [{"asset": "FDUSD", "free": "400", "locked": "100"}]}})()
+    account.refresh()
+    assert ledger.reconcile(account, "FDUSD") and ledger.cash == 400.0
+
+
+def test_tick_buys_are_reserved_before_the_exchange_answers():
+    mgr = SlowOrderMgr()
+    executor = OrderExecutor(mgr)
+    strategy = GridStrategy(order_mgr=executor, notify=False, step_mult=1.0, qty0=1000, qty_inc=0,
+                            fdusd_cap=300)
+    try:
+        strategy.start_cycle(0.2, 0.01)
+        strategy.on_tick(0.19, 0.01)
+        strategy.on_tick(0.18, 0.01)           # 190 reserved, 180 more would pass the cap
+        assert strategy.pending_buys == pytest.approx(190)
+        mgr.release.set()
+        executor.shutdown()
+        assert strategy.ledger.reserved == pytest.approx(190)     # applied by the strategy's owner, not the executor
+        strategy.settle_orders()
+        assert mgr.events == [("BUY", pytest.approx(0.19), 1000)]
+        assert strategy.ledger.locked == pytest.approx(190) and strategy.ledger.reserved == 0
+    finally:
+        mgr.release.set()
+        executor.shutdown()
+
+
+def test_rejected_and_cancelled_buys_free_their_quote():
+    mgr = SlowOrderMgr()
+    mgr.release.set()
+    executor = OrderExecutor(mgr)
+    strategy = GridStrategy(order_mgr=executor, notify=False, step_mult=1.0, qty0=0, qty_inc=1000,
+                            fdusd_cap=1000)
+    strategy.start_cycle(0.2, 0.01)
+    strategy.on_tick(0.19, 0.01)               # qty 0: the order manager raises
+    executor.submit(lambda: None).result()     # the failed BUY has settled
+    strategy.settle_orders()
+    assert not strategy.ledger and strategy.next_buy == pytest.approx(0.19)     # level kept for a retry
+    strategy.qty_next = 1000
+    strategy.on_tick(0.18, 0.01)
+    executor.shutdown()
+    strategy.settle_orders()
+    [order_id] = strategy.ledger
+    assert strategy.ledger.locked == pytest.approx(190) and strategy.funds_free() == pytest.approx(810)
+    assert strategy.next_buy == pytest.approx(0.18)
+
+    report = {"e": "executionReport", "s": "DOGEFDUSD", "S": "BUY", "o": "LIMIT_MAKER", "x": "CANCELED",
+              "X": "CANCELED", "i": 1, "p": "0.19", "q": "1000", "l": "0", "L": "0", "z": "0", "Z": "0",
+              "T": 0, "c": "web-x", "C": order_id}
+    FillDispatcher(strategy, "DOGEFDUSD").on_report(ExecutionReport.from_event(report))
+    assert not strategy.ledger and strategy.funds_free() == 1000
+
+
+def test_runner_applies_order_results_under_its_lock():
+    mgr = SlowOrderMgr()
+    runner = SymbolRunner(parse_symbols("DOGEFDUSD")[0], mgr, notify=False, step_mult=1.0, qty0=1000,
+                          qty_inc=0, fdusd_cap=300)
+    strategy = runner.strategy
+    try:
+        with runner.lock:
+            strategy.start_cycle(0.2, 0.01)
+            strategy.on_tick(0.19, 0.01)
+            mgr.release.set()
+            while not mgr.events:              # the BUY went out; its result waits for the lock
+                time.sleep(0.001)
+            assert strategy.ledger.reserved == pytest.approx(190) and strategy._placing is not None
+        runner.executor.shutdown()             # its last results were applied once the lock was free
+        assert strategy.ledger.locked == pytest.approx(190) and strategy._placing is None
+        assert strategy.next_buy == pytest.approx(0.18)
+    finally:
+        mgr.release.set()
+        runner.executor.shutdown()
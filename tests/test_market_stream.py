@@ -0,0 +1,95 @@
+import asyncio
+import json
+
+from bot.services.market_stream import StreamSupervisor, fetch_closed_klines
+from bot.services.rest import AsyncRestClient
+from bot.services.symbols import build_registry, parse_symbols
+from test_symbols import Recorder, kline
+
+MIN = 60_000
+
+
+def rows(start, n, price=0.2):
+    return [[start + i*MIN, str(price), str(price), str(price), str(price), "100", start + (i+1)*MIN - 1]
+            for i in range(n)]
+
+
+def test_fetch_closed_klines_pages_and_skips_the_open_candle(fake_binance):
+    fake_binance.klines["DOGEFDUSD"] = rows(0, 25)
+    now = 24*MIN + 30_000                   # candle 24 is still open
+
+    async def go():
+        async with AsyncRestClient(base_url=fake_binance.url) as rest:
+            return await fetch_closed_klines(rest, "DOGEFDUSD", "1m", 3*MIN, now_ms=now, limit=10)
+
+    got = asyncio.run(go())
+    assert [r[0] // MIN for r in got] == list(range(3, 24))
+    assert len([r for r in fake_binance.requests if "klines" in str(r)]) == 3
+
+
+def test_registry_backfill_fills_the_gap_once(fake_binance):
+    registry = build_registry(parse_symbols("DOGEFDUSD", interval="1m"), make_order_mgr=Recorder, notify=False)
+    runner = registry["DOGEFDUSD"]
+    try:
+        for t in range(3):
+            runner.on_candle(t*MIN, 0.2, 0.2, 0.2, 0.2, 1.0)
+        fake_binance.klines["DOGEFDUSD"] = rows(0, 8)
+
+        async def go():
+            async with AsyncRestClient(base_url=fake_binance.url) as rest:
+                return await registry.backfill(rest)
+
+        assert asyncio.run(go()) == 5
+        registry.handle_message(json.dumps(kline("DOGEFDUSD", 7*MIN, "0.3")))   # live repeat of the last one
+        store = runner.pipeline.store
+        assert len(store) == 8 and store.last_time() == 7*MIN and store.last("close") == 0.2
+    finally:
+        runner.executor.shutdown()
+
+
+class FakeSocket:
+    def __init__(self, on_message, on_close):
+        self.on_message = on_message
+        self.on_close = on_close
+        self.stopped = False
+
+    def stop(self):
+        self.stopped = True
+
+
+def test_supervisor_reconnects_on_failure_silence_and_close():
+    sockets, seen, backfills = [], [], []
+    plan = iter(["fail", "silent", "close", "ok"])
+
+    def connect(url, streams, on_message, on_close, on_error):
+        step = next(plan, "ok")
+        if step == "fail":
+            raise ConnectionError("refused")
+        ws = FakeSocket(on_message, on_close)
+        sockets.append(ws)
+        on_message(None, f"live-{len(sockets)}")
+        if step == "close":
+            on_close(None)
+        return ws
+
+    async def backfill():
+        backfills.append(len(sockets))
+        sockets[-1].on_message(None, f"during-backfill-{len(sockets)}")   # held until after it
+        seen.append(f"backfilled-{len(sockets)}")
+
+    async def go():
+        supervisor = StreamSupervisor(["dogefdusd@kline_1m"], seen.append, backfill=backfill,
+                                      stale_after=0.05, check_every=0.01, min_backoff=0.001,
+                                      max_backoff=0.004, connect=connect)
+        task = asyncio.create_task(supervisor.run())
+        while len(sockets) < 3:
+            await asyncio.sleep(0.01)
+        await supervisor.stop()
+        await task
+        return supervisor
+
+    supervisor = asyncio.run(asyncio.wait_for(go(), 10))
+    assert supervisor.connections == 3 and backfills == [1, 2, 3]
+    assert all(ws.stopped for ws in sockets)
+    assert seen[:3] == ["backfilled-1", "live-1", "during-backfill-1"]
+    assert seen[3:6] == ["backfilled-2", "live-2", "during-backfill-2"]
@@ -0,0 +1,70 @@
+import time
+
+from bot.utils.notifications import HIGH, Notifier
+
+
+class Session:
+    """Records posts; each one takes ``delay`` seconds (a slow webhook)"""
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.posts = []
+
+    def post(self, url, json, timeout):
+        time.sleep(self.delay)
+        self.posts.append((url, json))
+        return self
+
+    def raise_for_status(self):
+        pass
+
+
+def notifier(session, **kwargs):
+    return Notifier(discord_url="https://discord.test/hook", telegram_token=None, telegram_chat=None,
+                    session=session, **kwargs)
+
+
+def test_submit_never_waits_for_the_webhook():
+    session = Session(delay=0.5)
+    n = notifier(session, coalesce_interval=0.0)
+    try:
+        started = time.perf_counter()
+        for i in range(5):
+            n.submit(f"message {i}")
+        assert time.perf_counter() - started < 0.05
+        assert n.flush()
+    finally:
+        n.stop()
+    assert 1 <= len(session.posts) <= 2
+
+
+def test_a_burst_of_fills_becomes_one_digest():
+    session = Session()
+    n = notifier(session, coalesce_interval=0.2)
+    try:
+        for i in range(20):
+            n.submit(f"SELL 300 DOGE @ ${0.2:.6f}", "PROFIT", trade=("SELL", 0.2, 300, 0.1*(i + 1)))
+        n.submit("🎯 DAILY TARGET HIT!", "SUCCESS", priority=HIGH)
+        assert n.flush()
+    finally:
+        n.stop()
+    assert len(session.posts) == 1
+    lines = session.posts[0][1]["content"].splitlines()
+    assert len(lines) == 2 and "DAILY TARGET" in lines[0]
+    assert "20 fills" in lines[1] and "20 SELL (6,000 DOGE)" in lines[1] and "PnL: $2.0000" in lines[1]
+
+
+def test_full_queue_sheds_low_priority_messages():
+    n = notifier(Session(), maxsize=3)
+    n.start = lambda: n           # no sender: the queue only fills
+    for i in range(3):
+        assert n.submit(f"fill {i}")
+    assert not n.submit("fill 3")
+    assert n.submit("target", priority=HIGH)
+    assert n.dropped == 2
+    assert [m.text for m in n._queue] == ["fill 1", "fill 2", "target"]
+
+
+def test_disabled_without_webhooks():
+    n = Notifier(discord_url=None, telegram_token=None, telegram_chat=None)
+    assert not n.submit("hello") and n._thread is None
@@ -0,0 +1,48 @@
+import time
+
+from binance.spot import Spot
+
+from bot.core.order_mgr import OrderMgr
+from fake_binance import API_KEY, SECRET
+
+
+def make_mgr(fake):
+    return OrderMgr(symbol="DOGEFDUSD", client=Spot(api_key=API_KEY, api_secret=SECRET, base_url=fake.url))
+
+
+def test_post_batch_is_concurrent_and_reports_each_order(fake_binance):
+    fake_binance.delay = 0.1
+    mgr = make_mgr(fake_binance)
+    orders = [("SELL", 0.21 + i*0.001, 100 + i) for i in range(6)]
+    started = time.perf_counter()
+    result = mgr.post_batch(orders)
+    elapsed = time.perf_counter() - started
+
+    assert result.all_ok and len(result) == 6
+    assert [o.qty for o in result] == [100 + i for i in range(6)]
+    assert fake_binance.max_inflight > 1
+    assert elapsed < 6*0.1
+    assert len(mgr.events) == 6
+
+
+def test_post_batch_reprices_and_isolates_failures(fake_binance, monkeypatch):
+    monkeypatch.setattr("bot.core.order_mgr.MAX_REPRICE", 3)
+    mgr = make_mgr(fake_binance)
+    # BUY at/above market steps down a tick at a time until it rests
+    result = mgr.post_batch([("BUY", 0.20002, 100), ("SELL", 0.25, 50)])
+    buy, sell = result.outcomes
+    assert buy.ok and sell.ok
+    assert float(buy.response["price"]) < 0.2
+
+    fake_binance.market = 10.0          # every SELL would take; retries run out
+    result = mgr.post_batch([("SELL", 0.3, 10), ("BUY", 0.3, 10)])
+    assert [o.ok for o in result] == [False, True]
+    assert "match and take" in str(result.failed[0].error)
+    assert mgr.post_batch([]).all_ok
+
+
+def test_symbols_share_one_async_session_and_weight_budget(fake_binance):
+    client = Spot(api_key=API_KEY, api_secret=SECRET, base_url=fake_binance.url)
+    doge, shib = OrderMgr(symbol="DOGEFDUSD", client=client), OrderMgr(symbol="SHIBFDUSD", client=client)
+    assert doge.post_batch([("SELL", 0.25, 10)]).all_ok and shib.post_batch([("SELL", 0.25, 10)]).all_ok
+    assert doge.rest is shib.rest and doge.rest.limiter.used > 0
@@ -0,0 +1,80 @@
+import asyncio
+
+import pytest
+from binance.spot import Spot
+
+from bot.core.order_mgr import OrderMgr
+from bot.services.rest import AsyncRestClient, BinanceAPIError, SharedLoopClient, WeightLimiter, get_async_client
+from fake_binance import API_KEY, SECRET
+
+
+def test_signed_order_and_error_mapping(fake_binance):
+    async def main():
+        async with AsyncRestClient(API_KEY, SECRET, base_url=fake_binance.url) as rest:
+            ok = await rest.new_order("DOGEFDUSD", "BUY", "LIMIT_MAKER", price="0.19", quantity="100")
+            with pytest.raises(BinanceAPIError) as err:
+                await rest.new_order("DOGEFDUSD", "BUY", "LIMIT_MAKER", price="0.21", quantity="100")
+            with pytest.raises(BinanceAPIError) as bad_sig:
+                await AsyncRestClient(API_KEY, "wrong", base_url=fake_binance.url).account()
+            return ok, err.value, bad_sig.value
+
+    ok, err, bad_sig = asyncio.run(main())
+    assert ok["orderId"] == 1 and ok["type"] == "LIMIT_MAKER"
+    assert err.status == 400 and err.code == -2010
+    assert "match and take" in str(err)   # OrderMgr's retry check still works
+    assert bad_sig.code == -1022
+
+
+def test_pooled_keepalive_and_inflight_cap(fake_binance):
+    fake_binance.delay = 0.05
+
+    async def main():
+        async with AsyncRestClient(base_url=fake_binance.url, max_inflight=3) as rest:
+            return await asyncio.gather(*(rest.request("GET", "/api/v3/echo", {"i": i}) for i in range(12)))
+
+    results = asyncio.run(main())
+    assert [r["params"]["i"] for r in results] == [str(i) for i in range(12)]
+    assert fake_binance.max_inflight <= 3
+    assert len(fake_binance.peers) <= 3          # connections reused, not one per request
+
+
+def test_limiter_tracks_used_weight_header_and_retry_after(fake_binance):
+    async def main():
+        async with AsyncRestClient(base_url=fake_binance.url) as rest:
+            await rest.ping()
+            used = rest.limiter.used
+            with pytest.raises(BinanceAPIError) as err:
+                await rest.request("GET", "/api/v3/busy")
+            return used, rest.limiter, err.value
+
+    used, limiter, err = asyncio.run(main())
+    assert used == 101
+    assert err.status == 429
+    assert limiter.delay() == pytest.approx(7, abs=0.5)
+
+
+def test_weight_limiter_waits_for_next_window():
+    now = [120.0 + 30]
+    limiter = WeightLimiter(limit=100, headroom=0.9, clock=lambda: now[0])
+    limiter.update({"x-mbx-used-weight-1m": "85"})
+    assert limiter.delay(5) == 0
+    limiter.spend(5)
+    assert limiter.delay(1) == pytest.approx(30)
+    now[0] = 180.0
+    assert limiter.delay(1) == 0 and limiter.used == 0
+
+
+def test_other_event_loops_share_the_process_client(fake_binance):
+    shared = get_async_client(API_KEY, SECRET, fake_binance.url)
+    mgr = OrderMgr(symbol="DOGEFDUSD", client=Spot(api_key=API_KEY, api_secret=SECRET, base_url=fake_binance.url))
+    assert mgr.post_limit_maker("BUY", 0.19, 100, client_order_id="dgbb-1")["status"] == "NEW"
+    assert mgr.cancel_order(client_order_id="dgbb-1")["status"] == "CANCELED"
+
+    async def user_stream():           # its own loop, like the user-data stream thread
+        return await SharedLoopClient(shared).new_order("DOGEFDUSD", "SELL", "LIMIT_MAKER",
+                                                        price="0.21", quantity="10")
+
+    assert asyncio.run(user_stream())["side"] == "SELL"
+    assert mgr.rest is shared and shared.limiter.used > 0
+    assert fake_binance.requests == [("POST", "/api/v3/order"), ("DELETE", "/api/v3/order"),
+                                     ("POST", "/api/v3/order")]
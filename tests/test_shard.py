@@ -0,0 +1,124 @@
+import json
+import threading
+import time
+
+from bot.services.shard import CANDLE, TICK, CandleRing, MarketBus, ShardStats, Supervisor, run_shard
+from bot.services.store import CandleArchive
+from bot.services.symbols import build_registry, parse_symbols
+from test_symbols import Recorder, kline
+
+
+def wait_for(predicate, timeout=30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.05)
+    return False
+
+
+def test_ring_wraps_and_drops_when_full():
+    ring = CandleRing(capacity=4)
+    reader = CandleRing.attach(ring.spec)
+    try:
+        for t in range(3):
+            assert ring.put(CANDLE, 0, t, 1, 2, 0.5, 1.5, 10)
+        assert [int(r["time"]) for r in reader.drain()] == [0, 1, 2]
+        for t in range(3, 9):
+            ring.put(TICK, 1, t, c=0.2)
+        assert len(reader) == 4 and ring.dropped == 2
+        batch = reader.drain()
+        assert [int(r["time"]) for r in batch] == [3, 4, 5, 6]
+        assert batch["close"].tolist() == [0.2]*4 and len(reader.drain()) == 0
+    finally:
+        reader.close()
+        ring.close()
+
+
+def test_bus_routes_closed_candles_to_the_owning_shard():
+    rings = [CandleRing(capacity=8), CandleRing(capacity=8)]
+    bus = MarketBus({"DOGEFDUSD": (0, 0), "DOGEUSDT": (1, 1)}, rings)
+    try:
+        bus.handle_message(json.dumps({"result": None, "id": 1}))
+        bus.handle_message(json.dumps(kline("DOGEFDUSD", 0, "0.19")))
+        bus.handle_message(json.dumps(kline("DOGEUSDT", 0, "0.2", closed=False)))
+        bus.handle_message(json.dumps(kline("DOGEUSDT", 60_000, "0.2")))
+        bus.handle_message(json.dumps(kline("BTCUSDT", 0, "60000")))
+        bus.handle_message(json.dumps({"data": {"e": "aggTrade", "s": "DOGEUSDT", "p": "0.21"}}))
+
+        first, second = rings[0].drain(), rings[1].drain()
+        assert first[["kind", "symbol", "time"]].tolist() == [(CANDLE, 0, 0)]
+        assert second[["kind", "symbol", "time"]].tolist()[0] == (CANDLE, 1, 60_000)
+        assert second["kind"][1] == TICK and second["close"][1] == 0.21
+    finally:
+        for ring in rings:
+            ring.close()
+
+
+def test_run_shard_applies_candles_and_publishes_stats():
+    configs = parse_symbols("DOGEFDUSD:1100,DOGEUSDT:250", interval="1m")
+    registry = build_registry(configs, make_order_mgr=Recorder, notify=False)
+    ring, stats = CandleRing(capacity=16), ShardStats(2)
+    stop = threading.Event()
+    worker = threading.Thread(target=run_shard, args=(registry, ring, stats, {"DOGEUSDT": 1}, stop, 0.001))
+    try:
+        for t in range(3):
+            ring.put(CANDLE, 1, t*60_000, 0.2, 0.2, 0.2, 0.2, 1.0)
+        ring.put(CANDLE, 0, 0, 0.19, 0.19, 0.19, 0.19, 1.0)     # not this shard's symbol
+        worker.start()
+        assert wait_for(lambda: stats.read(1)["candles"] == 3, timeout=5)
+        assert stats.read(1)["capital_cap"] == 250 and stats.read(1)["last_close"] == 0.2
+        assert len(registry["DOGEFDUSD"].pipeline.store) == 0 and stats.read(0)["updated"] == 0
+    finally:
+        stop.set()
+        worker.join()
+        for runner in registry:
+            runner.executor.shutdown()
+        ring.close()
+        stats.close()
+
+
+def test_supervisor_runs_shards_in_processes_and_restarts_them(tmp_path):
+    configs = parse_symbols("DOGEFDUSD,DOGEUSDT,SHIBFDUSD", interval="1m")
+    supervisor = Supervisor(configs, shards=2, user_stream=False, warm_start=False, ingest=False,
+                            archive=str(tmp_path), journal=str(tmp_path / "journal"))
+    assert [[c.symbol for c in s] for s in supervisor.shards] == [["DOGEFDUSD", "SHIBFDUSD"], ["DOGEUSDT"]]
+    supervisor.start()
+    try:
+        for t in range(2):
+            supervisor.rings[1].put(CANDLE, 1, t*60_000, 0.2, 0.2, 0.2, 0.2, 1.0)
+        assert wait_for(lambda: supervisor.status()["DOGEUSDT"]["candles"] == 2)
+        assert len(CandleArchive(str(tmp_path)).read("DOGEUSDT", "1m")) == 2
+        health = supervisor.health()
+        assert [s["alive"] for s in health["shards"]] == [True, True]
+        assert wait_for(lambda: all(s["heartbeat_age"] is not None for s in supervisor.health()["shards"]))
+
+        supervisor.workers[0].kill()
+        supervisor.workers[0].join()
+        assert supervisor.check() == 1 and supervisor.restarts == 1
+        assert wait_for(lambda: supervisor.workers[0].is_alive())
+    finally:
+        supervisor.stop()
+    assert not any(proc.is_alive() for proc in supervisor.workers)
+
+
+def test_bus_backfills_after_the_last_forwarded_candle(fake_binance):
+    import asyncio
+    from bot.services.rest import AsyncRestClient
+    from test_market_stream import MIN, rows
+
+    ring = CandleRing(capacity=16)
+    bus = MarketBus({"DOGEFDUSD": (0, 0)}, [ring], {"DOGEFDUSD": "1m"}, last_open={"DOGEFDUSD": 2*MIN})
+    fake_binance.klines["DOGEFDUSD"] = rows(0, 6)
+
+    async def go():
+        async with AsyncRestClient(base_url=fake_binance.url) as rest:
+            await bus.backfill(rest)
+
+    try:
+        asyncio.run(go())
+        bus.handle_message(json.dumps(kline("DOGEFDUSD", 5*MIN, "0.2")))     # live repeat
+        bus.handle_message(json.dumps(kline("DOGEFDUSD", 6*MIN, "0.2")))
+        assert (ring.drain()["time"] // MIN).tolist() == [3, 4, 5, 6]
+    finally:
+        ring.close()
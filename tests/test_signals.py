@@ -0,0 +1,73 @@
+import numpy as np
+import pytest
+
+from bot.core.pipeline import CandlePipeline
+from bot.core.signals import (EntryParams, check_recent_drop, entry_signal, entry_signals,
+                              recent_highs, scan_entries)
+from fixtures import make_candles
+
+
+def volatile_candles(n=3000, seed=7):
+    """make_candles with moves stretched so 2% pullbacks actually happen"""
+    df = make_candles(n, seed=seed)
+    close = 0.2*np.exp(np.log(df["close"]/0.2)*8)
+    return df.assign(close=close, high=close*df["high"]/df["close"],
+                     low=close*df["low"]/df["close"], open=np.r_[close[:1], close[:-1]])
+
+
+class RecordingStrategy:
+    """Never actually enters, so every signal bar is visible"""
+    cycle = False
+    realised = 0.0
+
+    def __init__(self):
+        self.entries = 0
+
+    def start_cycle(self, price, atr):
+        self.entries += 1
+
+    def new_day(self, day):
+        return False
+
+    def on_tick(self, price, atr):
+        pass
+
+
+def test_check_recent_drop_uses_previous_highs():
+    params = EntryParams(drop_pct=0.02, drop_lookback=2)
+    assert check_recent_drop([0.3, 0.2, 0.2], 0.196, params)
+    assert not check_recent_drop([0.3, 0.2, 0.2], 0.1961, params)
+    assert not check_recent_drop([0.2, 0.2], 0.1, params)     # not enough history
+
+
+@pytest.mark.parametrize("lookback", [1, 2, 5])
+def test_vector_and_scalar_paths_agree(lookback):
+    df = volatile_candles(600)
+    params = EntryParams(drop_lookback=lookback)
+    close, high = df["close"].to_numpy(), df["high"].to_numpy()
+    rng = np.random.default_rng(0)
+    bb, ema = rng.uniform(-0.2, 1.2, len(df)), close*rng.uniform(0.9, 1.1, len(df))
+    bb[:20] = np.nan
+
+    vector = entry_signals(close, high, bb, ema, params)
+    scalar = [entry_signal(close[i], bb[i], ema[i], list(high[max(0, i - lookback):i + 1]), params)
+              for i in range(len(df))]
+    for name in ("bb_ok", "ema_ok", "drop_ok", "enter"):
+        assert getattr(vector, name).tolist() == [getattr(s, name) for s in scalar], name
+    assert np.isnan(recent_highs(high, lookback)[:lookback]).all()
+
+
+def test_scan_matches_live_pipeline():
+    df = volatile_candles()
+    strategy = RecordingStrategy()
+    pipeline = CandlePipeline(strategy, interval="1m", daily_target=1e9)
+    hits = []
+    for i, bar in enumerate(df.itertuples()):
+        before = strategy.entries
+        pipeline.on_candle(i*60_000, bar.open, bar.high, bar.low, bar.close, bar.volume)
+        if strategy.entries > before:
+            hits.append(i)
+
+    mask = scan_entries(df["high"], df["low"], df["close"])
+    assert len(hits) > 10
+    assert np.flatnonzero(mask).tolist() == hits
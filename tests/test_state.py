@@ -0,0 +1,209 @@
+from types import SimpleNamespace
+
+import pytest
+
+from bot.core.strategy import GridStrategy
+from bot.services.state import StateStore, reconcile
+from bot.services.symbols import SymbolRunner, parse_symbols
+from bot.services.user_stream import FillDispatcher
+from fake_redis import FakeRedis
+from test_executor import SlowOrderMgr
+from test_symbols import Recorder
+
+
+class Orders(Recorder):
+    """Recorder with the cancel and open-order calls reconcile uses"""
+
+    def __init__(self, symbol, open_orders=(), statuses=None):
+        super().__init__(symbol)
+        self.open_orders = list(open_orders)
+        self.statuses = statuses or {}
+        self.cancelled = []
+        self.client = self
+
+    def cancel_order(self, order_id=None, client_order_id=None):
+        self.cancelled.append(client_order_id)
+
+    def get_open_orders(self, symbol):
+        return [{"clientOrderId": order_id} for order_id in self.open_orders]
+
+    def get_order(self, symbol, origClientOrderId):
+        if isinstance(self.statuses.get(origClientOrderId), Exception):
+            raise self.statuses[origClientOrderId]
+        if origClientOrderId not in self.statuses:
+            raise RuntimeError("Order does not exist.")
+        return self.statuses[origClientOrderId]
+
+
+def grid(order_mgr=None):
+    strategy = GridStrategy(order_mgr=order_mgr or Recorder("DOGEFDUSD"), notify=False, fdusd_cap=1000)
+    strategy.start_cycle(0.2, 0.004)
+    strategy.handle_buy_fill(0.199, 300, "dgbb-1")
+    strategy.handle_buy_fill(0.198, 350, "dgbb-2")
+    return strategy
+
+
+def test_changes_are_diffed_and_written_in_one_pipeline():
+    redis = FakeRedis()
+    store = StateStore(redis)
+    strategy = grid()
+    assert store.sync("DOGEFDUSD", strategy) == 6 + 2
+    assert redis.executed == [2] and len(redis.data["dogebot:DOGEFDUSD:ladders"]) == 2
+    assert store.sync("DOGEFDUSD", strategy) == 0 and redis.executed == [2]
+
+    order_id = strategy.ladders[0].order_id
+    strategy.handle_sell_fill(strategy.ladders[0].sell, order_id=order_id)
+    assert store.sync("DOGEFDUSD", strategy) == 1 + 1          # realised, one rung removed
+    assert order_id not in redis.data["dogebot:DOGEFDUSD:ladders"]
+
+
+def test_restore_rebuilds_the_strategy():
+    redis = FakeRedis()
+    strategy = grid()
+    strategy.ledger.reserve("dgbb-rest", 60.0)
+    StateStore(redis).sync("DOGEFDUSD", strategy)
+
+    fresh = GridStrategy(order_mgr=Recorder("DOGEFDUSD"), notify=False, fdusd_cap=1000)
+    store = StateStore(redis)
+    assert store.restore("DOGEFDUSD", fresh)
+    assert fresh.cycle and fresh.step == strategy.step and fresh.next_buy == strategy.next_buy
+    assert [(l.buy, l.sell, l.qty, l.order_id) for l in fresh.ladders] == \
+        [(l.buy, l.sell, l.qty, l.order_id) for l in strategy.ladders]
+    assert fresh.ladders.used == pytest.approx(strategy.ladders.used)
+    assert fresh.ledger.items() == [("dgbb-rest", 60.0)] and fresh.funds_free() == pytest.approx(strategy.funds_free())
+    assert store.writes == 0                                    # restoring wrote nothing back
+    assert not StateStore(redis).restore("DOGEUSDT", fresh)
+
+
+def test_writes_are_batched_and_retried_after_an_outage():
+    redis = FakeRedis()
+    store = StateStore(redis, flush_interval=60).start()
+    try:
+        strategy = grid()
+        store.sync("DOGEFDUSD", strategy)
+        strategy.realised = 1.5
+        store.sync("DOGEFDUSD", strategy)
+        assert redis.executed == []
+        redis.down = True
+        assert store.flush() == 0 and store.errors == 1
+        redis.down = False
+    finally:
+        store.stop()
+    assert redis.executed == [2]
+    assert redis.data["dogebot:DOGEFDUSD:strategy"]["realised"] == "1.5"
+
+
+def test_reconcile_books_missed_fills_and_cancels_orphans():
+    rungs = grid()
+    held, sold, lost = "dgbs-held", "dgbs-sold", "dgbs-lost"
+    for ladder, order_id in zip(list(rungs.ladders), (held, sold)):
+        rungs.ladders.pop(ladder.order_id)
+        ladder.order_id = order_id
+        rungs.ladders.add(ladder)
+    buy, sell, qty = (lambda l: (l.buy, l.sell, l.qty))(rungs.ladders.get(sold))
+    orders = Orders("DOGEFDUSD", open_orders=[held, "dgbs-orphan", "manual-1"], statuses={
+        sold: {"status": "FILLED", "executedQty": str(qty), "cummulativeQuoteQty": str(sell*qty)},
+        "dgbb-cancelled": {"status": "CANCELED", "executedQty": "0", "cummulativeQuoteQty": "0"},
+        "dgbs-busy": TimeoutError("read timed out"), "dgbb-busy": TimeoutError("read timed out")})
+    rungs.order_mgr = orders
+    from bot.core.ladder import Ladder
+    rungs.ladders.add(Ladder(0.197, 0.201, 400, lost))
+    rungs.ladders.add(Ladder(0.196, 0.2, 100, "dgbs-busy"))
+    rungs.ledger.reserve("dgbb-cancelled", 50.0, acked=True)
+    rungs.ledger.reserve("dgbb-busy", 40.0, acked=True)
+
+    summary = reconcile(rungs, orders.client, "DOGEFDUSD")
+    assert summary == {"kept": 1, "filled": 1, "reposted": 1, "released": 1, "cancelled": 1, "unchecked": 2,
+                       "in_flight": 0}
+    assert rungs.realised == pytest.approx((sell - buy)*qty)
+    assert orders.events == [("SELL", 0.201, 400)] and orders.cancelled == ["dgbs-orphan"]
+    assert set(rungs.ladders._rungs) == {held, lost, "dgbs-busy"}     # a lookup error keeps the order
+    assert rungs.ledger.items() == [("dgbb-busy", 40.0)]
+
+
+def test_reconcile_opens_a_rung_for_a_partly_filled_cancelled_buy():
+    orders = Orders("DOGEFDUSD", statuses={
+        "dgbb-part": {"status": "EXPIRED", "executedQty": "120", "cummulativeQuoteQty": "23.88"}})
+    strategy = GridStrategy(order_mgr=orders, notify=False, fdusd_cap=1000)
+    strategy.start_cycle(0.2, 0.004)
+    strategy.ledger.cash = 1000.0                                      # free balance, BUY locked
+    strategy.ledger.reserve("dgbb-part", 0.199*300, acked=True)
+
+    fills = FillDispatcher(strategy, "DOGEFDUSD")
+    assert reconcile(strategy, orders.client, "DOGEFDUSD", fills)["filled"] == 1
+    assert "dgbb-part" in fills._done               # a late report of it isn't booked again
+    [rung] = strategy.ladders
+    assert (rung.buy, rung.qty) == (pytest.approx(0.199), 120.0) and not strategy.ledger
+    assert strategy.ledger.cash == pytest.approx(1000.0 + 0.199*300 - 23.88)   # the unfilled rest is free
+    [(side, price, qty)] = orders.events
+    assert (side, qty) == ("SELL", 120.0) and price == pytest.approx(0.2)
+
+
+def test_runner_persists_fills_and_restores_on_boot():
+    redis = FakeRedis()
+    config = parse_symbols("DOGEFDUSD", interval="1m")[0]
+    runner = SymbolRunner(config, Orders("DOGEFDUSD"), state=StateStore(redis), notify=False)
+    try:
+        runner.strategy.start_cycle(0.2, 0.004)
+        report = SimpleNamespace(symbol="DOGEFDUSD", side="BUY", status="FILLED", execution_type="TRADE",
+                                 client_order_id="dgbb-x", avg_price=0.199, filled_qty=300.0,
+                                 last_qty=300.0, last_price=0.199, qty=300.0)
+        runner.on_report(report)
+        sell_id = runner.strategy.ladders[0].order_id
+    finally:
+        runner.executor.shutdown()
+
+    orders = Orders("DOGEFDUSD", open_orders=[sell_id])
+    reborn = SymbolRunner(config, orders, state=StateStore(redis), notify=False)
+    try:
+        assert reborn.restore()
+        assert len(reborn.strategy.ladders) == 1 and reborn.strategy.cycle
+        assert orders.cancelled == [] and orders.events == []
+    finally:
+        reborn.executor.shutdown()
+
+
+def test_restored_pnl_survives_warm_up_on_the_same_day():
+    redis = FakeRedis()
+    config = parse_symbols("DOGEFDUSD", interval="1m")[0]
+    day = 20_000*86_400_000
+    runner = SymbolRunner(config, Orders("DOGEFDUSD"), state=StateStore(redis), notify=False)
+    try:
+        runner.on_candle(day + 60_000, 0.2, 0.2, 0.2, 0.2, 1e5)
+        runner.strategy.realised = 4.0
+        runner.save_state()
+    finally:
+        runner.executor.shutdown()
+
+    reborn = SymbolRunner(config, Orders("DOGEFDUSD"), state=StateStore(redis), notify=False)
+    try:
+        assert reborn.restore() and reborn.strategy.realised == 4.0
+        reborn.pipeline.warm_up([(day + i*60_000, 0.2, 0.2, 0.2, 0.2, 1e5) for i in range(2, 30)])
+        assert reborn.strategy.realised == 4.0             # still today: the target stays met
+        reborn.on_candle(day + 86_400_000, 0.2, 0.2, 0.2, 0.2, 1e5)
+        assert reborn.strategy.realised == 0.0
+    finally:
+        reborn.executor.shutdown()
+
+
+def test_reconcile_leaves_orders_the_executor_still_holds_alone():
+    mgr = SlowOrderMgr()
+    runner = SymbolRunner(parse_symbols("DOGEFDUSD")[0], mgr, notify=False, step_mult=1.0, qty0=1000,
+                          qty_inc=0, fdusd_cap=1000)
+    mgr.client = Orders("DOGEFDUSD")
+    strategy = runner.strategy
+    try:
+        strategy.start_cycle(0.2, 0.01)
+        strategy.on_tick(0.19, 0.01)                   # BUY queued, not yet on the exchange
+        strategy.handle_buy_fill(0.18, 100, "dgbb-x")  # its SELL is queued behind it
+        [buy_id] = strategy.ledger
+        [rung] = strategy.ladders
+        assert runner.executor.inflight() == {buy_id, rung.order_id}
+
+        summary = reconcile(strategy, mgr.client, "DOGEFDUSD")
+        assert summary["in_flight"] == 2 and summary["released"] == summary["reposted"] == 0
+        assert buy_id in strategy.ledger and mgr.client.cancelled == []
+    finally:
+        mgr.release.set()
+        runner.executor.shutdown()
+    assert runner.executor.inflight() == set() and strategy.ledger.acked(buy_id)
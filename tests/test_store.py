@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+
+from bot.services.store import CandleStore
+
+
+def fill(store, n, start=0):
+    for i in range(start, start + n):
+        store.append(i * 60_000, i, i + 1, i - 1, i + 0.5, 10.0)
+
+
+def test_append_and_window_before_wrap():
+    store = CandleStore(capacity=5)
+    fill(store, 3)
+    assert len(store) == 3
+    assert store.column("close").tolist() == [0.5, 1.5, 2.5]
+    assert store.window(2).shape == (5, 2)
+    assert store.last("high") == 3
+
+
+def test_wraparound_keeps_last_capacity_bars_in_order():
+    store = CandleStore(capacity=4)
+    fill(store, 11)
+    assert len(store) == 4
+    assert store.column("open").tolist() == [7, 8, 9, 10]
+    assert store.times().tolist() == [i * 60_000 for i in range(7, 11)]
+    assert store.column("open", 2).tolist() == [9, 10]
+
+
+def test_views_are_zero_copy_and_read_only():
+    store = CandleStore(capacity=4)
+    fill(store, 6)
+    view = store.column("close")
+    assert np.shares_memory(view, store._data)
+    with pytest.raises(ValueError):
+        view[0] = 1.0
+
+
+def test_same_open_time_overwrites_latest_bar():
+    store = CandleStore(capacity=4)
+    fill(store, 2)
+    store.append(60_000, 1, 5, 0, 4, 1)
+    assert len(store) == 2
+    assert store.last("close") == 4
+
+
+def test_to_frame_matches_window():
+    store = CandleStore(capacity=8)
+    fill(store, 12)
+    df = store.to_frame(5)
+    assert list(df.columns) == ["open", "high", "low", "close", "volume"]
+    assert df["open"].tolist() == [7, 8, 9, 10, 11]
+    assert df.index[-1].value == 11 * 60_000 * 10**6
@@ -0,0 +1,130 @@
+import pytest
+
+from bot.backtest import SimOrderMgr
+from bot.core.filters import FilterError
+from bot.core.ladder import Ladder, LadderBook
+from bot.core.strategy import GridStrategy
+from bot.services.user_stream import ExecutionReport, FillDispatcher
+
+
+def test_ladder_book_indexes_by_id_and_price():
+    book = LadderBook()
+    for i, buy in enumerate([0.19, 0.17, 0.18]):
+        book.add(Ladder(buy, buy + 0.01, 100 + i, f"s{i}"))
+    assert [l.buy for l in book] == [0.17, 0.18, 0.19] and book[0].order_id == "s1"
+    assert book.used == pytest.approx(0.19*100 + 0.17*101 + 0.18*102)
+    assert book.find(0.180001) == "s2" and book.find(0.18, qty=5) is None
+
+    assert book.pop("s2").qty == 102 and book.pop("s2") is None
+    assert "s2" not in book and len(book) == 2
+    assert book.used == pytest.approx(0.19*100 + 0.17*101)
+    book.pop("s0"), book.pop("s1")
+    assert book.used == 0.0 and not book
+
+
+def test_preplace_rests_affordable_rungs_in_one_batch():
+    sim = SimOrderMgr(cash=1100)
+    sim.last_price = 0.2
+    strategy = GridStrategy(order_mgr=sim, notify=False, step_mult=1.0, qty0=1000,
+                            qty_inc=500, fdusd_cap=1100, preplace=5)
+    strategy.start_cycle(0.2, 0.01)
+
+    buys = sorted((o.price, o.qty) for o in sim.open.values())
+    # 0.19*1000 + 0.18*1500 + 0.17*2000 + 0.16*2500 = 1200 > 1100, so three rungs
+    assert [q for _, q in buys] == [2000, 1500, 1000]
+    assert strategy.funds_free() < 0.17*2000 and strategy.next_buy < 0.17
+
+    strategy.on_tick(0.185, 0.01)        # price is above the next unplaced rung
+    assert len(sim.open) == 3
+
+    [fill] = sim.match(1, 0, 0.2, 0.1899)
+    strategy.handle_buy_fill(fill.price, fill.qty, fill.client_order_id)
+    assert strategy.pending_buys == pytest.approx(0.18*1500 + 0.17*2000)
+
+
+def test_close_all_sells_every_rung_in_one_batch():
+    calls = []
+
+    class Recorder:
+        def post_batch(self, orders):
+            calls.append(list(orders))
+
+        def post_limit_maker(self, side, price, qty, client_order_id=None):
+            pass
+
+        def cancel_batch(self, client_order_ids):
+            calls.append(("CANCEL", list(client_order_ids)))
+
+    strategy = GridStrategy(order_mgr=Recorder(), notify=False, step_mult=1.0, profit_target=5.0)
+    strategy.start_cycle(0.2, 0.01)
+    strategy.ledger.cash = 0.0
+    for price, qty in [(0.19, 300), (0.18, 350), (0.17, 400)]:
+        strategy.handle_buy_fill(price, qty)
+    strategy.ledger.reserve("dgbb-rest", 50.0, acked=True)
+    strategy.handle_sell_fill(0.18, order_id=strategy.ladders.find(0.17))      # +4
+    assert strategy.realised == pytest.approx(4) and len(strategy.ladders) == 2
+    sell_ids = [l.order_id for l in strategy.ladders]
+    partial = {"e": "executionReport", "s": "DOGEFDUSD", "S": "SELL", "o": "LIMIT_MAKER", "x": "TRADE",
+               "X": "PARTIALLY_FILLED", "i": 1, "p": "0.19", "q": "350", "l": "100", "L": "0.19",
+               "z": "100", "Z": "19", "T": 0, "c": strategy.ladders.find(0.18), "C": ""}
+    FillDispatcher(strategy, "DOGEFDUSD").on_report(ExecutionReport.from_event(partial))   # 100 of 350 sold
+    strategy.handle_sell_fill(0.21, 0.2, 200)   # legacy (price, buy_price, qty) call: +2 hits the target
+
+    cancels, batch = calls
+    assert cancels == ("CANCEL", sell_ids + ["dgbb-rest"])                     # one concurrent batch
+    assert sorted(qty for _, _, qty, _ in batch) == [250, 300]                 # only what is still held
+    assert all(price == pytest.approx(0.21) for _, price, _, _ in batch)
+    assert not strategy.cycle and not strategy.ladders
+    assert strategy.realised == pytest.approx(6 + 0.01*100)
+
+    cash = strategy.ledger.cash
+    for _, price, qty, order_id in batch:                                      # the liquidation fills
+        strategy.handle_sell_fill(price, qty=qty, order_id=order_id)
+    assert strategy.ledger.cash == pytest.approx(cash + 0.21*550) and not strategy.liquidating
+    assert strategy.realised == pytest.approx(7)
+
+
+def test_failed_tick_buys_keep_their_level_unless_filters_rule_it_out():
+    class Rejecting:
+        symbol = "DOGEFDUSD"
+        error = ConnectionError("timed out")
+
+        def post_limit_maker(self, side, price, qty, client_order_id=None):
+            raise self.error
+
+    mgr = Rejecting()
+    strategy = GridStrategy(order_mgr=mgr, notify=False, step_mult=1.0, qty0=100, qty_inc=0)
+    strategy.start_cycle(0.2, 0.01)
+    with pytest.raises(ConnectionError):
+        strategy.on_tick(0.19, 0.01)
+    assert strategy.next_buy == pytest.approx(0.19) and not strategy.ledger
+
+    mgr.error = FilterError("notional below MIN_NOTIONAL")
+    with pytest.raises(FilterError):
+        strategy.on_tick(0.19, 0.01)
+    assert strategy.next_buy == pytest.approx(0.18) and not strategy.ledger
+
+
+def test_a_rung_whose_sell_fails_is_retried_from_on_tick(monkeypatch):
+    monkeypatch.setattr("bot.core.strategy.SELL_RETRY_SECS", 0.0)
+    sells = []
+
+    class Flaky:
+        symbol = "DOGEFDUSD"
+        failures = 1
+
+        def post_limit_maker(self, side, price, qty, client_order_id=None):
+            if self.failures:
+                self.failures -= 1
+                raise ConnectionError("timed out")
+            sells.append((side, qty, client_order_id))
+            return {"clientOrderId": client_order_id}
+
+    strategy = GridStrategy(order_mgr=Flaky(), notify=False, step_mult=1.0, qty0=100, qty_inc=0)
+    strategy.start_cycle(0.2, 0.01)
+    strategy.handle_buy_fill(0.19, 100)
+    [rung] = strategy.ladders
+    assert list(strategy.unplaced) == [rung.order_id] and sells == []
+
+    strategy.on_tick(0.25, 0.01)
+    assert sells == [("SELL", 100, rung.order_id)] and not strategy.unplaced
@@ -0,0 +1,48 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from bot.backtest import Backtest
+from bot.backtest.sweep import SharedKlines, param_grid, rank, sweep
+from fixtures import dip_and_recover
+
+
+def test_param_grid_is_cartesian_product():
+    grid = param_grid(step_mult=[0.2, 0.3], qty0=[100, 200, 300], bb_max=[0.3])
+    assert len(grid) == 6
+    assert {"step_mult": 0.3, "qty0": 200, "bb_max": 0.3} in grid
+    with pytest.raises(ValueError):
+        param_grid(not_a_param=[1])
+
+
+def test_shared_klines_round_trip():
+    k = dip_and_recover()
+    with SharedKlines(k) as shared:
+        shm, view = SharedKlines.attach(shared.spec)
+        try:
+            np.testing.assert_array_equal(view.time, k.time)
+            np.testing.assert_array_equal(view.close, k.close)
+            assert view.time.dtype == np.int64
+        finally:
+            del view
+            shm.close()
+
+
+def test_sweep_pool_matches_single_backtest_and_ranks():
+    k = dip_and_recover()
+    grid = param_grid(step_mult=[0.25, 0.5], qty0=[300, 5000])
+    options = dict(interval="1m", daily_target=1e9, fdusd_cap=1100)
+    results = sweep(k, grid, processes=2, **options)
+
+    assert len(results) == 4 and "error" not in results
+    assert results["pnl"].is_monotonic_decreasing
+    best = results.iloc[0]
+    single = Backtest(k, step_mult=best["step_mult"], qty0=int(best["qty0"]), **options).run()
+    assert best["pnl"] == pytest.approx(single.pnl)
+    assert best["cycles"] == single.cycles
+
+
+def test_rank_breaks_pnl_ties_on_drawdown():
+    df = pd.DataFrame({"pnl": [1.0, 2.0, 2.0], "max_drawdown": [0.0, 5.0, 1.0],
+                       "utilisation": [0.1, 0.1, 0.1]})
+    assert rank(df)["max_drawdown"].tolist() == [1.0, 5.0, 0.0]
@@ -0,0 +1,93 @@
+import json
+
+import pytest
+
+from bot.services.account import AccountCache
+from bot.services.symbols import SymbolConfig, SymbolRegistry, SymbolRunner, parse_symbols
+from bot.services.user_stream import ExecutionReport
+from test_user_stream import RECORDED
+
+
+class Recorder:
+    def __init__(self, symbol):
+        self.symbol = symbol
+        self.events = []
+
+    def post_limit_maker(self, side, price, qty, client_order_id=None):
+        self.events.append((side, price, qty))
+
+
+def kline(symbol, t, close, closed=True):
+    return {"stream": f"{symbol.lower()}@kline_1m",
+            "data": {"e": "kline", "s": symbol,
+                     "k": {"s": symbol, "t": t, "o": close, "h": close, "l": close,
+                           "c": close, "v": "1", "x": closed}}}
+
+
+@pytest.fixture
+def registry():
+    registry = SymbolRegistry()
+    for config in parse_symbols("dogefdusd:1100,DOGEUSDT:250", interval="1m"):
+        registry.add(SymbolRunner(config, Recorder(config.symbol), notify=False))
+    yield registry
+    for runner in registry:
+        runner.executor.shutdown()
+
+
+def test_parse_symbols():
+    assert parse_symbols(" DOGEFDUSD:1100, dogeusdt ,") == [
+        SymbolConfig("DOGEFDUSD", 1100.0), SymbolConfig("DOGEUSDT", None)]
+    with pytest.raises(ValueError):
+        parse_symbols("DOGEFDUSD,dogefdusd:5")
+    with pytest.raises(ValueError):
+        parse_symbols(" , ")
+
+
+def test_streams_cover_every_symbol(registry):
+    assert registry.streams() == ["dogefdusd@kline_1m", "dogeusdt@kline_1m"]
+    registry.tick_stream = "bookTicker"
+    assert registry.streams()[-1] == "dogeusdt@bookTicker"
+
+
+def test_combined_messages_reach_only_their_symbol(registry):
+    registry.handle_message(json.dumps({"result": None, "id": 1}))
+    for i in range(3):
+        registry.handle_message(json.dumps(kline("DOGEFDUSD", i*60_000, "0.19")))
+    registry.handle_message(json.dumps(kline("DOGEUSDT", 0, "0.2")))
+    registry.handle_message(json.dumps(kline("DOGEUSDT", 60_000, "0.2", closed=False)))
+    registry.handle_message(json.dumps(kline("BTCUSDT", 0, "60000")))
+
+    doge, usdt = registry["DOGEFDUSD"], registry["DOGEUSDT"]
+    assert len(doge.pipeline.store) == 3 and len(usdt.pipeline.store) == 1
+    assert usdt.pipeline.store.last("close") == 0.2
+    assert doge.strategy.fdusd_cap == 1100 and usdt.strategy.fdusd_cap == 250
+    assert set(registry.status()) == {"DOGEFDUSD", "DOGEUSDT"}
+    assert registry.status()["DOGEFDUSD"]["cycle_active"] is False
+
+
+def test_book_tickers_cache_the_best_bid_and_ask():
+    config = parse_symbols("DOGEFDUSD")[0]
+    runner = SymbolRunner(config, Recorder(config.symbol), notify=False, account=AccountCache())
+    registry = SymbolRegistry()
+    registry.add(runner)
+    try:
+        registry.handle_message(json.dumps({"stream": "dogefdusd@bookTicker",
+                                            "data": {"u": 1, "s": "DOGEFDUSD", "b": "0.19", "B": "10",
+                                                     "a": "0.19002", "A": "20"}}))
+        assert runner.account.book("DOGEFDUSD") == (0.19, 0.19002)
+        assert runner.ticks.received == 1
+    finally:
+        runner.executor.shutdown()
+
+
+def test_reports_are_routed_by_symbol(registry):
+    calls = []
+    for runner in registry:
+        runner.strategy.handle_buy_fill = lambda p, q, cid, s=runner.symbol: calls.append((s, cid))
+        runner.strategy.handle_sell_fill = lambda p, qty=None, order_id=None, s=runner.symbol: \
+            calls.append((s, order_id))
+    for raw in RECORDED:
+        event = json.loads(raw)
+        if event["e"] == "executionReport":
+            registry.on_report(ExecutionReport.from_event(event))
+    assert calls == [("DOGEFDUSD", "dgbb-1"), ("DOGEFDUSD", "dgbs-2")]
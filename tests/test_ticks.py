@@ -0,0 +1,53 @@
+import threading
+import time
+
+from bot.core.pipeline import CandlePipeline
+from bot.core.strategy import GridStrategy
+from bot.core.ticks import TickCoalescer
+
+
+def test_coalescer_collapses_bursts_and_delivers_the_last_value():
+    seen = []
+    done = threading.Event()
+
+    def deliver(value):
+        seen.append(value)
+        if value == 99:
+            done.set()
+
+    ticks = TickCoalescer(deliver, interval=0.05)
+    for i in range(100):
+        ticks.push(i)
+    assert seen == [0]                     # leading edge goes straight through
+    assert done.wait(1)
+    assert seen == [0, 99] and ticks.received == 100 and ticks.delivered == 2
+
+    time.sleep(0.06)
+    ticks.push(100)                        # quiet period over: immediate again
+    assert seen[-1] == 100
+
+
+def test_on_price_places_rungs_between_candle_closes():
+    posted = []
+
+    class Recorder:
+        def post_limit_maker(self, side, price, qty, client_order_id=None):
+            posted.append((side, round(price, 6), qty))
+
+    strategy = GridStrategy(order_mgr=Recorder(), notify=False, step_mult=1.0, qty0=100, qty_inc=0)
+    pipeline = CandlePipeline(strategy, interval="1m", daily_target=1e9)
+    pipeline.on_price(0.1)                 # warming up, no cycle: ignored
+    for i in range(30):
+        pipeline.on_candle(i*60_000, 0.2, 0.201, 0.199, 0.2, 1e5)
+    bars = pipeline.indicators.count
+
+    strategy.start_cycle(0.2, pipeline.indicators.atr.value)
+    step = strategy.step
+    for price in (0.2 - step/2, 0.2 - step, 0.2 - 2*step):
+        pipeline.on_price(price)
+    assert [p for _, p, _ in posted] == [round(0.2 - step, 6), round(0.2 - 2*step, 6)]
+    assert pipeline.indicators.count == bars
+
+    strategy.realised = 1e9                # paused at the daily target
+    pipeline.on_price(0.0)
+    assert len(posted) == 2
@@ -0,0 +1,129 @@
+import asyncio
+import json
+from pathlib import Path
+
+import pytest
+import websockets
+
+from bot.core.strategy import GridStrategy
+from bot.services.rest import AsyncRestClient
+from bot.services.user_stream import ExecutionReport, FillDispatcher, UserStream
+from fake_binance import API_KEY, SECRET
+
+RECORDED = (Path(__file__).parent / "data" / "execution_reports.jsonl").read_text().splitlines()
+
+
+class RecordingStrategy:
+    def __init__(self):
+        self.calls = []
+
+    def handle_buy_fill(self, price, qty, order_id=None):
+        self.calls.append(("BUY", round(price, 8), qty, order_id))
+
+    def handle_sell_fill(self, price, buy_price=None, qty=None, order_id=None):
+        self.calls.append(("SELL", round(price, 8), qty, order_id))
+
+
+def test_replay_dispatches_each_completed_order_once():
+    strategy = RecordingStrategy()
+    stream = UserStream(rest=None, dispatcher=FillDispatcher(strategy, "DOGEFDUSD"))
+    kinds = [stream.handle_message(raw) for raw in RECORDED]
+
+    assert kinds.count("executionReport") == 8 and "outboundAccountPosition" in kinds
+    assert strategy.calls == [
+        ("BUY", round(56.98/300, 8), 300.0, "dgbb-1"),    # VWAP of the two partial fills
+        ("SELL", 0.192, 300.0, "dgbs-2"),                  # duplicate report ignored
+    ]
+    assert stream.handle_message("not json") is None       # logged, not raised
+
+
+def test_cancel_report_uses_original_client_id():
+    report = ExecutionReport.from_event(json.loads(RECORDED[6]))
+    assert report.client_order_id == "dgbb-0" and report.status == "CANCELED"
+
+
+def test_fills_drive_grid_strategy_by_client_id():
+    class Quiet:
+        def post_limit_maker(self, *args, **kwargs): pass
+        def post_batch(self, orders): pass
+        def cancel_batch(self, *args, **kwargs): pass
+
+    strategy = GridStrategy(order_mgr=Quiet(), notify=False, profit_target=100)
+    strategy.start_cycle(0.2, 0.01)
+    dispatcher = FillDispatcher(strategy, "DOGEFDUSD")
+    base = {"e": "executionReport", "s": "DOGEFDUSD", "o": "LIMIT_MAKER", "x": "TRADE", "X": "FILLED",
+            "i": 1, "p": "0", "q": "300", "l": "300", "L": "0", "z": "300", "T": 0, "C": ""}
+    dispatcher.on_report(ExecutionReport.from_event({**base, "c": "b1", "S": "BUY", "Z": "57.0"}))
+    [ladder] = strategy.ladders
+    dispatcher.on_report(ExecutionReport.from_event({**base, "c": ladder.order_id, "S": "SELL",
+                                                     "Z": str(300*ladder.sell)}))
+    assert not strategy.ladders
+    assert strategy.realised == pytest.approx(300*strategy.step)
+
+
+def test_a_buy_cancelled_after_a_partial_fill_opens_its_rung(monkeypatch):
+    monkeypatch.setattr("bot.services.user_stream.DISPATCHED_MAX", 2)
+    class Quiet:
+        def post_limit_maker(self, *args, **kwargs): pass
+
+    strategy = GridStrategy(order_mgr=Quiet(), notify=False, profit_target=100)
+    strategy.start_cycle(0.2, 0.01)
+    strategy.ledger.reserve("b1", 0.19*300, acked=True)
+    dispatcher = FillDispatcher(strategy, "DOGEFDUSD")
+    base = {"e": "executionReport", "s": "DOGEFDUSD", "S": "BUY", "o": "LIMIT_MAKER", "c": "web-x",
+            "C": "b1", "i": 1, "p": "0.19", "q": "300", "l": "0", "L": "0", "T": 0}
+    dispatcher.on_report(ExecutionReport.from_event({**base, "x": "CANCELED", "X": "CANCELED",
+                                                     "z": "120", "Z": "22.8"}))
+    [ladder] = strategy.ladders
+    assert (ladder.buy, ladder.qty) == (pytest.approx(0.19), 120.0) and not strategy.ledger
+
+    for order_id in ("b2", "b3", "b4"):
+        dispatcher.mark_done(order_id)
+    assert list(dispatcher._done) == ["b3", "b4"]                  # bounded, oldest forgotten
+
+
+def test_stream_against_local_servers(fake_binance):
+    keys = iter(["key-1", "key-2"])
+    fake_binance.routes[("POST", "/api/v3/userDataStream")] = lambda p: (200, {"listenKey": next(keys)})
+    fake_binance.routes[("DELETE", "/api/v3/userDataStream")] = lambda p: (200, {})
+    paths = []
+
+    async def replay(ws):
+        paths.append(ws.request.path)
+        if len(paths) == 1:
+            await ws.send('{"e": "listenKeyExpired", "E": 1, "listenKey": "key-1"}')
+            return
+        for raw in RECORDED:
+            await ws.send(raw)
+        await ws.wait_closed()
+
+    class Resyncing(FillDispatcher):
+        resyncs = 0
+
+        def resync(self):
+            self.resyncs += 1
+
+    strategy = RecordingStrategy()
+    dispatcher = Resyncing(strategy, "DOGEFDUSD")
+
+    async def main():
+        async with websockets.serve(replay, "127.0.0.1", 0) as server:
+            port = server.sockets[0].getsockname()[1]
+            rest = AsyncRestClient(API_KEY, SECRET, base_url=fake_binance.url)
+            stream = UserStream(rest, dispatcher,
+                                stream_url=f"ws://127.0.0.1:{port}", max_backoff=0.01)
+            task = asyncio.create_task(stream.run())
+            for _ in range(200):
+                if len(strategy.calls) == 2:
+                    break
+                await asyncio.sleep(0.01)
+            await stream.stop()
+            await asyncio.wait_for(task, 2)
+            await rest.close()
+        return strategy.calls
+
+    calls = asyncio.run(main())
+    assert paths == ["/ws/key-1", "/ws/key-2"]          # expired key replaced
+    assert dispatcher.resyncs == 1                      # after the reconnect only
+    assert [c[3] for c in calls] == ["dgbb-1", "dgbs-2"]
+    assert ("DELETE", "/api/v3/userDataStream") in fake_binance.requests